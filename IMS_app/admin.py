@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Product, Supplier ,Inventory
+from .models import PricingRule, Product, Supplier ,Inventory
 
 admin.site.register(Product)
 admin.site.register(Supplier)
-admin.site.register(Inventory)
\ No newline at end of file
+admin.site.register(Inventory)
+admin.site.register(PricingRule)
\ No newline at end of file
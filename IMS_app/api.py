@@ -0,0 +1,178 @@
+import hashlib
+
+from django.http import HttpResponseNotModified, JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date
+from django.views import View
+
+from . import versions
+from .filters import filter_inventory, filter_products, filter_suppliers
+from .mixins import AdminLoginMixin, KeysetPaginationMixin
+from .models import Inventory, Product, Supplier
+from .stock import annotate_stock_level, low_stock_threshold, very_low_stock_threshold
+
+API_VERSION = 'v1'
+
+
+class ApiListView(AdminLoginMixin, KeysetPaginationMixin, View):
+    """
+    Base view of the read-only JSON API collections.
+
+    Responses carry a strong ETag and a Last-Modified header derived from the version tokens of the
+    collections the endpoint reads (see versions.py) and the query string. A conditional GET whose
+    If-None-Match / If-Modified-Since still matches is answered with 304 after a single version lookup,
+    without querying or serializing any rows.
+
+    Attributes:
+    - model: The model of the collection.
+    - resources: Names of the versioned collections the response depends on.
+    - fields: Mapping of public field names to the ORM paths they are read from.
+    - default_fields: Fields returned when the `fields` query parameter is not given.
+    - paginate_by: Number of rows per page.
+
+    Methods:
+    - get: Handles conditional GETs and returns one page of rows with the requested fields.
+    - get_queryset: Returns the base queryset of the collection, all rows of `model` by default.
+    - filter_queryset: Applies the filters of the matching HTML view, returning (queryset, ordering).
+    - get_fields: Parses the `fields` query parameter (comma separated) into public field names.
+    - get_etag: Returns the strong ETag of the response for the given version tokens.
+
+    Usage:
+    - Subclass it with `model`, `resources`, `fields` and the queryset hooks. Only the selected fields are SELECTed.
+    """
+
+    model = None
+    resources = []
+    fields = {}
+    default_fields = []
+    paginate_by = 100
+
+    def get(self, request, *args, **kwargs):
+        fields = self.get_fields()
+        if fields is None:
+            return JsonResponse({'error': 'Unknown field. Available fields: %s' % ', '.join(self.fields)}, status=400)
+
+        tokens, last_modified = versions.get_versions(self.resources)
+        etag = self.get_etag(tokens)
+        last_modified = last_modified and int(last_modified.timestamp())
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None:
+            queryset, ordering = self.filter_queryset(self.get_queryset())
+            ordering_paths = [field.lstrip('-') for field in ordering]
+            rows = queryset.values(*{self.fields[field] for field in fields} | set(ordering_paths))
+            page = self.paginate_queryset(rows, ordering)
+            response = JsonResponse({
+                'results': [{field: row[self.fields[field]] for field in fields} for row in page],
+                'next': page.next_url,
+                'previous': page.previous_url,
+            })
+        elif not isinstance(response, HttpResponseNotModified):
+            return response
+
+        response['ETag'] = etag
+        if last_modified:
+            response['Last-Modified'] = http_date(last_modified)
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+    def filter_queryset(self, queryset):
+        return queryset, ['pk']
+
+    def get_fields(self):
+        requested = self.request.GET.get('fields')
+        if not requested:
+            return list(self.default_fields)
+        fields = [field.strip() for field in requested.split(',') if field.strip()]
+        if not fields or any(field not in self.fields for field in fields):
+            return None
+        return fields
+
+    def get_etag(self, tokens):
+        params = sorted(self.request.GET.lists())
+        key = repr((API_VERSION, self.request.path, tokens, params))
+        return '"%s"' % hashlib.sha1(key.encode()).hexdigest()
+
+
+class InventoryApiView(ApiListView):
+    """
+    API collection of the inventory, filtered like the admin dashboard (`search`, `low_stock`).
+    """
+
+    model = Inventory
+    resources = [versions.INVENTORY, versions.PRODUCT, versions.SUPPLIER]
+    fields = {
+        'id': 'pk',
+        'product_id': 'product_id',
+        'product': 'product__name',
+        'supplier': 'supplier_name',
+        'unit_price': 'product__unit_price',
+        'selling_unit_price': 'selling_unit_price',
+        'stock': 'stock',
+        'low_stock_threshold': 'effective_low_stock_threshold',
+        'stock_level': 'stock_level',
+        'daily_demand': 'daily_demand',
+        'safety_stock': 'safety_stock',
+        'reorder_point': 'reorder_point',
+        'days_of_cover': 'days_of_cover',
+    }
+    default_fields = ['id', 'product_id', 'product', 'selling_unit_price', 'stock', 'stock_level']
+
+    def get_queryset(self):
+        return annotate_stock_level(super().get_queryset())
+
+    def filter_queryset(self, queryset):
+        return filter_inventory(
+            queryset, self.request.GET.get('search', ''), bool(self.request.GET.get('low_stock')))
+
+    def get_etag(self, tokens):
+        # The stock level depends on the thresholds in the settings as well.
+        return super().get_etag(tokens + [low_stock_threshold(), very_low_stock_threshold()])
+
+
+class ProductApiView(ApiListView):
+    """
+    API collection of the products, filtered like the admin product list (`search`).
+    """
+
+    model = Product
+    resources = [versions.PRODUCT, versions.SUPPLIER]
+    fields = {
+        'id': 'pk',
+        'name': 'name',
+        'description': 'description',
+        'unit_price': 'unit_price',
+        'stock': 'stock',
+        'active_status': 'active_status',
+        'supplier_id': 'supplier_id',
+        'supplier': 'supplier_name',
+    }
+    default_fields = ['id', 'name', 'unit_price', 'stock', 'active_status', 'supplier_id']
+
+    def filter_queryset(self, queryset):
+        return filter_products(queryset, self.request.GET.get('search', ''))
+
+
+class SupplierApiView(ApiListView):
+    """
+    API collection of the suppliers, filtered like the admin supplier list (`search`).
+    """
+
+    model = Supplier
+    resources = [versions.SUPPLIER]
+    fields = {
+        'id': 'pk',
+        'username': 'user__username',
+        'first_name': 'user__first_name',
+        'last_name': 'user__last_name',
+        'email': 'user__email',
+        'is_active': 'user__is_active',
+        'phone_number': 'phone_number',
+        'address': 'address',
+    }
+    default_fields = ['id', 'username', 'first_name', 'last_name', 'is_active']
+
+    def filter_queryset(self, queryset):
+        return filter_suppliers(queryset, self.request.GET.get('search', ''))
@@ -1,6 +1,14 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ImsAppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'IMS_app'
+
+    def ready(self):
+        from . import checks, signals, tasks  # noqa: F401
+        from .search import rebuild_search_indexes
+        from .stock import sync_low_stock_thresholds
+        post_migrate.connect(rebuild_search_indexes, sender=self)
+        post_migrate.connect(sync_low_stock_thresholds, sender=self)
@@ -0,0 +1,125 @@
+import csv
+
+from django.http import HttpResponseBadRequest
+from django.views.generic import TemplateView
+
+from .forms import InventorySearchForm
+from .mixins import AsyncAdminLoginMixin, AsyncSupplierLoginMixin
+from .models import InventorySummary
+from .views import (
+    AdminDashboardMixin, AdminDashboardProductsMixin, AdminDashboardSuppliersMixin, Echo, InventoryReportMixin,
+    SupplierDashboardMixin)
+
+
+class AsyncAdminDashboardView(AsyncAdminLoginMixin, AdminDashboardMixin, TemplateView):
+    """
+    Async version of AdminDashboardView for ASGI deployments.
+
+    The page of inventory rows and the valuation summary are fetched with the async ORM, so the request does
+    not hold a worker thread while it waits on the database. The context (cards come from the cache) and the
+    template are shared with the sync view.
+
+    Methods:
+    - get: Fetches the page and the summary, then renders the dashboard.
+
+    Usage:
+    - Extends Django's TemplateView, uses the AsyncAdminLoginMixin for permission checks and the AdminDashboardMixin
+      for the queries and context.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        page = await self.apaginate_queryset(*self.get_queryset())
+        inventory_summary = await InventorySummary.objects.filter(supplier__isnull=True).afirst()
+        return self.render_to_response(
+            self.get_context_data(page=page, inventory_summary=inventory_summary, **kwargs))
+
+
+class AsyncAdminDashboardProductsView(AsyncAdminLoginMixin, AdminDashboardProductsMixin, TemplateView):
+    """
+    Async version of AdminDashboardProductsView for ASGI deployments.
+
+    Methods:
+    - get: Fetches the page of products with the async ORM, then renders the product list.
+
+    Usage:
+    - Extends Django's TemplateView, uses the AsyncAdminLoginMixin for permission checks and the
+      AdminDashboardProductsMixin for the queries and context.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        page = await self.apaginate_queryset(*self.get_queryset())
+        return self.render_to_response(self.get_context_data(page=page, **kwargs))
+
+
+class AsyncAdminDashboardSuppliersView(AsyncAdminLoginMixin, AdminDashboardSuppliersMixin, TemplateView):
+    """
+    Async version of AdminDashboardSuppliersView for ASGI deployments.
+
+    Methods:
+    - get: Fetches the page of suppliers with the async ORM, then renders the supplier list.
+
+    Usage:
+    - Extends Django's TemplateView, uses the AsyncAdminLoginMixin for permission checks and the
+      AdminDashboardSuppliersMixin for the queries and context.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        page = await self.apaginate_queryset(*self.get_queryset())
+        return self.render_to_response(self.get_context_data(page=page, **kwargs))
+
+
+class AsyncInventoryReportView(AsyncAdminLoginMixin, InventoryReportMixin, TemplateView):
+    """
+    Async version of InventoryReportView for ASGI deployments.
+
+    Methods:
+    - get: Streams the report as CSV when `export=csv` is requested, otherwise fetches the page and renders it.
+    - export_csv: Streams the report as CSV from an async iterator, so the rows are not buffered in memory.
+
+    Usage:
+    - Extends Django's TemplateView, uses the AsyncAdminLoginMixin for permission checks and the InventoryReportMixin
+      for the queries and context.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        if request.GET.get('export') == 'csv':
+            return self.export_csv()
+        form = InventorySearchForm(request.GET)
+        page = None
+        if form.is_valid():
+            page = await self.apaginate_queryset(self.get_queryset(form), self.get_ordering(form))
+        return self.render_to_response(self.get_context_data(form=form, page=page, **kwargs))
+
+    def export_csv(self):
+        form = InventorySearchForm(self.request.GET)
+        if not form.is_valid():
+            return HttpResponseBadRequest("Invalid report filters.")
+
+        # values() rather than values_list(): Django 4.2 runs a values_list() query as soon as aiterator()
+        # starts, on the event loop, which raises SynchronousOnlyOperation.
+        rows = self.get_queryset(form).values(*self.export_fields).aiterator(chunk_size=self.export_chunk_size)
+        writer = csv.writer(Echo())
+
+        async def lines():
+            yield writer.writerow(self.csv_header)
+            async for row in rows:
+                yield writer.writerow([row[field] for field in self.export_fields])
+
+        return self.csv_response(lines())
+
+
+class AsyncSupplierDashboardView(AsyncSupplierLoginMixin, SupplierDashboardMixin, TemplateView):
+    """
+    Async version of SupplierDashboardView for ASGI deployments.
+
+    Methods:
+    - get: Fetches the page of the supplier's products with the async ORM, then renders the dashboard.
+
+    Usage:
+    - Extends Django's TemplateView, uses the AsyncSupplierLoginMixin for permission checks and the
+      SupplierDashboardMixin for the queries and context.
+    """
+
+    async def get(self, request, *args, **kwargs):
+        page = await self.apaginate_queryset(*self.get_queryset())
+        return self.render_to_response(self.get_context_data(page=page, **kwargs))
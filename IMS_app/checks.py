@@ -0,0 +1,28 @@
+from django.core.cache import caches
+from django.core.cache.backends.memcached import BaseMemcachedCache
+from django.core.cache.backends.redis import RedisCache
+from django.core.checks import Error, Tags, register
+
+
+def cache_is_shared():
+    """
+    Returns whether the default cache is a Redis or memcached server, which every process of the deployment
+    reads and writes atomically. Local memory, file and database caches are not accepted.
+    """
+    return isinstance(caches['default'], (BaseMemcachedCache, RedisCache))
+
+
+@register(Tags.caches, deploy=True)
+def check_shared_cache(app_configs, **kwargs):
+    """
+    Fails `check --deploy` while the default cache is not shared: the fragment versions and supplier identities
+    dropped by one process would keep being served by the others.
+    """
+    if cache_is_shared():
+        return []
+    return [Error(
+        'The default cache (%s) is not shared by the processes of the deployment.'
+        % caches['default'].__class__.__name__,
+        hint='Set IMS_CACHE_BACKEND and IMS_CACHE_LOCATION to a Redis or memcached server.',
+        id='IMS_app.E001',
+    )]
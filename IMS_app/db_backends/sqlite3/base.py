@@ -0,0 +1,44 @@
+from django.core.exceptions import ImproperlyConfigured
+from django.db.backends.sqlite3 import base
+
+TRANSACTION_MODES = ('DEFERRED', 'IMMEDIATE', 'EXCLUSIVE')
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    SQLite backend accepting two extra OPTIONS on top of Django's sqlite3 backend.
+
+    Attributes:
+    - pragmas: Mapping of PRAGMA names to values, run on every new connection (journal_mode, synchronous,
+      busy_timeout, mmap_size, cache_size, ...).
+    - transaction_mode: How atomic blocks start their transaction (DEFERRED, IMMEDIATE or EXCLUSIVE).
+      IMMEDIATE takes the write lock at BEGIN, so the busy timeout applies to it. A DEFERRED transaction
+      that reads before writing fails right away with "database is locked" when another connection
+      writes in between, whatever the busy timeout.
+
+    Usage:
+    - ENGINE 'IMS_app.db_backends.sqlite3' in DATABASES (see the production profile in settings.py).
+    """
+
+    def get_connection_params(self):
+        params = super().get_connection_params()
+        params.pop('pragmas', None)
+        params.pop('transaction_mode', None)
+        return params
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in self.settings_dict['OPTIONS'].get('pragmas', {}).items():
+            conn.execute('PRAGMA %s = %s' % (name, value))
+        return conn
+
+    @property
+    def transaction_mode(self):
+        mode = self.settings_dict['OPTIONS'].get('transaction_mode', 'DEFERRED').upper()
+        if mode not in TRANSACTION_MODES:
+            raise ImproperlyConfigured(
+                'transaction_mode must be one of %s, not %r.' % (', '.join(TRANSACTION_MODES), mode))
+        return mode
+
+    def _start_transaction_under_autocommit(self):
+        self.cursor().execute('BEGIN %s' % self.transaction_mode)
@@ -0,0 +1,63 @@
+from django.db.models import Q
+
+from .search import PRODUCT_INDEX, SUPPLIER_INDEX, search_queryset
+from .stock import low_stock_filter
+
+
+def filter_inventory(queryset, search='', low_stock=False):
+    """
+    Applies the admin dashboard filters to an Inventory queryset.
+
+    Parameters:
+    - queryset: The Inventory queryset to filter.
+    - search: Search string matched against the product name and description.
+    - low_stock: Whether to keep only the rows below their low stock threshold.
+
+    Returns:
+    - A (queryset, ordering) tuple, the ordering being suitable for keyset pagination.
+    """
+    ordering = ['pk']
+    if low_stock:
+        queryset = queryset.filter(low_stock_filter())
+        ordering = ['stock', 'pk']
+    if search:
+        queryset = search_queryset(
+            queryset, search, PRODUCT_INDEX, ['name', 'description'],
+            Q(product__name__icontains=search)
+            | Q(product__description__icontains=search),
+            pk_field='product_id')
+        ordering = ['search_rank', 'pk']
+    return queryset, ordering
+
+
+def filter_products(queryset, search=''):
+    """
+    Applies the admin product list filters to a Product queryset.
+
+    Returns:
+    - A (queryset, ordering) tuple, the ordering being suitable for keyset pagination.
+    """
+    if not search:
+        return queryset, ['pk']
+    queryset = search_queryset(
+        queryset, search, PRODUCT_INDEX, ['name', 'description', 'supplier'],
+        Q(name__icontains=search)
+        | Q(description__icontains=search)
+        | Q(supplier_name__icontains=search))
+    return queryset, ['search_rank', 'pk']
+
+
+def filter_suppliers(queryset, search=''):
+    """
+    Applies the admin supplier list filters to a Supplier queryset.
+
+    Returns:
+    - A (queryset, ordering) tuple, the ordering being suitable for keyset pagination.
+    """
+    if not search:
+        return queryset, ['pk']
+    queryset = search_queryset(
+        queryset, search, SUPPLIER_INDEX, ['username', 'first_name'],
+        Q(user__username__icontains=search)
+        | Q(user__first_name__icontains=search))
+    return queryset, ['search_rank', 'pk']
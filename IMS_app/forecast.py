@@ -0,0 +1,150 @@
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.utils import timezone
+
+from . import jobs
+from .models import Inventory, StockMovement
+from .reorder import write_columns
+
+FORECAST_FIELDS = ['forecast_method', 'forecast_daily_demand', 'forecasted_at']
+# Products whose movements are read with one query when building the history matrix of a chunk.
+HISTORY_BATCH_SIZE = 500
+# Syntetos and Boylan's cut-off of the average interval between demand days: products with longer intervals
+# have intermittent demand, which simple exponential smoothing overestimates right after every demand day.
+INTERMITTENT_INTERVAL = 1.32
+
+
+def history_days():
+    return getattr(settings, 'IMS_FORECAST_HISTORY_DAYS', 180)
+
+
+def smoothing_factor():
+    return getattr(settings, 'IMS_FORECAST_SMOOTHING', 0.2)
+
+
+def chunk_size():
+    return getattr(settings, 'IMS_FORECAST_CHUNK_SIZE', 5000)
+
+
+def product_chunks(size=None):
+    """
+    Splits the inventory into (first product id, last product id) ranges of `size` rows each, the unit of
+    work of the pipeline: every chunk is forecast independently, so chunks can run in parallel processes.
+    """
+    size = size or chunk_size()
+    product_ids = list(Inventory.objects.order_by('product_id').values_list('product_id', flat=True))
+    return [(product_ids[start], product_ids[min(start + size, len(product_ids)) - 1])
+            for start in range(0, len(product_ids), size)]
+
+
+def history_matrix(product_ids, end, days):
+    """
+    Returns the dense (products × days) matrix of the units that left the inventory per product and day over
+    the `days` days before `end`, oldest day first, for a sorted array of product ids.
+
+    Outflows are the negative inventory movements other than deletions. They are read HISTORY_BATCH_SIZE
+    products at a time and added to the matrix, so memory is bounded by the chunk, not the history. Filtering
+    on the listed ids lets the database use the (product, location, created_at) index; on a range of ids
+    SQLite prefers the created_at index and reads every movement of the window for every chunk. Each batch is
+    fetched whole, so no read stays open while the other chunks' processes write their forecasts.
+    """
+    matrix = np.zeros((len(product_ids), days))
+    outflows = StockMovement.objects.filter(
+        location=StockMovement.INVENTORY, quantity__lt=0, created_at__gte=end - timedelta(days=days),
+        created_at__lt=end).exclude(reason=StockMovement.DELETED)
+    end_timestamp = end.timestamp()
+    for start in range(0, len(product_ids), HISTORY_BATCH_SIZE):
+        batch_ids = product_ids[start:start + HISTORY_BATCH_SIZE].tolist()
+        batch = list(outflows.filter(product_id__in=batch_ids).values_list('product_id', 'created_at', 'quantity'))
+        if not batch:
+            continue
+        batch_products, times, units = zip(*batch)
+        positions = np.searchsorted(product_ids, np.array(batch_products, dtype=np.int64))
+        age = (end_timestamp - np.array([moment.timestamp() for moment in times])) // 86400
+        days_ago = np.minimum(age.astype(np.int64), days - 1)
+        np.add.at(matrix, (positions, days - 1 - days_ago), -np.array(units, dtype=np.float64))
+    return matrix
+
+
+def simple_exponential_smoothing(matrix, alpha):
+    """
+    Returns the smoothed level of every row after the last day, starting from the row's mean. The loop is over
+    the days; every step updates all rows at once.
+    """
+    level = matrix.mean(axis=1)
+    for demand in matrix.T:
+        level = alpha * demand + (1 - alpha) * level
+    return level
+
+
+def croston(matrix, alpha):
+    """
+    Returns Croston's forecast of every row: the smoothed size of the non-zero demands divided by the smoothed
+    interval between them, both updated on demand days only. Rows without demand forecast zero.
+    """
+    rows = len(matrix)
+    size, interval = np.zeros(rows), np.zeros(rows)
+    since = np.ones(rows)
+    seen = np.zeros(rows, dtype=bool)
+    for demand in matrix.T:
+        hit = demand > 0
+        first = hit & ~seen
+        size = np.where(first, demand, np.where(hit, alpha * demand + (1 - alpha) * size, size))
+        interval = np.where(first, since, np.where(hit, alpha * since + (1 - alpha) * interval, interval))
+        seen |= hit
+        since = np.where(hit, 1, since + 1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return np.where(seen, size / interval, 0.0)
+
+
+def forecast_rates(matrix, alpha):
+    """
+    Fits every row of a history matrix with the model its demand pattern calls for: Croston's method when the
+    average interval between demand days exceeds INTERMITTENT_INTERVAL, simple exponential smoothing otherwise.
+
+    Returns:
+    - The (methods, daily rates) arrays; rows without demand get an empty method and a rate of zero.
+    """
+    demand_days = (matrix > 0).sum(axis=1)
+    intermittent = demand_days * INTERMITTENT_INTERVAL < matrix.shape[1]
+    rates = np.zeros(len(matrix))
+    rates[~intermittent] = simple_exponential_smoothing(matrix[~intermittent], alpha)
+    rates[intermittent] = croston(matrix[intermittent], alpha)
+    methods = np.where(intermittent, Inventory.CROSTON, Inventory.SES)
+    methods[demand_days == 0] = ''
+    return methods, np.where(demand_days == 0, 0.0, np.round(rates, 4))
+
+
+def forecast_chunk(first, last, end=None, days=None, alpha=None):
+    """
+    Forecasts the daily demand of the inventory rows of the products `first` to `last` (see product_chunks)
+    from the outflows of the `days` days before `end`, and stores the forecasts.
+
+    Returns:
+    - A dict with the number of inventory rows of the chunk and the number with a forecast demand.
+    """
+    end = end or timezone.now()
+    days = days or history_days()
+    alpha = smoothing_factor() if alpha is None else alpha
+    rows = list(Inventory.objects.filter(product_id__gte=first, product_id__lte=last).order_by(
+        'product_id').values_list('pk', 'product_id'))
+    if not rows:
+        return {'rows': 0, 'forecast': 0}
+    pks, product_ids = (np.array(column, dtype=np.int64) for column in zip(*rows))
+
+    methods, rates = forecast_rates(history_matrix(product_ids, end, days), alpha)
+    write_columns(FORECAST_FIELDS, [
+        (method, rate, end, pk) for method, rate, pk in zip(methods.tolist(), rates.tolist(), pks.tolist())])
+    return {'rows': len(rows), 'forecast': int((rates > 0).sum())}
+
+
+def enqueue_chunks(user=None, size=None):
+    """
+    Queues one forecast_demand job per chunk of the inventory, all forecasting from the same end time, so the
+    run_jobs worker pool forecasts the chunks in parallel. Returns the jobs.
+    """
+    end = timezone.now().isoformat()
+    return [jobs.enqueue(jobs.FORECAST_DEMAND, {'first': first, 'last': last, 'end': end}, user=user)
+            for first, last in product_chunks(size)]
@@ -10,11 +10,46 @@ class InventorySearchForm(forms.Form):
     - supplier_name: Search by supplier name (optional).
     - quantity_min: Minimum quantity threshold (optional).
     - quantity_max: Maximum quantity threshold (optional).
+    - sort_by: Comma separated sort keys, each optionally prefixed with `-` for a descending sort (optional).
+      Cleaned to a list of (key, descending) tuples.
+
+    Attributes:
+    - sort_keys: The keys accepted in sort_by.
+    - max_sort_keys: The most keys sort_by may combine.
     """
     product_name = forms.CharField(required=False)
     supplier_name = forms.CharField(required=False)
-    quantity_min = forms.IntegerField(required=False)
-    quantity_max = forms.IntegerField(required=False)
+    quantity_min = forms.IntegerField(required=False, min_value=0)
+    quantity_max = forms.IntegerField(required=False, min_value=0)
+    sort_by = forms.CharField(required=False)
+
+    sort_keys = ('product', 'supplier', 'unit_price', 'selling_price', 'stock')
+    max_sort_keys = 3
+
+    def clean_sort_by(self):
+        sort = []
+        for value in self.cleaned_data['sort_by'].split(','):
+            key = value.strip()
+            if not key:
+                continue
+            descending = key.startswith('-')
+            key = key.lstrip('-')
+            if key not in self.sort_keys:
+                raise forms.ValidationError(
+                    'Unknown sort key "%s". Choose from: %s.' % (key, ', '.join(self.sort_keys)))
+            if key in [name for name, _ in sort]:
+                raise forms.ValidationError('The sort key "%s" is repeated.' % key)
+            sort.append((key, descending))
+        if len(sort) > self.max_sort_keys:
+            raise forms.ValidationError('Sort by at most %s keys.' % self.max_sort_keys)
+        return sort
+
+    def clean(self):
+        cleaned_data = super().clean()
+        quantity_min, quantity_max = cleaned_data.get('quantity_min'), cleaned_data.get('quantity_max')
+        if quantity_min is not None and quantity_max is not None and quantity_min > quantity_max:
+            raise forms.ValidationError('The minimum quantity cannot exceed the maximum quantity.')
+        return cleaned_data
 
 class ProductForm(forms.ModelForm):
     """
@@ -0,0 +1,188 @@
+import hashlib
+import threading
+import time
+from collections import Counter
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+VERSION_KEY = 'ims:fragment-version:%s:%s'
+FRAGMENT_KEY = 'ims:fragment:%s:%s:%s'
+STATS_KEY = 'ims:fragment-stats:%s:%s'
+
+INVENTORY = 'inventory'
+PRODUCT = 'product'
+SUPPLIER = 'supplier'
+USER = 'user'
+
+
+# Hit/miss counts of this process not yet added to the shared counters, and when they were last added.
+_pending_stats = Counter()
+_stats_lock = threading.Lock()
+_stats_flushed_at = time.monotonic()
+
+
+def fragment_timeout():
+    return getattr(settings, 'IMS_FRAGMENT_CACHE_TIMEOUT', 60 * 60 * 24)
+
+
+def stats_interval():
+    return getattr(settings, 'IMS_FRAGMENT_STATS_INTERVAL', 10)
+
+
+def invalidate(kind, pks):
+    """
+    Gives the given objects a new version, so every cached fragment rendered from them is bypassed.
+
+    The versions are dropped right away and again once the surrounding transaction commits: a page rendered
+    between the write and the commit still sees the old row and may cache it under a fresh version, which
+    the second drop discards.
+
+    Parameters:
+    - kind: The kind of object (INVENTORY, PRODUCT, SUPPLIER or USER). Inventory rows are keyed by product id.
+    - pks: Primary keys of the changed objects.
+    """
+    keys = [VERSION_KEY % (kind, pk) for pk in pks]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def get_versions(objects):
+    """
+    Returns the current version tokens of the given (kind, pk) pairs, creating tokens for objects that have none.
+    """
+    keys = [VERSION_KEY % obj for obj in objects]
+    tokens = cache.get_many(keys)
+    missing = {key: uuid4().hex for key in keys if key not in tokens}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        tokens.update(missing)
+    return [tokens[key] for key in keys]
+
+
+def record(name, hits, misses):
+    """
+    Counts the hits and misses of a fragment in this process; they are added to the shared counters at most
+    every IMS_FRAGMENT_STATS_INTERVAL seconds, so a page view does not make a cache round trip for them.
+    """
+    with _stats_lock:
+        _pending_stats[STATS_KEY % (name, 'hits')] += hits
+        _pending_stats[STATS_KEY % (name, 'misses')] += misses
+        due = time.monotonic() - _stats_flushed_at >= stats_interval()
+    if due:
+        flush_stats()
+
+
+def flush_stats():
+    """
+    Adds the counts of this process to the shared counters, with an atomic incr on Redis and memcached.
+    """
+    global _stats_flushed_at
+    with _stats_lock:
+        counts = {key: count for key, count in _pending_stats.items() if count}
+        _pending_stats.clear()
+        _stats_flushed_at = time.monotonic()
+    for key, count in counts.items():
+        try:
+            cache.incr(key, count)
+        except ValueError:
+            cache.add(key, 0, timeout=None)
+            cache.incr(key, count)
+
+
+def fragment_stats():
+    """
+    Returns the hit/miss counters of every fragment, e.g. {'inventory_card': {'hits': 90, 'misses': 10, 'hit_rate': 0.9}}.
+    The counts of this process are added first; those of other processes are included once they add theirs.
+    """
+    flush_stats()
+    keys = [STATS_KEY % (fragment.name, outcome) for fragment in FRAGMENTS for outcome in ('hits', 'misses')]
+    counters = cache.get_many(keys)
+    stats = {}
+    for fragment in FRAGMENTS:
+        hits = counters.get(STATS_KEY % (fragment.name, 'hits'), 0)
+        misses = counters.get(STATS_KEY % (fragment.name, 'misses'), 0)
+        stats[fragment.name] = {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': round(hits / (hits + misses), 4) if hits + misses else None,
+        }
+    return stats
+
+
+def reset_stats():
+    with _stats_lock:
+        _pending_stats.clear()
+    cache.delete_many([STATS_KEY % (fragment.name, outcome) for fragment in FRAGMENTS for outcome in ('hits', 'misses')])
+
+
+class Fragment:
+    """
+    A template rendered once per object and cached under the versions of the objects it displays.
+
+    Attributes:
+    - name: Name of the fragment, used in cache keys and in the statistics.
+    - template_name: The template rendering one object.
+    - context_name: Name of the object in the template context.
+    - dependencies: Callable returning the (kind, pk) pairs whose versions the rendered output depends on.
+
+    Methods:
+    - render_many: Returns the rendered fragments of a list of objects, rendering only the cache misses.
+    """
+
+    def __init__(self, name, template_name, context_name, dependencies):
+        self.name = name
+        self.template_name = template_name
+        self.context_name = context_name
+        self.dependencies = dependencies
+
+    def render_many(self, objects, extra_key=(), **context):
+        """
+        Renders the fragments of `objects` in order with two cache round trips (versions, then fragments)
+        plus one write for the misses.
+
+        Parameters:
+        - objects: The objects to render.
+        - extra_key: Values other than the objects that the output depends on (e.g. thresholds from the settings).
+        - context: Additional template context, which must be the same for every object.
+        """
+        objects = list(objects)
+        dependencies = [self.dependencies(obj) for obj in objects]
+        tokens = iter(get_versions([dependency for group in dependencies for dependency in group]))
+        suffix = repr(sorted(context.items())) + repr(tuple(extra_key))
+        keys = []
+        for obj, group in zip(objects, dependencies):
+            versions = ':'.join(next(tokens) for _ in group)
+            digest = hashlib.sha1((versions + suffix).encode()).hexdigest()
+            keys.append(FRAGMENT_KEY % (self.name, obj.pk, digest))
+
+        cached = cache.get_many(keys)
+        rendered = {}
+        for obj, key in zip(objects, keys):
+            if key not in cached:
+                rendered[key] = render_to_string(self.template_name, {self.context_name: obj, **context})
+        if rendered:
+            cache.set_many(rendered, timeout=fragment_timeout())
+        record(self.name, len(objects) - len(rendered), len(rendered))
+        return [mark_safe(cached[key] if key in cached else rendered[key]) for key in keys]
+
+
+INVENTORY_CARD = Fragment(
+    'inventory_card', 'admin/cards/inventory_card.html', 'inventory',
+    lambda inventory: [(INVENTORY, inventory.product_id), (PRODUCT, inventory.product_id)])
+PRODUCT_CARD = Fragment(
+    'product_card', 'admin/cards/product_card.html', 'product',
+    lambda product: [(PRODUCT, product.pk), (USER, product.supplier.user_id)])
+SUPPLIER_CARD = Fragment(
+    'supplier_card', 'admin/cards/supplier_card.html', 'supplier',
+    lambda supplier: [(SUPPLIER, supplier.pk), (USER, supplier.user_id)])
+SUPPLIER_PROFILE = Fragment(
+    'supplier_profile', 'admin/cards/supplier_profile.html', 'supplier',
+    lambda supplier: [(SUPPLIER, supplier.pk), (USER, supplier.user_id)])
+FRAGMENTS = [INVENTORY_CARD, PRODUCT_CARD, SUPPLIER_CARD, SUPPLIER_PROFILE]
@@ -0,0 +1,94 @@
+import uuid
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.middleware import get_user
+from django.core.cache import cache
+
+from .models import Supplier
+
+SESSION_KEY = 'ims_identity'
+VERSION_KEY = 'ims:identity-version:%s'
+
+ROLE_ADMIN = 'admin'
+ROLE_SUPPLIER = 'supplier'
+
+
+def get_identity_version(user_id):
+    """
+    Returns the current identity version token of a user, creating one if the cache has none.
+    Tokens are random rather than counters so that an evicted key can never match an old session.
+    """
+    key = VERSION_KEY % user_id
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_identity(user_id):
+    """
+    Forces every session of the user to resolve its role and supplier again on the next request.
+    """
+    cache.set(VERSION_KEY % user_id, uuid.uuid4().hex, timeout=None)
+
+
+def store_identity(request, user):
+    """
+    Resolves the role and supplier id of `user` with one query and stores them in the session.
+    """
+    supplier_id = Supplier.objects.filter(user=user).values_list('pk', flat=True).first()
+    if user.is_superuser:
+        role = ROLE_ADMIN
+    elif supplier_id:
+        role = ROLE_SUPPLIER
+    else:
+        role = None
+    identity = {
+        'user_id': user.pk,
+        'role': role,
+        'supplier_id': supplier_id,
+        'version': get_identity_version(user.pk),
+    }
+    request.session[SESSION_KEY] = identity
+    return identity
+
+
+def get_identity(request):
+    """
+    Returns the cached identity of the logged-in user, resolving it only when the session has none
+    or it was invalidated. Also exposes it on the request as `request.role` and `request.supplier_id`.
+    """
+    user = request.user
+    if not user.is_authenticated:
+        return None
+    identity = request.session.get(SESSION_KEY)
+    if (not identity or identity.get('user_id') != user.pk
+            or identity.get('version') != get_identity_version(user.pk)):
+        identity = store_identity(request, user)
+    request.role = identity['role']
+    request.supplier_id = identity['supplier_id']
+    return identity
+
+
+def supplier_is_current(request):
+    """
+    Checks with one query that the supplier of the request's identity still belongs to its user. Writes check it
+    so that a session whose identity was not invalidated yet cannot act for a supplier given to another user.
+    """
+    return Supplier.objects.filter(pk=request.supplier_id, user_id=request.user.pk).exists()
+
+
+async def aget_user(request):
+    """
+    Loads the user of the request off the event loop. AuthenticationMiddleware keeps the result on the
+    request, so reading `request.user` afterwards does not query the database.
+    """
+    return await sync_to_async(get_user)(request)
+
+
+async def aget_identity(request):
+    """
+    Async version of get_identity, for views whose handlers are coroutines.
+    """
+    return await sync_to_async(get_identity)(request)
@@ -0,0 +1,130 @@
+import codecs
+import csv
+import json
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import fragments, ledger, search, supplier_names, versions
+from .models import Product, StockMovement
+
+IMPORT_FIELDS = ['name', 'description', 'unit_price', 'stock', 'active_status']
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_MAX_REPORTED_ERRORS = 1000
+BOOLEAN_VALUES = {'true': True, 't': True, 'yes': True, '1': True, 'false': False, 'f': False, 'no': False, '0': False}
+
+
+class ImportFormatError(Exception):
+    """
+    Raised when an uploaded catalog file cannot be parsed at all (unknown format, missing header columns).
+    """
+
+
+def detect_format(filename):
+    name = (filename or '').lower()
+    if name.endswith('.csv'):
+        return 'csv'
+    if name.endswith(('.ndjson', '.jsonl')):
+        return 'ndjson'
+    raise ImportFormatError("Unsupported file type, upload a .csv or .ndjson file.")
+
+
+def read_rows(lines, file_format):
+    """
+    Lazily parses an iterable of byte lines into (row_number, row) pairs, where row is a dict of
+    raw values, or an error string if the line itself could not be parsed.
+    """
+    text = codecs.iterdecode(lines, 'utf-8-sig')
+    if file_format == 'csv':
+        reader = csv.DictReader(text)
+        missing = {'name', 'unit_price', 'stock'} - set(reader.fieldnames or [])
+        if missing:
+            raise ImportFormatError("Missing CSV columns: %s" % ', '.join(sorted(missing)))
+        for row_number, row in enumerate(reader, start=1):
+            yield row_number, row
+        return
+
+    for row_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield row_number, "Invalid JSON"
+            continue
+        if not isinstance(row, dict):
+            yield row_number, "Each line must be a JSON object"
+            continue
+        yield row_number, row
+
+
+def build_product(supplier_id, row):
+    """
+    Builds an unsaved Product from a raw row and validates it with the same field validators and
+    Product.clean rules as the product forms.
+
+    Raises:
+    - ValidationError: If the row is not a valid product.
+    """
+    values = {field: row.get(field) for field in IMPORT_FIELDS if row.get(field) not in (None, '')}
+    if isinstance(values.get('active_status'), str):
+        values['active_status'] = BOOLEAN_VALUES.get(values['active_status'].strip().lower(), values['active_status'])
+    product = Product(supplier_id=supplier_id, **values)
+    product.clean_fields(exclude=['supplier'])
+    if product.stock < 0:
+        raise ValidationError({'stock': ['Ensure this value is greater than or equal to 0.']})
+    product.clean()
+    return product
+
+
+def import_products(supplier_id, lines, file_format, chunk_size=None, progress=None):
+    """
+    Imports a product catalog for a supplier from an iterable of byte lines (e.g. an uploaded file).
+
+    Rows are parsed and validated one chunk at a time, and each chunk's valid rows are inserted with a
+    single bulk_create (plus one batched insert of their opening stock into the ledger), so memory stays
+    bounded by the chunk size rather than the file size.
+
+    `progress`, if given, is called with the report after every chunk (see the import_products task).
+
+    Returns:
+    - A report dict with the number of created products, the number of rejected rows and
+      the errors of the first IMPORT_MAX_REPORTED_ERRORS rejected rows.
+    """
+    chunk_size = chunk_size or IMPORT_CHUNK_SIZE
+    report = {'created': 0, 'error_count': 0, 'errors': []}
+    rows = read_rows(lines, file_format)
+    # bulk_create skips the signal that fills in the supplier name.
+    supplier_name = supplier_names.of_suppliers([supplier_id]).get(supplier_id, '')
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            return report
+
+        products = []
+        for row_number, row in chunk:
+            try:
+                if isinstance(row, str):
+                    raise ValidationError(row)
+                product = build_product(supplier_id, row)
+                product.supplier_name = supplier_name
+                products.append(product)
+            except ValidationError as error:
+                report['error_count'] += 1
+                if len(report['errors']) < IMPORT_MAX_REPORTED_ERRORS:
+                    messages = error.message_dict if hasattr(error, 'error_dict') else {'__all__': error.messages}
+                    report['errors'].append({'row': row_number, 'errors': messages})
+
+        with transaction.atomic():
+            created = Product.objects.bulk_create(products)
+            search.refresh_products([product.pk for product in created if product.pk])
+            ledger.record_movements(
+                ledger.movement(product.pk, ledger.SUPPLIER, product.stock, StockMovement.IMPORTED)
+                for product in created if product.pk)
+            if created:
+                versions.bump(versions.PRODUCT)
+                fragments.invalidate(fragments.PRODUCT, [product.pk for product in created if product.pk])
+        report['created'] += len(created)
+        if progress is not None:
+            progress(report)
@@ -0,0 +1,241 @@
+import hashlib
+import json
+import logging
+import math
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextlib import ExitStack
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (ms) of the latency histogram buckets; slower requests fall in the last, open-ended bucket.
+HISTOGRAM_BUCKETS = [10, 25, 50, 100, 250, 500, 1000, 2500]
+
+_current = ContextVar('ims_request_metrics', default=None)
+_lock = threading.Lock()
+_windows = {}
+_totals = Counter()
+
+
+def instrumentation_enabled():
+    return getattr(settings, 'IMS_INSTRUMENTATION', False)
+
+
+def slow_query_count():
+    return getattr(settings, 'IMS_INSTRUMENTATION_SLOW_QUERIES', 5)
+
+
+def window_size():
+    return getattr(settings, 'IMS_INSTRUMENTATION_WINDOW', 1000)
+
+
+def percentile(values, percent):
+    """
+    Returns the nearest-rank percentile of a non-empty list of numbers.
+    """
+    ordered = sorted(values)
+    rank = max(int(math.ceil(percent / 100 * len(ordered))), 1)
+    return ordered[rank - 1]
+
+
+def fingerprint(sql):
+    """
+    Returns the SQL with its literals and IN lists collapsed, so the same query issued for different rows
+    (typically an N+1 loop) has the same fingerprint.
+    """
+    sql = re.sub(r"'(?:[^']|'')*'", '?', sql)
+    sql = re.sub(r'\b\d+\b', '?', sql)
+    return re.sub(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))*\s*\)', '(...)', sql)
+
+
+class RequestMetrics:
+    """
+    Queries and template render time collected during one request.
+
+    Attributes:
+    - queries: (sql, duration in seconds) of every statement executed.
+    - template_time: Seconds spent rendering templates (outermost renders only, includes are not counted twice).
+
+    Methods:
+    - execute: Database execute wrapper recording the statement and its duration.
+    - sql_time: Total seconds spent in the database.
+    - slowest: The slowest statements.
+    - duplicates: The fingerprints executed more than once, most repeated first.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.template_time = 0.0
+        self.template_depth = 0
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries.append((sql, time.perf_counter() - start))
+
+    def sql_time(self):
+        return sum(duration for _, duration in self.queries)
+
+    def slowest(self, count):
+        return sorted(self.queries, key=lambda query: query[1], reverse=True)[:count]
+
+    def duplicates(self):
+        counts = Counter()
+        samples = {}
+        for sql, _ in self.queries:
+            key = fingerprint(sql)
+            counts[key] += 1
+            samples.setdefault(key, sql)
+        return [
+            {'fingerprint': hashlib.sha1(key.encode()).hexdigest()[:12], 'count': count, 'sql': samples[key][:300]}
+            for key, count in counts.most_common() if count > 1
+        ]
+
+
+def _instrumented_render(render):
+    def _render(self, context):
+        metrics = _current.get()
+        if metrics is None:
+            return render(self, context)
+        metrics.template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, context)
+        finally:
+            metrics.template_depth -= 1
+            if not metrics.template_depth:
+                metrics.template_time += time.perf_counter() - start
+    _render.ims_instrumented = True
+    return _render
+
+
+def instrument_templates():
+    """
+    Wraps Template._render once per process so template render time is attributed to the current request.
+    Outside an instrumented request the wrapper only costs a context variable lookup.
+    """
+    if not getattr(Template._render, 'ims_instrumented', False):
+        Template._render = _instrumented_render(Template._render)
+
+
+def record(url_name, duration, queries, sql_time):
+    """
+    Adds a request to the rolling window of its URL name. Durations are in milliseconds.
+    """
+    with _lock:
+        window = _windows.get(url_name)
+        if window is None:
+            window = _windows[url_name] = deque(maxlen=window_size())
+        window.append((duration, queries, sql_time))
+        _totals[url_name] += 1
+
+
+def request_stats():
+    """
+    Returns the latency percentiles, query counts and latency histogram of the rolling window of every URL name,
+    e.g. {'admin_dashboard': {'requests': 120, 'window': 120, 'p50_ms': 12.1, ..., 'histogram': {...}}}.
+    """
+    with _lock:
+        windows = {name: list(window) for name, window in _windows.items()}
+        totals = dict(_totals)
+    stats = {}
+    for name, samples in sorted(windows.items()):
+        durations = [sample[0] for sample in samples]
+        histogram = dict.fromkeys(['<=%sms' % bound for bound in HISTOGRAM_BUCKETS] + ['>%sms' % HISTOGRAM_BUCKETS[-1]], 0)
+        for duration in durations:
+            bound = next((bound for bound in HISTOGRAM_BUCKETS if duration <= bound), None)
+            histogram['<=%sms' % bound if bound else '>%sms' % HISTOGRAM_BUCKETS[-1]] += 1
+        stats[name] = {
+            'requests': totals[name],
+            'window': len(samples),
+            'p50_ms': round(percentile(durations, 50), 3),
+            'p95_ms': round(percentile(durations, 95), 3),
+            'p99_ms': round(percentile(durations, 99), 3),
+            'mean_queries': round(sum(sample[1] for sample in samples) / len(samples), 2),
+            'max_queries': max(sample[1] for sample in samples),
+            'mean_sql_ms': round(sum(sample[2] for sample in samples) / len(samples), 3),
+            'histogram': histogram,
+        }
+    return stats
+
+
+def reset_request_stats():
+    with _lock:
+        _windows.clear()
+        _totals.clear()
+
+
+class InstrumentationMiddleware:
+    """
+    Opt-in middleware measuring the queries, SQL time and template render time of every request.
+
+    Each response gets a Server-Timing header (db, tpl, app and total durations, readable in the browser's
+    network panel), one structured log line is written to the IMS_app.instrumentation logger (with the slowest
+    statements and the fingerprints of repeated queries) and the request is added to the rolling statistics
+    of its URL name (see RequestStatsView). Streaming responses (such as the CSV export) are measured until the
+    view returns the response object: the time and queries spent producing their content are not included.
+
+    Usage:
+    - Listed in MIDDLEWARE and enabled with IMS_INSTRUMENTATION = True. When disabled Django drops it
+      from the middleware chain, so it costs nothing.
+    """
+
+    def __init__(self, get_response):
+        if not instrumentation_enabled():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        instrument_templates()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(metrics.execute))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = (time.perf_counter() - start) * 1000
+
+        sql_time = metrics.sql_time() * 1000
+        template_time = metrics.template_time * 1000
+        response['Server-Timing'] = ', '.join([
+            'db;dur=%.2f;desc="%s queries"' % (sql_time, len(metrics.queries)),
+            'tpl;dur=%.2f' % template_time,
+            'app;dur=%.2f' % max(total - sql_time - template_time, 0),
+            'total;dur=%.2f' % total,
+        ])
+
+        match = request.resolver_match
+        url_name = match.view_name if match else None
+        record(url_name or 'unresolved', total, len(metrics.queries), sql_time)
+
+        duplicates = metrics.duplicates()
+        fields = {
+            'method': request.method,
+            'path': request.path,
+            'url_name': url_name,
+            'status': response.status_code,
+            'duration_ms': round(total, 3),
+            'queries': len(metrics.queries),
+            'sql_ms': round(sql_time, 3),
+            'template_ms': round(template_time, 3),
+            'slow_queries': [
+                {'sql': sql[:300], 'ms': round(duration * 1000, 3)}
+                for sql, duration in metrics.slowest(slow_query_count())],
+            'duplicate_queries': duplicates,
+        }
+        logger.info(json.dumps(fields), extra={'request_metrics': fields})
+        return response
@@ -0,0 +1,231 @@
+import os
+import socket
+import time
+import traceback
+from datetime import timedelta
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import F, Subquery
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import Job
+
+# The registered tasks by kind, see task(). The tasks themselves are in tasks.py.
+TASKS = {}
+INVENTORY_REPORT_CSV = 'inventory_report_csv'
+IMPORT_PRODUCTS = 'import_products'
+REFRESH_REORDER_POINTS = 'refresh_reorder_points'
+FORECAST_DEMAND = 'forecast_demand'
+# Seconds between two progress writes of a running task.
+PROGRESS_INTERVAL = 1.0
+
+
+def job_dir():
+    return str(getattr(settings, 'IMS_JOB_DIR', os.path.join(settings.BASE_DIR, 'job_files')))
+
+
+def max_attempts():
+    return getattr(settings, 'IMS_JOB_MAX_ATTEMPTS', 3)
+
+
+def retry_delay():
+    return getattr(settings, 'IMS_JOB_RETRY_DELAY', 10)
+
+
+def stale_after():
+    return getattr(settings, 'IMS_JOB_STALE_AFTER', 300)
+
+
+class JobFailed(Exception):
+    """
+    Raised by a task that cannot succeed however often it is retried (e.g. invalid parameters); the job fails
+    right away with the message of the exception.
+    """
+
+
+def task(kind):
+    """
+    Registers the decorated function as the task run for jobs of the given kind. The function is called with
+    a JobRun and the job's params as keyword arguments, and returns a JSON summary (or None).
+    """
+    def register(function):
+        TASKS[kind] = function
+        return function
+    return register
+
+
+def worker_name():
+    return '%s:%s' % (socket.gethostname(), os.getpid())
+
+
+def job_path(relative):
+    return os.path.join(job_dir(), relative)
+
+
+def remove_file(relative):
+    if relative:
+        try:
+            os.remove(job_path(relative))
+        except FileNotFoundError:
+            pass
+
+
+def save_upload(upload):
+    """
+    Copies an uploaded file into IMS_JOB_DIR so a worker process can read it, and returns its relative path.
+    """
+    relative = os.path.join('uploads', '%s-%s' % (uuid4().hex, get_valid_filename(os.path.basename(upload.name))))
+    os.makedirs(os.path.dirname(job_path(relative)), exist_ok=True)
+    with open(job_path(relative), 'wb') as file:
+        for chunk in upload.chunks():
+            file.write(chunk)
+    return relative
+
+
+def enqueue(kind, params=None, user=None, attempts=None):
+    """
+    Queues a job of a registered kind and returns it. `attempts` overrides IMS_JOB_MAX_ATTEMPTS, e.g. 1 for
+    a task that must not run twice.
+    """
+    if kind not in TASKS:
+        raise ValueError('Unknown job kind %r.' % kind)
+    return Job.objects.create(
+        kind=kind, params=params or {}, created_by=user,
+        max_attempts=attempts if attempts is not None else max_attempts())
+
+
+def claim(worker):
+    """
+    Claims the oldest due queued job for the worker and returns it, or None if no job is due.
+
+    The job is picked and marked running by one UPDATE whose WHERE clause re-checks the status, so when
+    several workers race for the same job exactly one of them updates the row. Each claim gets its own token,
+    which the later writes of the attempt filter on, so an attempt that was requeued as stale cannot overwrite
+    the attempt that replaced it.
+    """
+    now = timezone.now()
+    token = '%s:%s' % (worker, uuid4().hex[:12])
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'id').values('pk')[:1]
+    claimed = Job.objects.filter(pk=Subquery(due), status=Job.QUEUED).update(
+        status=Job.RUNNING, worker=token, attempts=F('attempts') + 1, started_at=now, heartbeat_at=now,
+        progress_done=0, progress_total=None, message='')
+    if not claimed:
+        return None
+    return Job.objects.get(worker=token, status=Job.RUNNING)
+
+
+def heartbeat(job_ids):
+    """
+    Marks the running jobs as alive. The worker calls it for the jobs its processes are running, so only the
+    jobs of a worker that died go stale.
+    """
+    job_ids = list(job_ids)
+    if job_ids:
+        Job.objects.filter(pk__in=job_ids, status=Job.RUNNING).update(heartbeat_at=timezone.now())
+
+
+def requeue_stale():
+    """
+    Requeues the running jobs whose worker stopped sending heartbeats for IMS_JOB_STALE_AFTER seconds, or
+    fails them if they have no attempts left. Returns the number of jobs requeued or failed.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, heartbeat_at__lt=now - timedelta(seconds=stale_after()))
+    error = 'The worker running the job stopped responding.'
+    requeued = stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED, worker='', run_after=now, error=error)
+    failed = stale.update(status=Job.FAILED, worker='', finished_at=now, error=error)
+    return requeued + failed
+
+
+class JobRun:
+    """
+    The handle a task gets on its job: reports progress and writes the result file.
+
+    Methods:
+    - progress: Records the work done (at most once per PROGRESS_INTERVAL unless `force` is set).
+    - open_result: Opens the job's result file for writing; it is downloaded under the given name.
+    """
+
+    def __init__(self, job):
+        self.job = job
+        self.result_file = self.result_name = self.result_content_type = ''
+        self.reported_at = None
+
+    def progress(self, done, total=None, message='', force=False):
+        now = time.monotonic()
+        if not force and self.reported_at is not None and now - self.reported_at < PROGRESS_INTERVAL:
+            return
+        self.reported_at = now
+        Job.objects.filter(pk=self.job.pk, worker=self.job.worker).update(
+            progress_done=done, progress_total=total, message=message[:255], heartbeat_at=timezone.now())
+
+    def open_result(self, name, content_type, mode='w'):
+        self.result_file = os.path.join('results', '%s-%s' % (self.job.pk, get_valid_filename(name)))
+        self.result_name, self.result_content_type = name, content_type
+        os.makedirs(os.path.dirname(job_path(self.result_file)), exist_ok=True)
+        if 'b' in mode:
+            return open(job_path(self.result_file), mode)
+        return open(job_path(self.result_file), mode, newline='', encoding='utf-8')
+
+
+def execute(job_id):
+    """
+    Runs an attempt of a claimed job and records its outcome, then returns the job's new status. Called in a
+    worker process; exceptions of the task are recorded on the job, not raised.
+    """
+    # What the request_started signal does: drop connections the database closed since the last job.
+    close_old_connections()
+    job = Job.objects.get(pk=job_id)
+    run = JobRun(job)
+    try:
+        function = TASKS.get(job.kind)
+        if function is None:
+            raise JobFailed('Unknown job kind %r.' % job.kind)
+        result = function(run, **job.params)
+    except JobFailed as error:
+        remove_file(run.result_file)
+        return fail(job, str(error), retry=False)
+    except Exception:
+        remove_file(run.result_file)
+        return fail(job, traceback.format_exc())
+
+    Job.objects.filter(pk=job.pk, worker=job.worker).update(
+        status=Job.SUCCEEDED, finished_at=timezone.now(), result=result, error='',
+        result_file=run.result_file, result_name=run.result_name, result_content_type=run.result_content_type)
+    return Job.SUCCEEDED
+
+
+def fail(job, error, retry=True):
+    """
+    Records a failed attempt of a running job: the job is queued again after an exponential backoff
+    (IMS_JOB_RETRY_DELAY seconds, doubled per attempt) while it has attempts left, otherwise it fails.
+    Returns the job's new status.
+    """
+    now = timezone.now()
+    attempt = Job.objects.filter(pk=job.pk, worker=job.worker, status=Job.RUNNING)
+    if retry and job.attempts < job.max_attempts:
+        delay = retry_delay() * 2 ** (job.attempts - 1)
+        attempt.update(status=Job.QUEUED, worker='', run_after=now + timedelta(seconds=delay), error=error,
+                       message='Attempt %s failed, retrying in %s seconds.' % (job.attempts, delay))
+        return Job.QUEUED
+    attempt.update(status=Job.FAILED, worker='', finished_at=now, error=error)
+    return Job.FAILED
+
+
+def run_pending(worker, limit=None):
+    """
+    Claims and runs the due jobs one at a time in this process until none is due (or `limit` jobs ran).
+    Returns the number of jobs run.
+    """
+    count = 0
+    while limit is None or count < limit:
+        job = claim(worker)
+        if job is None:
+            break
+        execute(job.pk)
+        count += 1
+    return count
@@ -0,0 +1,140 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import F, Max, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from .models import Inventory, Product, StockMovement, StockSnapshot
+
+SUPPLIER = StockMovement.SUPPLIER
+INVENTORY = StockMovement.INVENTORY
+LOCATIONS = [SUPPLIER, INVENTORY]
+LEDGER_BATCH_SIZE = 500
+# Compaction only covers movements older than this, so a movement created just before a checkpoint
+# but committed after it is never left out of both the snapshot and the tail.
+COMPACTION_LAG = timedelta(minutes=1)
+
+
+def movement(product_id, location, quantity, reason):
+    return StockMovement(product_id=product_id, location=location, quantity=quantity, reason=reason)
+
+
+def record_movements(movements):
+    """
+    Appends movements to the ledger in batched INSERTs, skipping movements that do not change the stock.
+    """
+    movements = [entry for entry in movements if entry.quantity]
+    if movements:
+        StockMovement.objects.bulk_create(movements, batch_size=LEDGER_BATCH_SIZE)
+    return movements
+
+
+def _latest_snapshot(location, when):
+    return StockSnapshot.objects.filter(
+        product=OuterRef('product'), location=location, taken_at__lte=when).order_by('-taken_at')
+
+
+def balances_at(product_ids, when, location=INVENTORY):
+    """
+    Returns the stock of several products at `when`.
+
+    Each balance is read from the latest snapshot taken at or before `when` plus the movements recorded
+    after that snapshot, so the work per product is bounded by the compaction interval rather than by
+    the length of its history. Two queries are run however many products are asked for.
+
+    Returns:
+    - A dict of product id to stock, with 0 for products without any recorded stock.
+    """
+    product_ids = list(product_ids)
+    latest = _latest_snapshot(location, when)
+    balances = dict.fromkeys(product_ids, 0)
+    balances.update(StockSnapshot.objects.filter(
+        product_id__in=product_ids, location=location,
+        pk=Subquery(latest.values('pk')[:1])).values_list('product_id', 'balance'))
+
+    tail = StockMovement.objects.filter(
+        product_id__in=product_ids, location=location, created_at__lte=when,
+    ).annotate(since=Subquery(latest.values('taken_at')[:1])).filter(
+        Q(since__isnull=True) | Q(created_at__gt=F('since')),
+    ).values('product_id').annotate(total=Sum('quantity')).order_by()
+    for row in tail:
+        balances[row['product_id']] += row['total']
+    return balances
+
+
+def stock_at(product_id, when, location=INVENTORY):
+    """
+    Returns the stock of a product at `when`, for the supplier's stock or the inventory.
+    """
+    return balances_at([product_id], when, location)[product_id]
+
+
+def compact(cutoff=None):
+    """
+    Writes a snapshot at `cutoff` for every product and location that moved since the previous checkpoint.
+
+    Checkpoints are global, so every product's latest snapshot holds its balance at the previous checkpoint
+    and only the movements between the two checkpoints have to be read. Movements are never deleted.
+
+    Parameters:
+    - cutoff: The checkpoint time, by default COMPACTION_LAG before now. Must be after the previous checkpoint.
+
+    Returns:
+    - The number of snapshots written.
+
+    Raises:
+    - ValueError: If the cutoff is not after the previous checkpoint.
+    """
+    cutoff = cutoff or timezone.now() - COMPACTION_LAG
+    with transaction.atomic():
+        previous = StockSnapshot.objects.aggregate(taken_at=Max('taken_at'))['taken_at']
+        if previous is not None and cutoff <= previous:
+            raise ValueError("The checkpoint must be after the previous one (%s)." % previous.isoformat())
+
+        moved = StockMovement.objects.filter(created_at__lte=cutoff)
+        if previous is not None:
+            moved = moved.filter(created_at__gt=previous)
+        totals = moved.values('product_id', 'location').annotate(total=Sum('quantity')).order_by()
+
+        snapshots = []
+        for location in LOCATIONS:
+            changes = {row['product_id']: row['total'] for row in totals if row['location'] == location}
+            if not changes:
+                continue
+            latest = _latest_snapshot(location, cutoff)
+            balances = dict(StockSnapshot.objects.filter(
+                product_id__in=list(changes), location=location,
+                pk=Subquery(latest.values('pk')[:1])).values_list('product_id', 'balance'))
+            snapshots.extend(
+                StockSnapshot(product_id=product_id, location=location, taken_at=cutoff,
+                              balance=balances.get(product_id, 0) + change)
+                for product_id, change in changes.items())
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=LEDGER_BATCH_SIZE)
+    return len(snapshots)
+
+
+def reconcile():
+    """
+    Records an adjustment movement for every product whose ledger balance differs from its actual stock,
+    e.g. stock that existed before the ledger was introduced.
+
+    Returns:
+    - The adjustment movements that were recorded.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        actual = {
+            SUPPLIER: dict(Product.objects.values_list('pk', 'stock')),
+            INVENTORY: dict(Inventory.objects.values_list('product_id', 'stock')),
+        }
+        product_ids = list(actual[SUPPLIER])
+        adjustments = []
+        for start in range(0, len(product_ids), LEDGER_BATCH_SIZE):
+            chunk = product_ids[start:start + LEDGER_BATCH_SIZE]
+            for location in LOCATIONS:
+                balances = balances_at(chunk, now, location)
+                adjustments.extend(
+                    movement(product_id, location, actual[location].get(product_id, 0) - balance,
+                             StockMovement.ADJUSTED)
+                    for product_id, balance in balances.items())
+        return record_movements(adjustments)
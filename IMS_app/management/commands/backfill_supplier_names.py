@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from IMS_app import supplier_names
+from IMS_app.models import Supplier
+
+
+class Command(BaseCommand):
+    """
+    Fills in the denormalized supplier name of existing products and inventory rows, e.g. after the
+    supplier_name columns were added to a database with data.
+
+    Suppliers are processed in batches, each in its own transaction, so the write lock is held briefly.
+    Rows that already have the right name are not written, so the command can be re-run safely.
+
+    Usage:
+    - python manage.py backfill_supplier_names --batch-size 200
+    """
+
+    help = 'Copies the supplier usernames onto their products and inventory rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200, help='Suppliers per transaction (default 200).')
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size must be at least 1.')
+        supplier_pks = list(Supplier.objects.order_by('pk').values_list('pk', flat=True))
+        products = inventory = 0
+        for start in range(0, len(supplier_pks), options['batch_size']):
+            with transaction.atomic():
+                updated = supplier_names.sync(supplier_pks[start:start + options['batch_size']])
+            products += updated[0]
+            inventory += updated[1]
+        self.stdout.write(self.style.SUCCESS(
+            'Updated the supplier name of %s products and %s inventory rows (%s suppliers).'
+            % (products, inventory, len(supplier_pks))))
@@ -0,0 +1,146 @@
+import asyncio
+import json
+import threading
+import time
+
+from asgiref.sync import async_to_sync
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+from IMS_app.instrumentation import percentile
+from IMS_app.models import Supplier
+
+# (sync view, async view) URL names compared by the benchmark.
+PAIRS = [
+    ('admin_dashboard', 'async_admin_dashboard'),
+    ('admin_dashboard_products', 'async_admin_dashboard_products'),
+    ('admin_dashboard_suppliers', 'async_admin_dashboard_suppliers'),
+    ('inventory_report', 'async_inventory_report'),
+    ('supplier_dashboard', 'async_supplier_dashboard'),
+]
+
+
+class Command(BaseCommand):
+    """
+    Compares the concurrent-request throughput of the sync views served through the WSGI handler with their
+    async versions served through the ASGI handler.
+
+    The WSGI path runs `--concurrency` threads, each with its own test client, as a threaded WSGI server
+    does. The ASGI path runs the same number of concurrent requests as coroutines on one event loop with
+    the async test client, which drives Django's async request handler as an ASGI server does. Both paths
+    go through the full middleware stack; neither includes the network or server overhead.
+
+    Usage:
+    - python manage.py benchmark_async_views --concurrency 16 --requests 200
+    """
+
+    help = 'Compares the throughput of the sync (WSGI) and async (ASGI) dashboard views under concurrent requests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=16, help='Requests in flight (default 16).')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per view and path (default 200).')
+        parser.add_argument('--only', nargs='*', default=None, help='Only benchmark these sync URL names.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError('--concurrency and --requests must be at least 1.')
+        admin = User.objects.filter(is_superuser=True, is_active=True).first()
+        supplier = Supplier.objects.select_related('user').filter(user__is_active=True).first()
+        if admin is None or supplier is None:
+            raise CommandError('Needs an active superuser and an active supplier '
+                               '(see createsuperuser and generate_synthetic_data).')
+        users = {'admin': admin, 'supplier': supplier.user}
+
+        results = []
+        with override_settings(ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver']):
+            for sync_name, async_name in PAIRS:
+                if options['only'] is not None and sync_name not in options['only']:
+                    continue
+                user = users['supplier' if sync_name.startswith('supplier') else 'admin']
+                wsgi = self.run_wsgi(reverse(sync_name), user, options)
+                # Logging in writes the session, which the event loop must not do itself.
+                client = AsyncClient()
+                client.force_login(user)
+                asgi = async_to_sync(self.run_asgi)(reverse(async_name), client, options)
+                results.append({
+                    'view': sync_name,
+                    'wsgi': wsgi,
+                    'asgi': asgi,
+                    'asgi_speedup': round(asgi['requests_per_second'] / wsgi['requests_per_second'], 3),
+                })
+
+        self.stdout.write(json.dumps({
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'views': results,
+        }, indent=2))
+
+    def run_wsgi(self, url, user, options):
+        remaining = iter(range(options['requests']))
+        lock = threading.Lock()
+        timings, failures, errors = [], [], []
+
+        # Logged in and warmed up before the clock starts, as for the async client.
+        clients = []
+        for _ in range(options['concurrency']):
+            client = Client()
+            client.force_login(user)
+            client.get(url)
+            clients.append(client)
+
+        def worker(client):
+            try:
+                while True:
+                    with lock:
+                        if next(remaining, None) is None:
+                            return
+                    start = time.perf_counter()
+                    response = client.get(url)
+                    timings.append((time.perf_counter() - start) * 1000)
+                    if response.status_code != 200:
+                        failures.append(response.status_code)
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=worker, args=(client,)) for client in clients]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise CommandError('WSGI worker failed: %r' % errors[0])
+        return self.summarize(timings, failures, time.perf_counter() - start)
+
+    async def run_asgi(self, url, client, options):
+        await client.get(url)
+        semaphore = asyncio.Semaphore(options['concurrency'])
+        timings, failures = [], []
+
+        async def request():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url)
+                timings.append((time.perf_counter() - start) * 1000)
+                if response.status_code != 200:
+                    failures.append(response.status_code)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(request() for _ in range(options['requests'])))
+        return self.summarize(timings, failures, time.perf_counter() - start)
+
+    @staticmethod
+    def summarize(timings, failures, elapsed):
+        return {
+            'requests_per_second': round(len(timings) / elapsed, 1),
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'failures': len(failures),
+        }
@@ -0,0 +1,173 @@
+import json
+import subprocess
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import URLPattern, reverse
+from django.utils import timezone
+
+from IMS_app import urls
+from IMS_app.instrumentation import percentile
+from IMS_app.models import Product, Supplier
+
+# Never requested: they change the session or answer GET with a redirect to themselves, or serve a background job.
+SKIPPED_URLS = {'logout', 'job_status', 'job_result'}
+# Extra query strings benchmarked for an endpoint besides the plain URL.
+VARIANTS = {
+    'admin_dashboard': ['search={word}', 'low_stock=1'],
+    'admin_dashboard_products': ['search={word}'],
+    'admin_dashboard_suppliers': ['search={supplier}'],
+    'inventory_report': ['sort_by=-stock', 'product_name={word}', 'export=csv'],
+    'api_inventory': ['low_stock=1', 'fields=id,stock'],
+    'api_products': ['search={word}'],
+}
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, cwd=settings.BASE_DIR,
+            check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    """
+    Benchmarks every GET endpoint of IMS_app/urls.py with the Django test client (POST-only views are skipped).
+
+    Each endpoint is requested as the role it is meant for (anonymous, admin or supplier), first a few
+    times to warm up caches, then `--requests` times while measuring the latency and the number of queries,
+    and once more under tracemalloc to measure the peak Python memory of a request. The report is JSON, so
+    the reports of two commits can be compared with --compare.
+
+    Usage:
+    - python manage.py benchmark_endpoints --requests 50 --output before.json
+    - python manage.py benchmark_endpoints --requests 50 --compare before.json
+    """
+
+    help = 'Reports p50/p95/p99 latency, query counts and peak memory of every endpoint as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=30, help='Measured requests per endpoint (default 30).')
+        parser.add_argument('--warmup', type=int, default=3, help='Unmeasured requests per endpoint (default 3).')
+        parser.add_argument('--only', nargs='*', default=None, help='Only benchmark these URL names.')
+        parser.add_argument('--output', help='Write the JSON report to this file instead of stdout.')
+        parser.add_argument('--compare', help='Previous JSON report; adds the p50/p95 ratio to it per endpoint.')
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1:
+            raise CommandError('--requests must be at least 1.')
+        admin = User.objects.filter(is_superuser=True, is_active=True).first()
+        supplier = Supplier.objects.select_related('user').filter(
+            user__is_active=True, product__isnull=False).first()
+        if admin is None or supplier is None:
+            raise CommandError('Needs an active superuser and an active supplier with products '
+                               '(see createsuperuser and generate_synthetic_data).')
+        product = Product.objects.filter(supplier=supplier).first()
+
+        clients = {'anonymous': Client(), 'admin': Client(), 'supplier': Client()}
+        clients['admin'].force_login(admin)
+        clients['supplier'].force_login(supplier.user)
+        substitutions = {'word': product.name.split()[-1], 'supplier': supplier.user.username[:6]}
+        kwargs = {'supplier_id': supplier.pk, 'product_id': product.pk, 'pk': product.pk}
+
+        results = []
+        with override_settings(ALLOWED_HOSTS=list(settings.ALLOWED_HOSTS) + ['testserver']):
+            for pattern in urls.urlpatterns:
+                if not isinstance(pattern, URLPattern) or pattern.name in SKIPPED_URLS:
+                    continue
+                view_class = getattr(pattern.callback, 'view_class', None)
+                if view_class is not None and not hasattr(view_class, 'get'):
+                    continue
+                if options['only'] is not None and pattern.name not in options['only']:
+                    continue
+                url = reverse(pattern.name, kwargs={
+                    name: kwargs[name] for name in pattern.pattern.converters})
+                client = clients[self.role(url)]
+                for query in [''] + VARIANTS.get(pattern.name, []):
+                    target = url + ('?' + query.format(**substitutions) if query else '')
+                    results.append(self.benchmark(client, pattern.name, target, options))
+
+        report = {
+            'revision': git_revision(),
+            'created_at': timezone.now().isoformat(),
+            'rows': {'products': Product.objects.count(), 'suppliers': Supplier.objects.count()},
+            'requests': options['requests'],
+            'endpoints': results,
+        }
+        if options['compare']:
+            self.compare(report, options['compare'])
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                file.write(output + '\n')
+            self.stderr.write('Wrote %s endpoint results to %s.' % (len(results), options['output']))
+        else:
+            self.stdout.write(output)
+
+    @staticmethod
+    def role(url):
+        if url.startswith(('/ims/', '/api/')):
+            return 'admin'
+        if url.startswith('/supplier/'):
+            return 'supplier'
+        return 'anonymous'
+
+    def request(self, client, url):
+        response = client.get(url)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def benchmark(self, client, name, url, options):
+        for _ in range(options['warmup']):
+            response = self.request(client, url)
+
+        timings, queries = [], []
+        for _ in range(options['requests']):
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = self.request(client, url)
+                timings.append((time.perf_counter() - start) * 1000)
+            queries.append(len(captured))
+
+        tracemalloc.start()
+        try:
+            self.request(client, url)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+        return {
+            'name': name,
+            'url': url,
+            'status': response.status_code,
+            'p50_ms': round(percentile(timings, 50), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'p99_ms': round(percentile(timings, 99), 3),
+            'mean_ms': round(sum(timings) / len(timings), 3),
+            'queries': max(queries),
+            'peak_memory_kb': round(peak / 1024, 1),
+        }
+
+    def compare(self, report, path):
+        try:
+            with open(path) as file:
+                previous = {entry['url']: entry for entry in json.load(file)['endpoints']}
+        except (OSError, ValueError, KeyError) as error:
+            raise CommandError('Cannot read %s: %s' % (path, error))
+        report['compared_to'] = path
+        for entry in report['endpoints']:
+            before = previous.get(entry['url'])
+            if before:
+                entry['p50_ratio'] = round(entry['p50_ms'] / before['p50_ms'], 3) if before['p50_ms'] else None
+                entry['p95_ratio'] = round(entry['p95_ms'] / before['p95_ms'], 3) if before['p95_ms'] else None
+                entry['queries_delta'] = entry['queries'] - before['queries']
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from IMS_app import ledger
+
+
+class Command(BaseCommand):
+    """
+    Writes a stock snapshot checkpoint so point-in-time stock queries only read a bounded tail of the ledger.
+
+    Usage:
+    - python manage.py compact_stock_ledger                       (checkpoint shortly before now)
+    - python manage.py compact_stock_ledger --cutoff 2024-01-31T23:59:59+00:00
+    - python manage.py compact_stock_ledger --reconcile           (first record adjustments for untracked stock)
+    """
+
+    help = 'Compacts the stock movement ledger into per-product snapshots at a checkpoint.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cutoff', help='ISO 8601 checkpoint time (defaults to a minute ago).')
+        parser.add_argument(
+            '--reconcile', action='store_true',
+            help='Record adjustment movements for stock the ledger does not account for before compacting.')
+
+    def handle(self, *args, **options):
+        cutoff = None
+        if options['cutoff']:
+            cutoff = parse_datetime(options['cutoff'])
+            if cutoff is None or cutoff.tzinfo is None:
+                raise CommandError('--cutoff must be an ISO 8601 datetime with a timezone.')
+
+        if options['reconcile']:
+            adjustments = ledger.reconcile()
+            self.stdout.write('Recorded %s adjustment movements.' % len(adjustments))
+
+        try:
+            count = ledger.compact(cutoff)
+        except ValueError as error:
+            raise CommandError(str(error))
+        self.stdout.write(self.style.SUCCESS('Wrote %s stock snapshots.' % count))
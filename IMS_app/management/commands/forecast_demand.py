@@ -0,0 +1,57 @@
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from IMS_app import forecast, worker
+
+
+class Command(BaseCommand):
+    """
+    Forecasts the daily demand of every inventory row (see forecast.py) and stores it, e.g. nightly from cron.
+    The inventory report shows the projected stock-out dates.
+
+    The inventory is split into chunks of `--chunk-size` products, forecast in `--concurrency` worker
+    processes (0 runs them in this process). With `--background` one job per chunk is queued instead, for
+    the run_jobs worker pool.
+
+    Usage:
+    - python manage.py forecast_demand --concurrency 4
+    - python manage.py forecast_demand --background
+    """
+
+    help = 'Forecasts the daily demand of all inventory rows with exponential smoothing or Croston\'s method.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'IMS_JOB_CONCURRENCY', 2),
+                            help='Worker processes, 0 to forecast in this process (default IMS_JOB_CONCURRENCY).')
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help='Products per chunk (default IMS_FORECAST_CHUNK_SIZE).')
+        parser.add_argument('--background', action='store_true', help='Queue one job per chunk for run_jobs.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 0 or (options['chunk_size'] is not None and options['chunk_size'] < 1):
+            raise CommandError('--concurrency must not be negative and --chunk-size must be at least 1.')
+        if options['background']:
+            queued = forecast.enqueue_chunks(size=options['chunk_size'])
+            self.stdout.write(self.style.SUCCESS('Queued %s forecast jobs.' % len(queued)))
+            return
+
+        start = time.perf_counter()
+        end = timezone.now()
+        chunks = forecast.product_chunks(options['chunk_size'])
+        firsts, lasts = [chunk[0] for chunk in chunks], [chunk[1] for chunk in chunks]
+        if options['concurrency'] == 0:
+            results = [forecast.forecast_chunk(first, last, end=end) for first, last in chunks]
+        else:
+            # Spawned rather than forked, as in run_jobs: a forked process would share the open connections.
+            with ProcessPoolExecutor(max_workers=options['concurrency'], initializer=worker.setup,
+                                     mp_context=multiprocessing.get_context('spawn')) as pool:
+                results = list(pool.map(worker.forecast_chunk, firsts, lasts, [end] * len(chunks)))
+        self.stdout.write(self.style.SUCCESS(
+            'Forecast the demand of %s inventory rows (%s with demand) in %s chunks in %.2f seconds.' % (
+                sum(result['rows'] for result in results), sum(result['forecast'] for result in results),
+                len(chunks), time.perf_counter() - start)))
@@ -0,0 +1,153 @@
+import random
+from itertools import accumulate
+from decimal import Decimal
+from uuid import uuid4
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from IMS_app import ledger, pricing, search, supplier_names, valuation, versions
+from IMS_app.models import Inventory, Product, StockMovement, Supplier
+
+FIRST_NAMES = [
+    'Aarav', 'Priya', 'Rahul', 'Anjali', 'Vikram', 'Sneha', 'Arjun', 'Meera', 'Karan', 'Divya',
+    'Rohan', 'Kavya', 'Aditya', 'Nisha', 'Sanjay', 'Pooja', 'Manoj', 'Lakshmi', 'Farhan', 'Asha',
+]
+LAST_NAMES = ['Sharma', 'Nair', 'Patel', 'Reddy', 'Iyer', 'Khan', 'Menon', 'Gupta', 'Das', 'Pillai']
+ADJECTIVES = [
+    'Premium', 'Classic', 'Compact', 'Heavy Duty', 'Eco', 'Deluxe', 'Standard', 'Pro', 'Mini', 'Ultra',
+    'Portable', 'Industrial', 'Smart', 'Organic', 'Rugged',
+]
+MATERIALS = ['Steel', 'Cotton', 'Bamboo', 'Plastic', 'Copper', 'Ceramic', 'Glass', 'Leather', 'Aluminium', 'Oak']
+NOUNS = [
+    'Bottle', 'Hammer', 'Notebook', 'Lamp', 'Chair', 'Kettle', 'Backpack', 'Cable', 'Mug', 'Drill',
+    'Towel', 'Speaker', 'Bucket', 'Shelf', 'Charger', 'Pan', 'Jacket', 'Stapler', 'Fan', 'Mat',
+]
+PHRASES = [
+    'built for everyday use', 'with a two year warranty', 'sourced from local manufacturers',
+    'ideal for homes and offices', 'tested for durability', 'easy to clean', 'available in bulk packs',
+    'lightweight and sturdy', 'energy efficient design', 'packed in recyclable material',
+]
+
+
+def zipf_weights(count, exponent=1.1):
+    """
+    Returns cumulative Zipf-like weights (for random.choices), so a few values are very common and most
+    are rare, as in real catalogs.
+    """
+    return list(accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+class Command(BaseCommand):
+    """
+    Generates a synthetic dataset of suppliers, products and inventory rows with bulk inserts.
+
+    Product names and descriptions are drawn from word lists with Zipf-like frequencies, prices from a
+    log-normal distribution and stock levels so that most inventory rows are well stocked and a small share
+    is low on stock. Derived data (search index, valuation summary, stock ledger, API versions) is rebuilt
+    once at the end instead of per row.
+
+    Usage:
+    - python manage.py generate_synthetic_data --suppliers 200 --products 50000 --inventory 20000 --seed 1
+    """
+
+    help = 'Bulk generates synthetic suppliers, products and inventory rows for load testing.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--suppliers', type=int, default=100, help='Number of suppliers (default 100).')
+        parser.add_argument('--products', type=int, default=10000, help='Number of products (default 10000).')
+        parser.add_argument('--inventory', type=int, default=5000,
+                            help='Number of inventory rows, at most one per product (default 5000).')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per INSERT (default 1000).')
+        parser.add_argument('--seed', type=int, help='Random seed, for reproducible datasets.')
+        parser.add_argument('--password', default='password', help='Password of the generated supplier users.')
+
+    def handle(self, *args, **options):
+        suppliers, products, inventory = options['suppliers'], options['products'], options['inventory']
+        if suppliers < 1 and products:
+            raise CommandError('Products need at least one supplier.')
+        if inventory > products:
+            raise CommandError('--inventory cannot exceed --products (one inventory row per product).')
+        if min(suppliers, products, inventory) < 0 or options['batch_size'] < 1:
+            raise CommandError('Counts must not be negative and the batch size must be positive.')
+
+        rng = random.Random(options['seed'])
+        batch_size = options['batch_size']
+        # Unique per run, so the command can be run repeatedly against the same database.
+        tag = uuid4().hex[:8]
+
+        with transaction.atomic():
+            supplier_ids = self.create_suppliers(rng, tag, suppliers, options['password'], batch_size)
+            product_rows = self.create_products(rng, supplier_ids, products, batch_size)
+            inventory_rows = self.create_inventory(rng, product_rows, inventory, batch_size)
+            # bulk_create skips the signals that fill in the supplier names; rows that already have theirs are not written.
+            supplier_names.sync()
+
+            ledger.record_movements(
+                [ledger.movement(product_id, ledger.SUPPLIER, stock, StockMovement.CREATED)
+                 for product_id, unit_price, stock in product_rows]
+                + [ledger.movement(product_id, ledger.INVENTORY, stock, StockMovement.CREATED)
+                   for product_id, stock in inventory_rows])
+            valuation.rebuild_summary()
+            versions.bump(versions.INVENTORY, versions.PRODUCT, versions.SUPPLIER)
+        search.rebuild_search_indexes(DEFAULT_DB_ALIAS)
+
+        self.stdout.write(self.style.SUCCESS(
+            'Created %s suppliers, %s products and %s inventory rows (tag %s).'
+            % (len(supplier_ids), len(product_rows), len(inventory_rows), tag)))
+
+    def create_suppliers(self, rng, tag, count, password, batch_size):
+        password = make_password(password)
+        users = []
+        for index in range(count):
+            first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+            username = '%s.%s.%s-%s' % (first_name.lower(), last_name.lower(), tag, index)
+            users.append(User(
+                username=username, first_name=first_name, last_name=last_name,
+                email='%s@example.com' % username, password=password, is_active=rng.random() > 0.05))
+        User.objects.bulk_create(users, batch_size=batch_size)
+        # Looked up by the run tag rather than an IN list, which would exceed SQLite's parameter limit.
+        user_ids = User.objects.filter(username__contains=tag).order_by('pk').values_list('pk', flat=True)
+
+        Supplier.objects.bulk_create([
+            Supplier(user_id=user_id, phone_number='%s-%06d' % (tag, index),
+                     address='%d %s Street, Block %s' % (rng.randint(1, 999), rng.choice(LAST_NAMES), index % 50))
+            for index, user_id in enumerate(user_ids)
+        ], batch_size=batch_size)
+        return list(Supplier.objects.filter(user__username__contains=tag).order_by('pk').values_list('pk', flat=True))
+
+    def create_products(self, rng, supplier_ids, count, batch_size):
+        adjective_weights = zipf_weights(len(ADJECTIVES))
+        noun_weights = zipf_weights(len(NOUNS))
+        # A few large suppliers carry most of the catalog.
+        supplier_weights = zipf_weights(len(supplier_ids), exponent=0.8)
+        start = Product.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+
+        products = []
+        for _ in range(count):
+            name = '%s %s %s' % (
+                rng.choices(ADJECTIVES, cum_weights=adjective_weights)[0], rng.choice(MATERIALS),
+                rng.choices(NOUNS, cum_weights=noun_weights)[0])
+            description = '%s %s.' % (name, ' and '.join(rng.sample(PHRASES, rng.randint(1, 3))))
+            unit_price = Decimal(str(round(min(max(rng.lognormvariate(5, 1.2), 1), 99999), 2)))
+            stock = int(rng.expovariate(1 / 120))
+            products.append(Product(
+                supplier_id=rng.choices(supplier_ids, cum_weights=supplier_weights)[0], name=name, description=description,
+                unit_price=unit_price, stock=stock, active_status=stock > 0 and rng.random() > 0.03))
+        Product.objects.bulk_create(products, batch_size=batch_size)
+        return list(Product.objects.filter(pk__gt=start).order_by('pk').values_list('pk', 'unit_price', 'stock'))
+
+    def create_inventory(self, rng, product_rows, count, batch_size):
+        inventory = []
+        markup, rounding = pricing.global_rule()
+        for product_id, unit_price, _ in rng.sample(product_rows, count):
+            # Roughly 10% low stock, 3% very low stock, the rest well stocked.
+            roll = rng.random()
+            stock = rng.randint(0, 4) if roll < 0.03 else rng.randint(5, 19) if roll < 0.1 else rng.randint(20, 500)
+            inventory.append(Inventory(
+                product_id=product_id, stock=stock,
+                selling_unit_price=pricing.selling_price(unit_price, markup, rounding)))
+        Inventory.objects.bulk_create(inventory, batch_size=batch_size)
+        return [(row.product_id, row.stock) for row in inventory]
@@ -0,0 +1,192 @@
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from copy import deepcopy
+from decimal import Decimal
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, transaction
+from django.db.backends.signals import connection_created
+from django.db.models import F
+from django.db.utils import OperationalError
+
+from IMS_app.instrumentation import percentile
+from IMS_app.models import Inventory, Product, Supplier
+from IMS_app.stock import low_stock_filter
+
+
+def profiles():
+    """
+    Returns the database settings (without NAME) of the profiles the load test compares.
+    """
+    return {
+        'development': {'ENGINE': 'django.db.backends.sqlite3'},
+        'production': {
+            'ENGINE': 'IMS_app.db_backends.sqlite3',
+            'OPTIONS': deepcopy(settings.IMS_SQLITE_PRODUCTION_OPTIONS),
+            'CONN_MAX_AGE': 600,
+            'CONN_HEALTH_CHECKS': True,
+        },
+    }
+
+
+class Command(BaseCommand):
+    """
+    Multi-threaded read/write load test comparing the SQLite database profiles of settings.py.
+
+    Every profile gets a scratch database file with the same rows. Worker threads then run a mix of reads
+    (a dashboard page of inventory rows with their products, and a product count) and writes (purchases,
+    which start with an UPDATE, and edits, which read the product before writing it, like a form save) for
+    a fixed time. Connections are recycled after every operation as at the end of a request, so
+    CONN_MAX_AGE applies. The report gives the throughput, latency percentiles, "database is locked"
+    errors and connections opened per profile.
+
+    Usage:
+    - python manage.py load_test_database --threads 8 --seconds 10
+    """
+
+    help = 'Compares the throughput and lock errors of the SQLite database profiles under concurrent load.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent worker threads (default 8).')
+        parser.add_argument('--seconds', type=float, default=5, help='Duration per profile (default 5).')
+        parser.add_argument('--write-ratio', type=float, default=0.3,
+                            help='Share of operations that write (default 0.3).')
+        parser.add_argument('--products', type=int, default=500, help='Products in the scratch database (default 500).')
+        parser.add_argument('--profiles', nargs='+', default=['development', 'production'],
+                            help='Profiles to compare (development, production).')
+
+    def handle(self, *args, **options):
+        available = profiles()
+        unknown = set(options['profiles']) - set(available)
+        if unknown:
+            raise CommandError('Unknown profiles: %s.' % ', '.join(sorted(unknown)))
+        if options['threads'] < 1 or options['products'] < 1 or not 0 <= options['write_ratio'] <= 1:
+            raise CommandError('--threads and --products must be positive and --write-ratio between 0 and 1.')
+
+        results = []
+        with tempfile.TemporaryDirectory() as directory:
+            for name in options['profiles']:
+                path = os.path.join(directory, '%s.sqlite3' % name)
+                results.append(self.run_profile(name, dict(available[name], NAME=path), options))
+
+        report = {
+            'threads': options['threads'],
+            'seconds': options['seconds'],
+            'write_ratio': options['write_ratio'],
+            'profiles': results,
+        }
+        self.stdout.write(json.dumps(report, indent=2))
+
+    def run_profile(self, name, database, options):
+        alias = 'load_test_%s' % name
+        connections.settings[alias] = connections.configure_settings({DEFAULT_DB_ALIAS: {}, alias: database})[alias]
+        opened = []
+
+        def count_connection(sender, connection, **kwargs):
+            if connection.alias == alias:
+                opened.append(1)
+
+        connection_created.connect(count_connection, weak=False)
+        try:
+            product_ids = self.create_rows(alias, options['products'])
+            connections[alias].close()
+            opened.clear()
+            result = self.run_workers(alias, product_ids, options)
+            with connections[alias].cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                journal_mode = cursor.fetchone()[0]
+            connections[alias].close()
+        finally:
+            connection_created.disconnect(count_connection)
+            del connections[alias]
+            del connections.settings[alias]
+        return dict({'profile': name, 'journal_mode': journal_mode, 'connections_opened': len(opened)}, **result)
+
+    def create_rows(self, alias, count):
+        with connections[alias].schema_editor() as editor:
+            for model in (User, Supplier, Product, Inventory):
+                editor.create_model(model)
+        User.objects.using(alias).bulk_create([User(username='load-%s' % index) for index in range(10)])
+        Supplier.objects.using(alias).bulk_create([
+            Supplier(user_id=user_id, phone_number=str(user_id), address='Load test')
+            for user_id in User.objects.using(alias).values_list('pk', flat=True)])
+        supplier_ids = list(Supplier.objects.using(alias).values_list('pk', flat=True))
+        Product.objects.using(alias).bulk_create([
+            Product(supplier_id=supplier_ids[index % len(supplier_ids)], name='Product %s' % index,
+                    description='Load test product', unit_price=Decimal('10.00'), stock=10 ** 6, active_status=True)
+            for index in range(count)], batch_size=500)
+        product_ids = list(Product.objects.using(alias).values_list('pk', flat=True))
+        Inventory.objects.using(alias).bulk_create([
+            Inventory(product_id=product_id, selling_unit_price=Decimal('13.00'), stock=index % 40)
+            for index, product_id in enumerate(product_ids)], batch_size=500)
+        return product_ids
+
+    def run_workers(self, alias, product_ids, options):
+        reads, writes, lock_errors, errors = [], [], [], []
+        barrier = threading.Barrier(options['threads'])
+
+        def worker():
+            rng = random.Random()
+            barrier.wait()
+            deadline = time.perf_counter() + options['seconds']
+            try:
+                while time.perf_counter() < deadline:
+                    write = rng.random() < options['write_ratio']
+                    start = time.perf_counter()
+                    try:
+                        if write:
+                            self.write(alias, rng.choice(product_ids), rng)
+                        else:
+                            self.read(alias)
+                    except OperationalError as error:
+                        if 'locked' not in str(error):
+                            raise
+                        lock_errors.append(1)
+                    else:
+                        (writes if write else reads).append((time.perf_counter() - start) * 1000)
+                    # What the request_finished signal does at the end of every request.
+                    close_old_connections()
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections[alias].close()
+
+        threads = [threading.Thread(target=worker) for _ in range(options['threads'])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if errors:
+            raise CommandError('Load test worker failed: %r' % errors[0])
+
+        operations = len(reads) + len(writes)
+        return {
+            'operations': operations,
+            'operations_per_second': round(operations / options['seconds'], 1),
+            'reads': len(reads),
+            'writes': len(writes),
+            'lock_errors': len(lock_errors),
+            'read_p95_ms': round(percentile(reads, 95), 3) if reads else None,
+            'write_p95_ms': round(percentile(writes, 95), 3) if writes else None,
+        }
+
+    def read(self, alias):
+        list(Inventory.objects.using(alias).filter(low_stock_filter()).select_related(
+            'product__supplier__user').order_by('stock', 'pk')[:50])
+        Product.objects.using(alias).filter(active_status=True).count()
+
+    def write(self, alias, product_id, rng):
+        with transaction.atomic(using=alias):
+            if rng.random() < 0.5:
+                Product.objects.using(alias).filter(pk=product_id, stock__gte=1).update(stock=F('stock') - 1)
+                Inventory.objects.using(alias).filter(product_id=product_id).update(stock=F('stock') + 1)
+            else:
+                product = Product.objects.using(alias).get(pk=product_id)
+                Product.objects.using(alias).filter(pk=product_id).update(
+                    description='Edited %s' % rng.randint(1, 10 ** 6), unit_price=product.unit_price)
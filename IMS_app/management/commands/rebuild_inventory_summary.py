@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from IMS_app import valuation
+
+
+class Command(BaseCommand):
+    """
+    Rebuilds the incrementally maintained inventory summary from a single aggregate query.
+
+    Usage:
+    - python manage.py rebuild_inventory_summary          (replace the summary)
+    - python manage.py rebuild_inventory_summary --check  (only report differences, fail if any)
+    """
+
+    help = 'Rebuilds the inventory valuation summary from scratch, or verifies it with --check.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Compare the maintained summary with a fresh aggregate instead of replacing it.')
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            total, totals = valuation.rebuild_summary()
+            self.stdout.write(self.style.SUCCESS(
+                'Rebuilt summary for %s suppliers: %s units, stock value %s, purchase cost %s.'
+                % (len(totals), total[0], total[1], total[2])))
+            return
+
+        expected = valuation.aggregate_summary()
+        expected_total = tuple(sum(values) for values in zip(*expected.values())) if expected else (0, 0, 0)
+        stored_total, stored = valuation.stored_summary()
+
+        mismatches = []
+        if tuple(stored_total) != tuple(expected_total):
+            mismatches.append('global: stored %s, expected %s' % (stored_total, expected_total))
+        for supplier_id in sorted(set(expected) | set(stored)):
+            stored_values = stored.get(supplier_id, (0, 0, 0))
+            expected_values = expected.get(supplier_id, (0, 0, 0))
+            if tuple(stored_values) != tuple(expected_values):
+                mismatches.append('supplier %s: stored %s, expected %s' % (supplier_id, stored_values, expected_values))
+
+        if mismatches:
+            for mismatch in mismatches:
+                self.stderr.write(mismatch)
+            raise CommandError('Inventory summary is out of date (%s mismatches).' % len(mismatches))
+        self.stdout.write(self.style.SUCCESS('Inventory summary is up to date.'))
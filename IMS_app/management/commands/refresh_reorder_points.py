@@ -0,0 +1,42 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from IMS_app import reorder
+
+
+class Command(BaseCommand):
+    """
+    Recomputes the daily demand, safety stock, reorder point and days of cover of every inventory row
+    from the stock ledger (see reorder.refresh), e.g. nightly from cron. The same refresh can be queued
+    on demand as a background job.
+
+    Usage:
+    - python manage.py refresh_reorder_points
+    - python manage.py refresh_reorder_points --lead-time 14 --service-level 0.99 --history-days 180
+    """
+
+    help = 'Recomputes the reorder points, safety stock and days of cover of all inventory rows.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lead-time', type=float, default=None,
+                            help='Replenishment lead time in days (default IMS_REORDER_LEAD_TIME_DAYS).')
+        parser.add_argument('--service-level', type=float, default=None,
+                            help='Probability of not running out during the lead time '
+                                 '(default IMS_REORDER_SERVICE_LEVEL).')
+        parser.add_argument('--history-days', type=int, default=None,
+                            help='Days of outflows the demand is estimated from (default IMS_REORDER_HISTORY_DAYS).')
+
+    def handle(self, *args, **options):
+        if options['lead_time'] is not None and options['lead_time'] < 0:
+            raise CommandError('--lead-time must not be negative.')
+        if options['service_level'] is not None and not 0 < options['service_level'] < 1:
+            raise CommandError('--service-level must be between 0 and 1.')
+        if options['history_days'] is not None and options['history_days'] < 1:
+            raise CommandError('--history-days must be at least 1.')
+        start = time.perf_counter()
+        result = reorder.refresh(
+            lead_time=options['lead_time'], level=options['service_level'], days=options['history_days'])
+        self.stdout.write(self.style.SUCCESS(
+            'Updated the reorder points of %s of %s inventory rows in %.2f seconds.'
+            % (result['updated'], result['rows'], time.perf_counter() - start)))
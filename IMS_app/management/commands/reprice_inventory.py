@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from IMS_app.pricing import reprice
+
+
+class Command(BaseCommand):
+    """
+    Re-applies the pricing rules to every inventory row, e.g. after the IMS_DEFAULT_MARKUP_PERCENTAGE setting
+    changed or rules were written with queryset updates. Saving a rule reprices its rows by itself.
+
+    Usage:
+    - python manage.py reprice_inventory
+    - python manage.py reprice_inventory --supplier 4 --supplier 7
+    """
+
+    help = 'Sets the selling unit price of the inventory rows to the price of the pricing rules.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--supplier', type=int, action='append', dest='suppliers',
+                            help='Only reprice the products of this supplier (repeatable).')
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        repriced = reprice(suppliers=options['suppliers'])
+        self.stdout.write(self.style.SUCCESS(
+            'Repriced %s inventory rows in %.2f seconds.' % (repriced, time.perf_counter() - start)))
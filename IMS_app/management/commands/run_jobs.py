@@ -0,0 +1,104 @@
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from IMS_app import jobs, worker
+from IMS_app.checks import cache_is_shared
+
+
+class Command(BaseCommand):
+    """
+    Background job worker: claims the queued jobs (see jobs.py) and runs them in a pool of processes.
+
+    Up to `--concurrency` jobs run at once, each in a worker process of its own, so a CPU-bound export does not
+    hold up the others. Jobs are claimed with an atomic UPDATE, so several workers (on one or more machines
+    sharing the database) can serve the same queue. While a job runs the worker refreshes its heartbeat;
+    jobs whose worker died are requeued once their heartbeat is IMS_JOB_STALE_AFTER seconds old.
+    With `--concurrency 0` the jobs run one at a time in the command's own process. Worker processes need
+    a shared cache (see the CACHES setting), which the command warns about otherwise.
+
+    Usage:
+    - python manage.py run_jobs --concurrency 4
+    - python manage.py run_jobs --burst
+    """
+
+    help = 'Runs the queued background jobs in a pool of worker processes.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'IMS_JOB_CONCURRENCY', 2),
+                            help='Jobs run at once, 0 to run them in this process (default IMS_JOB_CONCURRENCY).')
+        parser.add_argument('--burst', action='store_true', help='Exit once no job is due instead of waiting.')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds between two looks at the queue when it is empty (default 1).')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 0 or options['poll_interval'] <= 0:
+            raise CommandError('--concurrency must not be negative and --poll-interval must be positive.')
+        name = jobs.worker_name()
+        if options['concurrency'] == 0:
+            count = self.run_inline(name, options)
+        else:
+            if not cache_is_shared():
+                self.stderr.write('The cache is local to each process: the worker processes cannot drop the '
+                                  'cached pages of the rows they change. Set IMS_CACHE_BACKEND to Redis or memcached.')
+            count = self.run_pool(name, options)
+        self.stdout.write('Ran %s jobs.' % count)
+
+    def run_inline(self, name, options):
+        count = 0
+        while True:
+            jobs.requeue_stale()
+            count += jobs.run_pending(name)
+            if options['burst']:
+                return count
+            time.sleep(options['poll_interval'])
+
+    def start_pool(self, concurrency):
+        # Spawned rather than forked: a forked process would share the parent's open database connections.
+        return ProcessPoolExecutor(
+            max_workers=concurrency, mp_context=multiprocessing.get_context('spawn'), initializer=worker.setup)
+
+    def run_pool(self, name, options):
+        concurrency = options['concurrency']
+        pool = self.start_pool(concurrency)
+        running = {}
+        count = 0
+        try:
+            while True:
+                jobs.requeue_stale()
+                jobs.heartbeat(job.pk for job in running.values())
+                while len(running) < concurrency:
+                    job = jobs.claim(name)
+                    if job is None:
+                        break
+                    running[pool.submit(worker.run, job.pk)] = job
+                if not running:
+                    if options['burst']:
+                        return count
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                done, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                broken = False
+                for future in done:
+                    job = running.pop(future)
+                    count += 1
+                    try:
+                        status = future.result()
+                    except BrokenProcessPool:
+                        # The process running the job died (e.g. killed for using too much memory).
+                        broken = True
+                        status = jobs.fail(job, 'The worker process running the job died.')
+                    except Exception:
+                        status = jobs.fail(job, traceback.format_exc())
+                    self.stderr.write('Job %s (%s): %s' % (job.pk, job.kind, status))
+                if broken:
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    pool = self.start_pool(concurrency)
+        finally:
+            pool.shutdown(wait=True, cancel_futures=True)
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from IMS_app.stock import low_stock_threshold, sync_low_stock_thresholds
+
+
+class Command(BaseCommand):
+    """
+    Re-applies the low stock thresholds to the inventory after the IMS_LOW_STOCK_THRESHOLD setting changed.
+
+    Usage:
+    - python manage.py sync_low_stock_thresholds
+    """
+
+    help = 'Updates the stored effective low stock threshold of every inventory row.'
+
+    def handle(self, *args, **options):
+        updated = sync_low_stock_thresholds()
+        self.stdout.write(self.style.SUCCESS(
+            'Updated %s inventory rows to the current thresholds (global threshold %s).'
+            % (updated, low_stock_threshold())))
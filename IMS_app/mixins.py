@@ -1,5 +1,9 @@
+from asgiref.sync import sync_to_async
 from django.core.exceptions import PermissionDenied
-from .models import Supplier
+from .identity import aget_identity, aget_user, get_identity, supplier_is_current
+from .pagination import KeysetPaginator
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
 
 
 class AdminLoginMixin:
@@ -19,11 +23,75 @@ class SupplierLoginMixin:
     """
     Mixin for views that require an authenticated user associated with a supplier to access.
     If the user is not authenticated or is not associated with a supplier, a PermissionDenied exception is raised.
+    The supplier is resolved from the session (see identity.get_identity) and exposed as `request.supplier_id`.
+    Requests that may write (other than GET, HEAD and OPTIONS) also check the supplier against the database.
     """
     def dispatch(self, request, *args, **kwargs):
-        user = self.request.user
-        supplier = Supplier.objects.filter(user=user).first()
-        if user.is_authenticated and supplier:
+        identity = get_identity(request)
+        if identity and identity['supplier_id'] and (request.method in SAFE_METHODS or supplier_is_current(request)):
             return super().dispatch(request, *args, **kwargs)
         else:
             raise PermissionDenied
+
+
+class AsyncAdminLoginMixin:
+    """
+    Async counterpart of AdminLoginMixin for views whose handlers are coroutines.
+    The user is loaded off the event loop (see identity.aget_user), so later `request.user` reads do not query.
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        user = await aget_user(request)
+        if user.is_authenticated and user.is_superuser:
+            return await super().dispatch(request, *args, **kwargs)
+        else:
+            raise PermissionDenied
+
+
+class AsyncSupplierLoginMixin:
+    """
+    Async counterpart of SupplierLoginMixin for views whose handlers are coroutines.
+    """
+    async def dispatch(self, request, *args, **kwargs):
+        identity = await aget_identity(request)
+        if identity and identity['supplier_id'] and (
+                request.method in SAFE_METHODS or await sync_to_async(supplier_is_current)(request)):
+            return await super().dispatch(request, *args, **kwargs)
+        else:
+            raise PermissionDenied
+
+
+class KeysetPaginationMixin:
+    """
+    Mixin for list views that paginate with cursors (see KeysetPaginator) instead of page numbers.
+    The `after` and `before` query parameters carry the cursor; every other query parameter
+    (search, sort_by, filters) is preserved in the next/previous page links.
+    """
+    paginate_by = 50
+
+    def paginate_queryset(self, queryset, ordering):
+        after = self.request.GET.get('after')
+        before = self.request.GET.get('before')
+        paginator = KeysetPaginator(queryset, ordering, per_page=self.paginate_by)
+        page = paginator.get_page(after=after, before=before)
+        return self.set_page_urls(page)
+
+    async def apaginate_queryset(self, queryset, ordering):
+        after = self.request.GET.get('after')
+        before = self.request.GET.get('before')
+        paginator = KeysetPaginator(queryset, ordering, per_page=self.paginate_by)
+        page = await paginator.aget_page(after=after, before=before)
+        return self.set_page_urls(page)
+
+    def set_page_urls(self, page):
+        page.next_url = self.get_page_url('after', page.next_cursor)
+        page.previous_url = self.get_page_url('before', page.previous_cursor)
+        return page
+
+    def get_page_url(self, direction, cursor):
+        if not cursor:
+            return None
+        params = self.request.GET.copy()
+        params.pop('after', None)
+        params.pop('before', None)
+        params[direction] = cursor
+        return '?' + params.urlencode()
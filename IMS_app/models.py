@@ -1,8 +1,21 @@
+from django.conf import settings
 from django.db import models
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator
+from datetime import timedelta
 from decimal import Decimal
 from django.core.exceptions import ValidationError
+from django.db.models import Q, Value
+from django.db.models.functions import Coalesce, Length
+from django.db.models.lookups import LessThanOrEqual
+from django.utils import timezone
+
+def default_low_stock_threshold():
+    """
+    Returns the global low stock threshold (the IMS_LOW_STOCK_THRESHOLD setting).
+    """
+    return getattr(settings, 'IMS_LOW_STOCK_THRESHOLD', 20)
+
 
 class Supplier(models.Model):
     """
@@ -16,20 +29,25 @@ class Supplier(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE)
     phone_number = models.CharField(max_length=20,unique=True)
     address = models.TextField()
+
+    class Meta:
+        constraints = [
+            # SQLite does not enforce the VARCHAR length.
+            models.CheckConstraint(
+                check=LessThanOrEqual(Length('phone_number'), 20), name='supplier_phone_number_max_length',
+                violation_error_message='Phone number length must be less than or equal to 20.'),
+        ]
     
     def clean(self):
         """
-        Custom clean method to validate the length of the phone number.
+        Custom clean method to validate the length of the phone number, for a friendly form error.
+        The database enforces the same rule with a CHECK constraint.
         Raises:
             ValidationError: If phone number length is greater than 20 characters.
         """
         if self.phone_number and len(self.phone_number)>20:
             raise ValidationError({'phone_number': ['Phone number length must be less than or equal to 20.']})
 
-    def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return f"{self.id} - {self.user.username}"
     
@@ -45,14 +63,14 @@ class Product(models.Model):
         unit_price (Decimal): The unit price of the product. Must be greater than or equal to 0.01.
         stock (int): The current stock quantity of the product.
         active_status (bool): Indicates if the product is active or not.
+        supplier_name (str): The username of the supplier's user, kept in sync on save and by
+            supplier_names.sync, so the product can be searched and sorted by supplier without joins.
 
     Note:
-        - The `unit_price` field enforces a minimum value constraint of 0.01.
-        - The `name` field is a required field and cannot be blank or null. If not provided,
-            a `ValidationError` will be raised during the `clean` method.
-        - The `clean` method additionally checks for negative values in the `unit_price` field.
-        - In SQLite, if a text field is defined as not null and a constraint is not met (e.g., an empty string),
-            the `clean` method raises a `ValidationError` to ensure data integrity.
+        - The `unit_price` minimum of 0.01 and the non-empty `name` are CHECK constraints, so they hold for
+            bulk_create, bulk_update and queryset.update() as well; a violating write raises an IntegrityError.
+        - The `clean` method checks the same rules to give friendly form errors (field validators and
+            constraints run in full_clean, not in save).
     """
     supplier = models.ForeignKey(Supplier, on_delete=models.CASCADE)
     name = models.CharField(max_length=255)
@@ -60,23 +78,36 @@ class Product(models.Model):
     unit_price = models.DecimalField(max_digits=20, decimal_places=2,validators=[MinValueValidator(Decimal('0.01'))])
     stock = models.PositiveIntegerField()
     active_status=models.BooleanField(default=True)
+    supplier_name = models.CharField(max_length=150, blank=True, default='', editable=False)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=Q(unit_price__gte=Decimal('0.01')), name='product_unit_price_min',
+                violation_error_message='Unit price must be greater than or equal to 0.01.'),
+            models.CheckConstraint(
+                check=~Q(name=''), name='product_name_not_empty',
+                violation_error_message='Product name is a required field.'),
+        ]
+        indexes = [
+            # The inventory report sorts by the product columns; the id makes the keyset seek a range search.
+            models.Index(fields=['name', 'id'], name='product_name_id_idx'),
+            models.Index(fields=['unit_price', 'id'], name='product_unit_price_id_idx'),
+            models.Index(fields=['supplier_name', 'id'], name='product_supplier_name_id_idx'),
+        ]
     
     def clean(self):
         """
-        Custom clean method to validate unit price and name fields.
+        Custom clean method to validate unit price and name fields, for friendly form errors.
         Raises:
             ValidationError: If unit price is less than 0.01 or name is not provided.
         """
-        if self.unit_price < Decimal('0.01'):
+        if self.unit_price is not None and self.unit_price < Decimal('0.01'):
             raise ValidationError({'unit_price': ['Unit price must be greater than or equal to 0.01.']})
         
         if not self.name:
             raise ValidationError({'name': ['This is a required field']})
 
-    def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
-
     def __str__(self):
         return f"{self.pk} {self.name}"
     
@@ -90,14 +121,65 @@ class Inventory(models.Model):
         product (Product): The product associated with the inventory.
         selling_unit_price (Decimal): The selling unit price of the product in the inventory.
         stock (int): The current stock quantity of the product in the inventory.
+        low_stock_threshold (int): Stock level below which this product is low on stock.
+            When empty, the IMS_LOW_STOCK_THRESHOLD setting applies.
+        effective_low_stock_threshold (int): The threshold that applies, kept in sync on save so that
+            low stock rows can be found with the partial index below.
+        supplier_name (str): The supplier name of the product, copied from Product.supplier_name.
+        daily_demand (float): Average units leaving the inventory per day over the reorder history window.
+        safety_stock (int): Stock kept to cover demand variability over the replenishment lead time.
+        reorder_point (int): Stock level at which the product should be reordered (lead time demand plus
+            safety stock).
+        days_of_cover (float): Days the current stock lasts at the daily demand; empty without demand.
+        forecast_method (str): The model of the latest demand forecast, simple exponential smoothing or
+            Croston's method for intermittent demand; empty without demand.
+        forecast_daily_demand (float): The forecast units leaving the inventory per day.
+        forecasted_at (datetime): When the forecast was made.
+
+    Note:
+        - The reorder fields are computed for all rows at once by reorder.refresh (the refresh_reorder_points
+            command), not on save; they are empty until the first refresh. The forecast fields are written the
+            same way by forecast.forecast_chunk (the forecast_demand command).
     """
+    SES = 'ses'
+    CROSTON = 'croston'
+    FORECAST_METHOD_CHOICES = [(SES, 'Simple exponential smoothing'), (CROSTON, "Croston's method")]
+
     product = models.OneToOneField(Product, on_delete=models.CASCADE)
     selling_unit_price = models.DecimalField(max_digits=20, decimal_places=2)
     stock = models.PositiveIntegerField()
+    low_stock_threshold = models.PositiveIntegerField(null=True, blank=True)
+    effective_low_stock_threshold = models.PositiveIntegerField(default=default_low_stock_threshold, editable=False)
+    supplier_name = models.CharField(max_length=150, blank=True, default='', editable=False)
+    daily_demand = models.FloatField(null=True, blank=True, editable=False)
+    safety_stock = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    reorder_point = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    days_of_cover = models.FloatField(null=True, blank=True, editable=False)
+    forecast_method = models.CharField(
+        max_length=10, choices=FORECAST_METHOD_CHOICES, blank=True, default='', editable=False)
+    forecast_daily_demand = models.FloatField(null=True, blank=True, editable=False)
+    forecasted_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=Q(selling_unit_price__gte=Decimal('0.01')), name='inventory_selling_unit_price_min',
+                violation_error_message='Unit price must be greater than or equal to 0.01.'),
+        ]
+        indexes = [
+            models.Index(fields=['stock', 'id'], name='inventory_stock_id_idx'),
+            models.Index(fields=['selling_unit_price', 'id'], name='inventory_selling_price_id_idx'),
+            models.Index(fields=['supplier_name', 'id'], name='inventory_supplier_name_id_idx'),
+            # Holds only the rows below their threshold, so it stays tiny on a well-stocked inventory.
+            models.Index(fields=['stock', 'id'],
+                         condition=models.Q(stock__lt=models.F('effective_low_stock_threshold')),
+                         name='inventory_low_stock_idx'),
+        ]
     
     def clean(self):
         """
-        Custom clean method to validate selling unit price.
+        Custom clean method to validate selling unit price, for a friendly form error.
+        The database enforces the same rule with a CHECK constraint.
         Raises:
             ValidationError: If selling unit price is less than 0.01.
         """
@@ -105,8 +187,269 @@ class Inventory(models.Model):
             raise ValidationError({'selling_unit_price': ['Unit price must be greater than or equal to 0.01.']})
 
     def save(self, *args, **kwargs):
-        self.clean()
+        self.effective_low_stock_threshold = (
+            default_low_stock_threshold() if self.low_stock_threshold is None else self.low_stock_threshold)
         super().save(*args, **kwargs)
 
+    @property
+    def projected_stockout(self):
+        """
+        The date the current stock runs out at the forecast daily demand, or None without a forecast demand
+        (or beyond a century).
+        """
+        if not self.forecast_daily_demand:
+            return None
+        days = self.stock / self.forecast_daily_demand
+        if days > 36500:
+            return None
+        return timezone.localdate() + timedelta(days=int(days))
+
+    def __str__(self):
+        return f"{self.product.name} (Inventory)"
+
+class PricingRule(models.Model):
+    """
+    A markup turning the unit price of products into the selling unit price of their inventory rows.
+
+    A rule applies to one product, to every product of one supplier, or (neither set) to every product. The
+    most specific rule wins; without any rule the IMS_DEFAULT_MARKUP_PERCENTAGE setting applies.
+
+    Attributes:
+        supplier (Supplier): The supplier whose products the rule prices, or None.
+        product (Product): The product the rule prices, or None.
+        markup_percentage (Decimal): Percentage added to the unit price, e.g. 30 for unit price × 1.3.
+        rounding (str): How the marked up price is rounded: to the cent, to whole units, or to whole units
+            less a cent (12.40 → 11.99, 12.60 → 12.99).
+
+    Note:
+        - Saving or deleting a rule reprices the inventory rows it covers with one UPDATE (see
+            pricing.reprice). Set-based writes to the rules must call pricing.reprice themselves.
+    """
+    CENT = 'cent'
+    UNIT = 'unit'
+    NINETY_NINE = 'ninety_nine'
+    ROUNDING_CHOICES = [(CENT, 'To the cent'), (UNIT, 'To whole units'), (NINETY_NINE, 'To whole units less a cent')]
+
+    supplier = models.ForeignKey(Supplier, null=True, blank=True, on_delete=models.CASCADE)
+    product = models.ForeignKey(Product, null=True, blank=True, on_delete=models.CASCADE)
+    markup_percentage = models.DecimalField(max_digits=7, decimal_places=2)
+    rounding = models.CharField(max_length=12, choices=ROUNDING_CHOICES, default=CENT)
+
+    class Meta:
+        constraints = [
+            models.CheckConstraint(
+                check=Q(supplier__isnull=True) | Q(product__isnull=True), name='pricing_rule_single_scope',
+                violation_error_message='A pricing rule applies to a supplier or to a product, not both.'),
+            models.CheckConstraint(
+                check=Q(markup_percentage__gt=-100), name='pricing_rule_markup_min',
+                violation_error_message='Markup percentage must be greater than -100.'),
+            models.UniqueConstraint(
+                Coalesce('supplier', Value(0)), Coalesce('product', Value(0)), name='pricing_rule_unique_scope'),
+        ]
+
+    def clean(self):
+        """
+        Custom clean method to validate the scope and markup, for friendly form errors.
+        The database enforces the same rules with CHECK constraints.
+        Raises:
+            ValidationError: If both a supplier and a product are set, or the markup is -100% or less.
+        """
+        if self.supplier_id is not None and self.product_id is not None:
+            raise ValidationError('A pricing rule applies to a supplier or to a product, not both.')
+        if self.markup_percentage is not None and self.markup_percentage <= -100:
+            raise ValidationError({'markup_percentage': ['Markup percentage must be greater than -100.']})
+
+    def __str__(self):
+        scope = (f"product {self.product_id}" if self.product_id else
+                 f"supplier {self.supplier_id}" if self.supplier_id else "all products")
+        return f"{self.markup_percentage}% markup ({scope})"
+
+
+class InventorySummary(models.Model):
+    """
+    Running valuation totals of the inventory, kept up to date incrementally on every stock or price change.
+
+    There is one row per supplier plus one global row (supplier is null).
+
+    Attributes:
+        supplier (Supplier): The supplier the totals belong to, or None for the global totals.
+        total_units (int): Units in the inventory (sum of Inventory.stock).
+        stock_value (Decimal): Sum of stock × selling_unit_price.
+        purchase_cost (Decimal): Sum of stock × the product's unit_price.
+    """
+    supplier = models.ForeignKey(Supplier, null=True, blank=True, on_delete=models.CASCADE)
+    total_units = models.BigIntegerField(default=0)
+    stock_value = models.DecimalField(max_digits=30, decimal_places=2, default=Decimal('0'))
+    purchase_cost = models.DecimalField(max_digits=30, decimal_places=2, default=Decimal('0'))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(Coalesce('supplier', Value(0)), name='inventory_summary_unique_supplier'),
+        ]
+
+    def __str__(self):
+        return f"{self.supplier_id or 'All suppliers'} (Inventory summary)"
+
+
+class StockMovement(models.Model):
+    """
+    An append-only ledger entry recording a change of a product's stock.
+
+    Rows are only ever inserted. The stock of a product at any point in time is the balance of its latest
+    StockSnapshot before that time plus the movements recorded after the snapshot.
+
+    Attributes:
+        product (Product): The product whose stock changed.
+        location (str): Which stock changed, the supplier's stock (Product.stock) or the inventory (Inventory.stock).
+        quantity (int): Signed change of the stock.
+        reason (str): What caused the change.
+        created_at (datetime): When the change happened.
+    """
+    SUPPLIER = 'supplier'
+    INVENTORY = 'inventory'
+    LOCATION_CHOICES = [(SUPPLIER, 'Supplier'), (INVENTORY, 'Inventory')]
+
+    CREATED = 'created'
+    EDITED = 'edited'
+    PURCHASED = 'purchased'
+    IMPORTED = 'imported'
+    DELETED = 'deleted'
+    ADJUSTED = 'adjusted'
+    REASON_CHOICES = [
+        (CREATED, 'Created'),
+        (EDITED, 'Edited'),
+        (PURCHASED, 'Purchased'),
+        (IMPORTED, 'Imported'),
+        (DELETED, 'Deleted'),
+        (ADJUSTED, 'Adjusted'),
+    ]
+
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_movements')
+    location = models.CharField(max_length=10, choices=LOCATION_CHOICES)
+    quantity = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=REASON_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', 'location', 'created_at'], name='movement_product_time_idx'),
+            models.Index(fields=['created_at'], name='movement_created_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.location} {self.quantity:+d} ({self.reason})"
+
+
+class StockSnapshot(models.Model):
+    """
+    The stock balance of a product at a checkpoint, written by the ledger compaction.
+
+    Attributes:
+        product (Product): The product the balance belongs to.
+        location (str): The supplier's stock or the inventory, as in StockMovement.
+        balance (int): Sum of all movements of the product and location up to and including taken_at.
+        taken_at (datetime): The checkpoint.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='stock_snapshots')
+    location = models.CharField(max_length=10, choices=StockMovement.LOCATION_CHOICES)
+    balance = models.IntegerField()
+    taken_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'location', 'taken_at'], name='snapshot_unique_checkpoint'),
+        ]
+        indexes = [
+            models.Index(fields=['taken_at'], name='snapshot_taken_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} {self.location} {self.balance} @ {self.taken_at}"
+
+
+class ResourceVersion(models.Model):
+    """
+    A version token of a collection exposed by the JSON API, replaced on every write to the collection.
+
+    API responses derive their ETag from the tokens of the collections they read, so a conditional GET
+    can be answered with a single lookup of this table instead of re-running the query.
+
+    Attributes:
+        name (str): The collection ('inventory', 'product' or 'supplier').
+        version (str): Random token, replaced whenever a row of the collection changes.
+        modified_at (datetime): When the collection last changed.
+    """
+    name = models.CharField(max_length=50, unique=True)
+    version = models.CharField(max_length=32)
+    modified_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} {self.version}"
+
+
+class Job(models.Model):
+    """
+    A long-running task (report export, catalog import) queued by a view and run by the run_jobs worker.
+
+    The table is the queue: a worker claims the oldest due job with a single conditional UPDATE, so two
+    workers never run the same job (see jobs.claim).
+
+    Attributes:
+        kind (str): The registered task to run (see jobs.TASKS).
+        params (dict): JSON keyword arguments of the task.
+        status (str): Queued, running, succeeded or failed.
+        created_by (User): Who queued the job; only they (and admins) can see it and download its result.
+        attempts (int): How many times the job was claimed.
+        max_attempts (int): How many times the job is tried before it fails for good.
+        progress_done (int): Units of work done, reported by the task.
+        progress_total (int): Units of work in total, if the task knows it.
+        message (str): Short progress message of the task.
+        error (str): Traceback of the last failed attempt.
+        result (dict): JSON summary returned by the task.
+        result_file (str): Path of the result file, relative to IMS_JOB_DIR.
+        result_name (str): File name the result is downloaded as.
+        result_content_type (str): Content type of the result file.
+        worker (str): Token of the worker that claimed the job.
+        created_at (datetime): When the job was queued.
+        run_after (datetime): When the job is due, later than created_at for a retry.
+        started_at (datetime): When the current or last attempt started.
+        heartbeat_at (datetime): When the worker last reported the job alive; stale running jobs are requeued.
+        finished_at (datetime): When the job succeeded or failed for good.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [(QUEUED, 'Queued'), (RUNNING, 'Running'), (SUCCEEDED, 'Succeeded'), (FAILED, 'Failed')]
+
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    created_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    progress_done = models.PositiveIntegerField(default=0)
+    progress_total = models.PositiveIntegerField(null=True, blank=True)
+    message = models.CharField(max_length=255, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.CharField(max_length=255, blank=True, default='')
+    result_name = models.CharField(max_length=255, blank=True, default='')
+    result_content_type = models.CharField(max_length=100, blank=True, default='')
+    worker = models.CharField(max_length=100, blank=True, default='')
+    created_at = models.DateTimeField(default=timezone.now)
+    run_after = models.DateTimeField(default=timezone.now)
+    started_at = models.DateTimeField(null=True, blank=True)
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # Only the queued and running jobs are indexed, so claiming stays a short index read however
+            # many finished jobs the table keeps.
+            models.Index(fields=['run_after', 'id'], condition=Q(status='queued'), name='job_queued_idx'),
+            models.Index(fields=['heartbeat_at'], condition=Q(status='running'), name='job_running_idx'),
+        ]
+
     def __str__(self):
-        return f"{self.product.name} (Inventory)"
\ No newline at end of file
+        return f"{self.pk} {self.kind} ({self.status})"
@@ -0,0 +1,155 @@
+import base64
+import json
+from functools import reduce
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from django.http import Http404
+
+
+class KeysetPage:
+    """
+    A single page of results produced by the KeysetPaginator.
+
+    Attributes:
+    - object_list: The rows on this page, in display order.
+    - has_next: Whether rows exist after this page.
+    - has_previous: Whether rows exist before this page.
+    - next_cursor: Cursor token pointing after the last row (None when there is no next page).
+    - previous_cursor: Cursor token pointing before the first row (None when there is no previous page).
+    """
+
+    def __init__(self, object_list, has_next, has_previous, next_cursor, previous_cursor):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Cursor based paginator that seeks on the ordering columns instead of using OFFSET/COUNT(*).
+
+    A page is fetched with `WHERE (col, pk) > (last_col, last_pk) ORDER BY col, pk LIMIT n + 1`,
+    so every page costs the same as the first one as long as the ordering is backed by an index.
+
+    Attributes:
+    - queryset: The filtered queryset to paginate. Model instances and `values()` rows are both supported.
+    - ordering: Field paths to order by, prefixed with '-' for descending. The last field must be unique.
+    - per_page: Number of rows per page.
+
+    Methods:
+    - get_queryset: Returns the sliced queryset for the given cursor (evaluate it to get the rows).
+    - build_page: Builds a KeysetPage from the evaluated rows of get_queryset.
+    - get_page: Convenience wrapper that runs both steps synchronously.
+    - aget_page: Async version of get_page, fetching the rows with the async ORM.
+    """
+
+    def __init__(self, queryset, ordering, per_page=50):
+        self.queryset = queryset
+        self.ordering = list(ordering)
+        self.per_page = per_page
+
+    def get_queryset(self, after=None, before=None):
+        backwards = bool(before) and not after
+        ordering = self.ordering
+        if backwards:
+            ordering = [self._flip(field) for field in ordering]
+
+        queryset = self.queryset.order_by(*ordering)
+        cursor = after or before
+        if cursor:
+            queryset = queryset.filter(self._seek(ordering, self.decode_cursor(cursor)))
+        return queryset[:self.per_page + 1]
+
+    def build_page(self, rows, after=None, before=None):
+        backwards = bool(before) and not after
+        rows = list(rows)
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, bool(after)
+
+        next_cursor = self.encode_cursor(rows[-1]) if rows and has_next else None
+        previous_cursor = self.encode_cursor(rows[0]) if rows and has_previous else None
+        return KeysetPage(rows, has_next, has_previous, next_cursor, previous_cursor)
+
+    def get_page(self, after=None, before=None):
+        rows = self.get_queryset(after=after, before=before)
+        return self.build_page(rows, after=after, before=before)
+
+    async def aget_page(self, after=None, before=None):
+        rows = [row async for row in self.get_queryset(after=after, before=before)]
+        return self.build_page(rows, after=after, before=before)
+
+    def encode_cursor(self, row):
+        values = [self._value(row, field.lstrip('-')) for field in self.ordering]
+        payload = json.dumps(values, cls=DjangoJSONEncoder, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """
+        Returns the values of a cursor, converted with the to_python() of their ordering fields. A cursor that
+        does not hold one non-null value of the right type per ordering field is as invalid as a malformed one.
+        """
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if not isinstance(values, list) or len(values) != len(self.ordering) or None in values:
+                raise ValueError
+            return [self._field(field.lstrip('-')).to_python(value) for field, value in zip(self.ordering, values)]
+        except (ValueError, TypeError, ValidationError):
+            raise Http404("Invalid cursor.")
+
+    def _field(self, path):
+        """
+        Returns the model field or annotation output field an ordering path refers to.
+        """
+        annotations = self.queryset.query.annotations
+        if path in annotations:
+            return annotations[path].output_field
+        opts = self.queryset.model._meta
+        *relations, name = path.split('__')
+        for relation in relations:
+            opts = opts.get_field(relation).related_model._meta
+        return opts.pk if name == 'pk' else opts.get_field(name)
+
+    def _seek(self, ordering, values):
+        """
+        Returns the condition selecting the rows after `values` in `ordering`, nested as
+        `a >= x AND (a > x OR (b >= y AND (b > y OR c > z)))`. Unlike the equivalent
+        `a > x OR (a = x AND b > y) OR ...`, every level starts with a range condition on its column,
+        so the database can seek into an index on the ordering columns instead of scanning it.
+        """
+        name = ordering[-1].lstrip('-')
+        lookup = 'lt' if ordering[-1].startswith('-') else 'gt'
+        seek = Q(**{'%s__%s' % (name, lookup): values[-1]})
+        for field, value in zip(reversed(ordering[:-1]), reversed(values[:-1])):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            seek = Q(**{'%s__%se' % (name, lookup): value}) & (Q(**{'%s__%s' % (name, lookup): value}) | seek)
+        return seek
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else '-' + field
+
+    @staticmethod
+    def _value(row, path):
+        if isinstance(row, dict):
+            return row[path]
+        return reduce(getattr, path.split('__'), row)
@@ -0,0 +1,140 @@
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest, Round
+from django.db.models.lookups import Exact
+
+from . import fragments, valuation, versions
+from .models import Inventory, PricingRule, Product
+
+PRICE = Inventory._meta.get_field('selling_unit_price')
+MARKUP = PricingRule._meta.get_field('markup_percentage')
+ROUNDING = PricingRule._meta.get_field('rounding')
+
+
+def default_markup():
+    return Decimal(str(getattr(settings, 'IMS_DEFAULT_MARKUP_PERCENTAGE', 30)))
+
+
+def default_rounding():
+    return getattr(settings, 'IMS_DEFAULT_PRICE_ROUNDING', PricingRule.CENT)
+
+
+def selling_price(unit_price, markup_percentage, rounding):
+    """
+    Returns the selling unit price of a unit price under a markup and rounding rule. price_expression computes
+    the same price in the database; both round halves up and never go below the minimum price.
+    """
+    price = Decimal(unit_price) * (100 + Decimal(markup_percentage)) * Decimal('0.01')
+    if rounding == PricingRule.CENT:
+        return max(price.quantize(valuation.CENT, ROUND_HALF_UP), valuation.CENT)
+    units = max(price.quantize(Decimal('1'), ROUND_HALF_UP), Decimal('1'))
+    return (units - valuation.CENT if rounding == PricingRule.NINETY_NINE else units).quantize(valuation.CENT)
+
+
+def global_rule():
+    """
+    Returns the (markup, rounding) of the rule for all products, or of the settings if there is none.
+    """
+    rule = PricingRule.objects.filter(supplier__isnull=True, product__isnull=True).values_list(
+        'markup_percentage', 'rounding').first()
+    return rule or (default_markup(), default_rounding())
+
+
+def selling_prices(products):
+    """
+    Returns a dict of product id to the selling unit price the pricing rules give the products, with one
+    query for the rules however many products there are. Only the pk, supplier_id and unit_price are read.
+    """
+    products = list(products)
+    rules = {}
+    for supplier_id, product_id, markup, rounding in PricingRule.objects.filter(
+            Q(product__in=[product.pk for product in products])
+            | Q(supplier__in={product.supplier_id for product in products})
+            | Q(supplier__isnull=True, product__isnull=True)).values_list(
+                'supplier_id', 'product_id', 'markup_percentage', 'rounding'):
+        key = ('product', product_id) if product_id else ('supplier', supplier_id) if supplier_id else None
+        rules[key] = (markup, rounding)
+    fallback = rules.get(None, (default_markup(), default_rounding()))
+    return {
+        product.pk: selling_price(product.unit_price, *rules.get(
+            ('product', product.pk), rules.get(('supplier', product.supplier_id), fallback)))
+        for product in products
+    }
+
+
+def price_expression():
+    """
+    Returns the selling unit price the pricing rules give an inventory row, as an expression for Inventory
+    querysets. The product's and its supplier's rules are correlated subqueries over the rule table and the
+    rule for all products is read up front, so the database prices every row without a join per rule.
+    """
+    markup, rounding = global_rule()
+
+    def rule(field, default, output_field):
+        return Coalesce(
+            Subquery(PricingRule.objects.filter(product=OuterRef('product_id')).values(field)[:1]),
+            Subquery(PricingRule.objects.filter(supplier__product=OuterRef('product_id')).values(field)[:1]),
+            Value(default), output_field=output_field)
+
+    unit_price = Subquery(Product.objects.filter(pk=OuterRef('product_id')).values('unit_price')[:1])
+    # Multiplied by 0.01 rather than divided by 100: SQLite would divide two whole numbers as integers.
+    price = unit_price * (Value(100, output_field=MARKUP) + rule('markup_percentage', markup, MARKUP)) * Value(
+        Decimal('0.01'), output_field=PRICE)
+    rounding_rule = rule('rounding', rounding, ROUNDING)
+    units = Greatest(Round(price), Value(1, output_field=PRICE), output_field=PRICE)
+    return Case(
+        When(Exact(rounding_rule, PricingRule.UNIT), then=units),
+        When(Exact(rounding_rule, PricingRule.NINETY_NINE), then=units - Value(valuation.CENT, output_field=PRICE)),
+        default=Greatest(Round(price, 2), Value(valuation.CENT, output_field=PRICE), output_field=PRICE),
+        output_field=PRICE)
+
+
+def reprice(suppliers=None, products=None):
+    """
+    Sets the selling unit price of the inventory rows to the price of the current pricing rules.
+
+    The rows whose price changes are read once, for the valuation deltas and the fragments to invalidate,
+    and are then written with a single UPDATE computing every row's price in the database, in one transaction.
+
+    Parameters:
+    - suppliers: Only reprice the rows of the products of these suppliers.
+    - products: Only reprice the rows of these products. By default every row is repriced.
+
+    Returns:
+    - The number of inventory rows repriced.
+    """
+    price = price_expression()
+    rows = Inventory.objects.all()
+    if suppliers is not None:
+        rows = rows.filter(product__supplier__in=list(suppliers))
+    if products is not None:
+        rows = rows.filter(product__in=list(products))
+    rows = rows.exclude(selling_unit_price=price)
+
+    with transaction.atomic():
+        changed = list(rows.annotate(new_price=price).values_list(
+            'product_id', 'product__supplier_id', 'stock', 'selling_unit_price', 'new_price'))
+        if not changed:
+            return 0
+        rows.update(selling_unit_price=price)
+        versions.bump(versions.INVENTORY)
+        fragments.invalidate(fragments.INVENTORY, [row[0] for row in changed])
+        valuation.apply_deltas(valuation.combine(
+            (supplier_id, (0, (stock * (new_price - old_price)).quantize(valuation.CENT), Decimal('0')))
+            for _, supplier_id, stock, old_price, new_price in changed))
+    return len(changed)
+
+
+def reprice_rule(rule, previous=None):
+    """
+    Reprices the inventory rows a saved or deleted rule covers, plus those of its `previous` (supplier id,
+    product id) scope if the save moved it.
+    """
+    scopes = {(rule.supplier_id, rule.product_id), previous or (rule.supplier_id, rule.product_id)}
+    if (None, None) in scopes:
+        return reprice()
+    return sum(reprice(products=[product_id]) if product_id else reprice(suppliers=[supplier_id])
+               for supplier_id, product_id in scopes)
@@ -0,0 +1,143 @@
+import math
+from datetime import timedelta
+from statistics import NormalDist
+
+import numpy as np
+from django.conf import settings
+from django.db import connections, router, transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from . import versions
+from .models import Inventory, StockMovement
+
+REORDER_FIELDS = ['daily_demand', 'safety_stock', 'reorder_point', 'days_of_cover']
+REORDER_BATCH_SIZE = 2000
+
+
+def lead_time_days():
+    return getattr(settings, 'IMS_REORDER_LEAD_TIME_DAYS', 7)
+
+
+def service_level():
+    return getattr(settings, 'IMS_REORDER_SERVICE_LEVEL', 0.95)
+
+
+def history_days():
+    return getattr(settings, 'IMS_REORDER_HISTORY_DAYS', 90)
+
+
+def daily_outflows(end, days):
+    """
+    Yields the units that left the inventory per product on each of the `days` days before `end`, as
+    (product ids, units) arrays. Outflows are the negative inventory movements other than deletions.
+
+    Every day is summed by the database with one grouped query over a range of the created_at index. Grouping
+    by a truncated date instead would convert every movement's timestamp in Python on SQLite, which takes
+    longer than the rest of the refresh together.
+    """
+    outflows = StockMovement.objects.filter(location=StockMovement.INVENTORY, quantity__lt=0).exclude(
+        reason=StockMovement.DELETED)
+    for day in range(days):
+        day_end = end - timedelta(days=day)
+        rows = list(outflows.filter(created_at__gte=day_end - timedelta(days=1), created_at__lt=day_end).values_list(
+            'product_id').annotate(units=Sum('quantity')).order_by())
+        product_ids, units = (list(column) for column in zip(*rows)) if rows else ([], [])
+        yield np.array(product_ids, dtype=np.int64), -np.array(units, dtype=np.float64)
+
+
+def reorder_levels(stock, demand, demand_squares, days, lead_time, z):
+    """
+    Computes the reorder fields of every row at once from the per-row sums of the daily outflows and of their
+    squares over `days` days (days without outflow count as zero demand).
+
+    - daily demand: mean daily outflow d, with standard deviation s.
+    - safety stock: z × s × √lead time, z being the standard normal quantile of the service level.
+    - reorder point: d × lead time + safety stock, rounded up.
+    - days of cover: stock / d, NaN without demand.
+
+    Returns:
+    - The (daily_demand, safety_stock, reorder_point, days_of_cover) arrays, rounded as they are stored.
+    """
+    mean = demand / days
+    deviation = np.sqrt(np.maximum(demand_squares / days - mean ** 2, 0))
+    safety = z * deviation * math.sqrt(lead_time)
+    # Rounded before ceil, so float noise in an exact result (7.0000000001) does not add a unit.
+    safety_stock = np.ceil(np.round(safety, 6))
+    reorder_point = np.ceil(np.round(mean * lead_time + safety, 6))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        cover = np.where(mean > 0, stock / mean, np.nan)
+    return np.round(mean, 4), safety_stock, reorder_point, np.round(cover, 1)
+
+
+def _changed(new, old):
+    return ~np.isclose(new, old, rtol=0, atol=1e-9, equal_nan=True)
+
+
+def refresh(now=None, lead_time=None, level=None, days=None, progress=None):
+    """
+    Recomputes the daily demand, safety stock, reorder point and days of cover of every inventory row.
+
+    The inventory rows are loaded with one query and the outflows with one grouped query per day of the
+    history window into NumPy arrays, the statistics of all rows are computed with array operations, and
+    only the rows whose values changed are written back (see write_columns). `progress`, if given, is called
+    with the number of rows written after every batch.
+
+    Returns:
+    - A dict with the number of inventory rows and the number of rows updated.
+    """
+    now = now or timezone.now()
+    lead_time = lead_time_days() if lead_time is None else lead_time
+    days = days or history_days()
+    z = NormalDist().inv_cdf(service_level() if level is None else level)
+
+    rows = list(Inventory.objects.order_by('product_id').values_list('pk', 'product_id', 'stock', *REORDER_FIELDS))
+    if not rows:
+        return {'rows': 0, 'updated': 0}
+    pks, product_ids, stock, *current = (np.array(column, dtype=np.float64) for column in zip(*rows))
+    pks, product_ids = pks.astype(np.int64), product_ids.astype(np.int64)
+
+    demand = np.zeros(len(product_ids))
+    demand_squares = np.zeros(len(product_ids))
+    for outflow_products, units in daily_outflows(now, days):
+        positions = np.searchsorted(product_ids, outflow_products)
+        # Outflows of products without an inventory row (deleted since) are dropped.
+        known = positions < len(product_ids)
+        known[known] = product_ids[positions[known]] == outflow_products[known]
+        demand += np.bincount(positions[known], weights=units[known], minlength=len(product_ids))
+        demand_squares += np.bincount(positions[known], weights=units[known] ** 2, minlength=len(product_ids))
+
+    computed = reorder_levels(stock, demand, demand_squares, days, lead_time, z)
+    changed = np.zeros(len(pks), dtype=bool)
+    for new, old in zip(computed, current):
+        changed |= _changed(new, old)
+
+    daily_demand, safety_stock, reorder_point, days_of_cover = (values[changed].tolist() for values in computed)
+    updates = [
+        (demand_value, int(safety), int(point), None if math.isnan(cover) else cover, pk)
+        for demand_value, safety, point, cover, pk in zip(
+            daily_demand, safety_stock, reorder_point, days_of_cover, pks[changed].tolist())]
+    write_columns(REORDER_FIELDS, updates, progress)
+    return {'rows': len(rows), 'updated': len(updates)}
+
+
+def write_columns(fields, updates, progress=None):
+    """
+    Writes rows of values of the given Inventory fields, each row ending with the primary key, with one
+    parameterized UPDATE run by executemany, REORDER_BATCH_SIZE rows per transaction. bulk_update builds a
+    CASE expression per field in Python for every batch, which took over a minute for 200k rows.
+    """
+    connection = connections[router.db_for_write(Inventory)]
+    model_fields = [Inventory._meta.get_field(field) for field in fields]
+    sql = 'UPDATE {table} SET {columns} WHERE id = %s'.format(
+        table=connection.ops.quote_name(Inventory._meta.db_table),
+        columns=', '.join('%s = %%s' % connection.ops.quote_name(field.column) for field in model_fields))
+    for start in range(0, len(updates), REORDER_BATCH_SIZE):
+        params = [
+            [field.get_db_prep_save(value, connection) for field, value in zip(model_fields, row)] + [row[-1]]
+            for row in updates[start:start + REORDER_BATCH_SIZE]]
+        with transaction.atomic(using=connection.alias), connection.cursor() as cursor:
+            cursor.executemany(sql, params)
+            versions.bump(versions.INVENTORY)
+        if progress is not None:
+            progress(min(start + REORDER_BATCH_SIZE, len(updates)))
@@ -0,0 +1,196 @@
+from django.contrib.auth.models import User
+from django.db import connections, router
+from django.db.models import FloatField, Value
+from django.db.models.expressions import RawSQL
+
+from .models import Product, Supplier
+
+
+class SearchIndex:
+    """
+    An SQLite FTS5 virtual table mirroring searchable text columns of a model.
+
+    The table uses the trigram tokenizer, so a MATCH on a quoted phrase behaves like a
+    case-insensitive `icontains` lookup but is answered from the index instead of a LIKE scan.
+    The FTS rowid is the primary key of the indexed model row.
+
+    Attributes:
+    - table: Name of the virtual table.
+    - model: The model whose rows are indexed.
+    - columns: Names of the indexed columns, in table order.
+    - source_sql: Callable returning the SELECT (rowid, *columns) used to (re)build rows.
+    """
+
+    def __init__(self, table, model, columns, source_sql):
+        self.table = table
+        self.model = model
+        self.columns = columns
+        self.source_sql = source_sql
+
+    def create(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS %s USING fts5(%s, tokenize='trigram')"
+                % (self.table, ', '.join(self.columns)))
+
+    def rebuild(self, connection):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM %s" % self.table)
+            cursor.execute("INSERT INTO %s(rowid, %s) %s" % (
+                self.table, ', '.join(self.columns), self.source_sql(connection, '')))
+
+    def refresh(self, connection, pks):
+        """
+        Re-reads the given rows from their source tables; rows that no longer exist are dropped.
+        """
+        pks = [int(pk) for pk in pks]
+        if not pks:
+            return
+        placeholders = ', '.join(['%s'] * len(pks))
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM %s WHERE rowid IN (%s)" % (self.table, placeholders), pks)
+            where = 'WHERE %s.id IN (%s)' % (
+                connection.ops.quote_name(self.model._meta.db_table), placeholders)
+            cursor.execute("INSERT INTO %s(rowid, %s) %s" % (
+                self.table, ', '.join(self.columns), self.source_sql(connection, where)), pks)
+
+    def remove(self, connection, pks):
+        pks = [int(pk) for pk in pks]
+        if not pks:
+            return
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM %s WHERE rowid IN (%s)" % (
+                self.table, ', '.join(['%s'] * len(pks))), pks)
+
+
+def _product_source(connection, where):
+    qn = connection.ops.quote_name
+    product, supplier, user = (qn(model._meta.db_table) for model in (Product, Supplier, User))
+    return (
+        "SELECT {product}.id, {product}.name, {product}.description, {user}.username "
+        "FROM {product} "
+        "INNER JOIN {supplier} ON {supplier}.id = {product}.supplier_id "
+        "INNER JOIN {user} ON {user}.id = {supplier}.user_id {where}"
+    ).format(product=product, supplier=supplier, user=user, where=where)
+
+
+def _supplier_source(connection, where):
+    qn = connection.ops.quote_name
+    supplier, user = (qn(model._meta.db_table) for model in (Supplier, User))
+    return (
+        "SELECT {supplier}.id, {user}.username, {user}.first_name "
+        "FROM {supplier} "
+        "INNER JOIN {user} ON {user}.id = {supplier}.user_id {where}"
+    ).format(supplier=supplier, user=user, where=where)
+
+
+PRODUCT_INDEX = SearchIndex('ims_product_search', Product, ['name', 'description', 'supplier'], _product_source)
+SUPPLIER_INDEX = SearchIndex('ims_supplier_search', Supplier, ['username', 'first_name'], _supplier_source)
+SEARCH_INDEXES = [PRODUCT_INDEX, SUPPLIER_INDEX]
+
+# The trigram tokenizer cannot match phrases shorter than three characters.
+MIN_QUERY_LENGTH = 3
+
+
+def is_supported(connection):
+    return connection.vendor == 'sqlite'
+
+
+def _connection_for(model):
+    return connections[router.db_for_write(model)]
+
+
+def rebuild_search_indexes(using='default', **kwargs):
+    """
+    Creates the FTS tables if needed and rebuilds them from the source tables.
+    Connected to post_migrate, so a migrate (or test database setup) always leaves the index in sync.
+    """
+    connection = connections[using]
+    if not is_supported(connection):
+        return
+    for index in SEARCH_INDEXES:
+        index.create(connection)
+        index.rebuild(connection)
+
+
+def refresh_products(pks):
+    connection = _connection_for(Product)
+    if is_supported(connection):
+        PRODUCT_INDEX.refresh(connection, pks)
+
+
+def remove_products(pks):
+    connection = _connection_for(Product)
+    if is_supported(connection):
+        PRODUCT_INDEX.remove(connection, pks)
+
+
+def refresh_suppliers(pks):
+    """
+    Refreshes the given suppliers and every product of theirs, since product rows carry the supplier username.
+    """
+    connection = _connection_for(Supplier)
+    if not is_supported(connection):
+        return
+    SUPPLIER_INDEX.refresh(connection, pks)
+    product_pks = Product.objects.filter(supplier__in=pks).values_list('pk', flat=True)
+    PRODUCT_INDEX.refresh(connection, list(product_pks))
+
+
+def remove_suppliers(pks):
+    connection = _connection_for(Supplier)
+    if is_supported(connection):
+        SUPPLIER_INDEX.remove(connection, pks)
+
+
+def match_expression(query, columns):
+    """
+    Builds an FTS5 query matching `query` as a substring of any of `columns`.
+    """
+    phrase = '"%s"' % query.replace('"', '""')
+    return '{%s} : %s' % (' '.join(columns), phrase)
+
+
+def filter_matches(queryset, query, index, columns, fallback, pk_field='pk'):
+    """
+    Filters `queryset` to the rows whose indexed `columns` contain `query`, like search_queryset
+    but without the relevance annotation, for plain `icontains` filters.
+    """
+    connection = connections[queryset.db]
+    query = query.strip()
+    if len(query) < MIN_QUERY_LENGTH or not is_supported(connection):
+        return queryset.filter(fallback)
+    matches = RawSQL("SELECT rowid FROM {table} WHERE {table} MATCH %s".format(table=index.table),
+                     [match_expression(query, columns)])
+    return queryset.filter(**{'%s__in' % pk_field: matches})
+
+
+def search_queryset(queryset, query, index, columns, fallback, pk_field='pk'):
+    """
+    Filters `queryset` to the rows whose indexed `columns` contain `query` and annotates each row
+    with a `search_rank` (bm25, lower is a better match) so callers can order by relevance.
+
+    Parameters:
+    - queryset: The queryset to filter.
+    - query: The raw search string entered by the user.
+    - index: The SearchIndex to query.
+    - columns: Indexed columns to search in.
+    - fallback: Q object used when the index cannot answer the query (short queries, non-SQLite databases).
+    - pk_field: Field of `queryset` holding the primary key of the indexed model.
+    """
+    connection = connections[queryset.db]
+    query = query.strip()
+    if len(query) < MIN_QUERY_LENGTH or not is_supported(connection):
+        return queryset.filter(fallback).annotate(
+            search_rank=Value(0.0, output_field=FloatField()))
+
+    match = match_expression(query, columns)
+    qn = connection.ops.quote_name
+    field = queryset.model._meta.get_field('id' if pk_field == 'pk' else pk_field)
+    outer_column = '%s.%s' % (qn(queryset.model._meta.db_table), qn(field.column))
+    rank = RawSQL(
+        "SELECT bm25({table}) FROM {table} WHERE {table} MATCH %s AND rowid = {outer}".format(
+            table=index.table, outer=outer_column),
+        [match], output_field=FloatField())
+    matches = RawSQL("SELECT rowid FROM {table} WHERE {table} MATCH %s".format(table=index.table), [match])
+    return queryset.filter(**{'%s__in' % pk_field: matches}).annotate(search_rank=rank)
@@ -0,0 +1,309 @@
+from django.contrib.auth.models import User
+from django.contrib.auth.signals import user_logged_in
+from django.db.models.signals import post_save, post_delete, pre_save, pre_delete
+from django.dispatch import receiver
+
+from . import fragments, identity, ledger, pricing, search, supplier_names, valuation, versions
+from .models import Inventory, PricingRule, Product, StockMovement, Supplier
+
+
+@receiver(post_save, sender=Product)
+def index_product(sender, instance, **kwargs):
+    search.refresh_products([instance.pk])
+
+
+@receiver(post_delete, sender=Product)
+def unindex_product(sender, instance, **kwargs):
+    search.remove_products([instance.pk])
+
+
+@receiver(pre_save, sender=Supplier)
+def capture_supplier_user(sender, instance, raw=False, **kwargs):
+    instance._user_id_before = None
+    if not raw and instance.pk is not None:
+        instance._user_id_before = Supplier.objects.filter(pk=instance.pk).values_list('user_id', flat=True).first()
+
+
+@receiver(post_save, sender=Supplier)
+def index_supplier(sender, instance, created=False, **kwargs):
+    """
+    A new supplier gives its user the supplier role; a supplier given to another user takes it from the old one.
+    """
+    search.refresh_suppliers([instance.pk])
+    before = getattr(instance, '_user_id_before', None)
+    if created or (before is not None and before != instance.user_id):
+        identity.invalidate_identity(instance.user_id)
+    if before is not None and before != instance.user_id:
+        identity.invalidate_identity(before)
+
+
+@receiver(post_delete, sender=Supplier)
+def unindex_supplier(sender, instance, **kwargs):
+    search.remove_suppliers([instance.pk])
+    identity.invalidate_identity(instance.user_id)
+
+
+@receiver(post_save, sender=User)
+def index_supplier_user(sender, instance, update_fields=None, **kwargs):
+    """
+    Keeps supplier search rows in sync with the username/first name of the supplier's user.
+    Saves that only touch other fields (e.g. last_login on every login) are skipped.
+    """
+    if update_fields is not None and not {'username', 'first_name'} & set(update_fields):
+        return
+    supplier_pks = list(Supplier.objects.filter(user=instance).values_list('pk', flat=True))
+    if supplier_pks:
+        search.refresh_suppliers(supplier_pks)
+
+
+@receiver(pre_save, sender=Product)
+def denormalize_product_supplier_name(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'supplier_name' not in update_fields):
+        instance._supplier_name_changed = False
+        return
+    name = supplier_names.for_product(instance)
+    # A deferred supplier_name is not in __dict__ and counts as changed.
+    instance._supplier_name_changed = instance.pk is not None and instance.__dict__.get('supplier_name') != name
+    instance.supplier_name = name
+
+
+@receiver(post_save, sender=Product)
+def sync_inventory_supplier_name(sender, instance, raw=False, **kwargs):
+    """
+    Copies a changed supplier name (the product moved to another supplier) onto the product's inventory row.
+    """
+    if not raw and getattr(instance, '_supplier_name_changed', False):
+        Inventory.objects.filter(product=instance).update(supplier_name=instance.supplier_name)
+
+
+@receiver(pre_save, sender=Inventory)
+def denormalize_inventory_supplier_name(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and 'supplier_name' not in update_fields):
+        return
+    instance.supplier_name = supplier_names.for_inventory(instance)
+
+
+@receiver(post_save, sender=User)
+def sync_supplier_user_name(sender, instance, raw=False, update_fields=None, **kwargs):
+    """
+    Copies a changed username onto the products and inventory rows of the user's supplier.
+    """
+    if raw or (update_fields is not None and 'username' not in update_fields):
+        return
+    supplier_pks = list(Supplier.objects.filter(user=instance).values_list('pk', flat=True))
+    if supplier_pks:
+        supplier_names.sync(supplier_pks)
+
+
+@receiver(post_save, sender=Supplier)
+def sync_supplier_name(sender, instance, created=False, raw=False, **kwargs):
+    """
+    A new supplier has no products yet; an existing one may have been given another user.
+    """
+    if not raw and not created:
+        supplier_names.sync([instance.pk])
+
+
+@receiver(user_logged_in)
+def resolve_identity_on_login(sender, request, user, **kwargs):
+    """
+    Resolves the user's role and supplier once at login so supplier pages can skip the lookup.
+    """
+    if request is not None and hasattr(request, 'session'):
+        identity.store_identity(request, user)
+
+
+@receiver(pre_save, sender=Inventory)
+def capture_inventory_valuation(sender, instance, raw=False, **kwargs):
+    instance._valuation_before = None
+    instance._stock_before = None
+    if raw or instance.pk is None:
+        return
+    before = Inventory.objects.filter(pk=instance.pk).values(
+        'stock', 'selling_unit_price', 'product__unit_price', 'product__supplier_id').first()
+    if before:
+        instance._stock_before = before['stock']
+        instance._valuation_before = (before['product__supplier_id'], valuation.contribution(
+            before['stock'], before['selling_unit_price'], before['product__unit_price']))
+
+
+@receiver(post_save, sender=Inventory)
+def update_inventory_valuation(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    product = instance.product
+    deltas = [(product.supplier_id, valuation.contribution(
+        instance.stock, instance.selling_unit_price, product.unit_price))]
+    before = getattr(instance, '_valuation_before', None)
+    if before:
+        deltas.append((before[0], valuation.negate(before[1])))
+    valuation.apply_deltas(valuation.combine(deltas))
+
+
+@receiver(pre_delete, sender=Inventory)
+def remove_inventory_valuation(sender, instance, **kwargs):
+    product = instance.product
+    valuation.apply_deltas({
+        product.supplier_id: valuation.negate(valuation.contribution(
+            instance.stock, instance.selling_unit_price, product.unit_price))
+    }, create=False)
+
+
+@receiver(pre_save, sender=Product)
+def capture_product_valuation(sender, instance, raw=False, **kwargs):
+    """
+    Reads the stored stock, price and inventory row of the product in one query before it is overwritten.
+    """
+    instance._valuation_before = None
+    instance._stock_before = None
+    if raw or instance.pk is None:
+        return
+    before = Product.objects.filter(pk=instance.pk).values(
+        'stock', 'unit_price', 'supplier_id', 'inventory__stock', 'inventory__selling_unit_price').first()
+    if before is None:
+        return
+    instance._stock_before = before['stock']
+    if before['inventory__stock'] is not None:
+        instance._valuation_before = {
+            'stock': before['inventory__stock'],
+            'selling_unit_price': before['inventory__selling_unit_price'],
+            'product__unit_price': before['unit_price'],
+            'product__supplier_id': before['supplier_id'],
+        }
+
+
+@receiver(post_save, sender=Product)
+def update_product_valuation(sender, instance, raw=False, **kwargs):
+    """
+    Re-values the product's inventory row when its purchase price or supplier changed.
+    """
+    before = getattr(instance, '_valuation_before', None)
+    if raw or not before:
+        return
+    if (before['product__unit_price'] == instance.unit_price
+            and before['product__supplier_id'] == instance.supplier_id):
+        return
+    valuation.apply_deltas(valuation.combine([
+        (before['product__supplier_id'], valuation.negate(valuation.contribution(
+            before['stock'], before['selling_unit_price'], before['product__unit_price']))),
+        (instance.supplier_id, valuation.contribution(
+            before['stock'], before['selling_unit_price'], instance.unit_price)),
+    ]))
+
+
+@receiver(pre_save, sender=PricingRule)
+def capture_pricing_rule_scope(sender, instance, raw=False, **kwargs):
+    instance._scope_before = None
+    if not raw and instance.pk is not None:
+        instance._scope_before = PricingRule.objects.filter(pk=instance.pk).values_list(
+            'supplier_id', 'product_id').first()
+
+
+@receiver(post_save, sender=PricingRule)
+def reprice_saved_rule(sender, instance, raw=False, **kwargs):
+    if not raw:
+        pricing.reprice_rule(instance, getattr(instance, '_scope_before', None))
+
+
+@receiver(post_delete, sender=PricingRule)
+def reprice_deleted_rule(sender, instance, origin=None, **kwargs):
+    """
+    A rule deleted along with its supplier or product is skipped: the rows it priced are being deleted too.
+    """
+    if isinstance(origin, PricingRule) or getattr(origin, 'model', None) is PricingRule:
+        pricing.reprice_rule(instance)
+
+
+def _stock_movement(instance, product_id, location, created):
+    """
+    Returns the ledger movement for a saved Product or Inventory row, or None if its stock is unknown.
+    """
+    if created:
+        return ledger.movement(product_id, location, instance.stock, StockMovement.CREATED)
+    before = getattr(instance, '_stock_before', None)
+    if before is None:
+        return None
+    return ledger.movement(product_id, location, instance.stock - before, StockMovement.EDITED)
+
+
+@receiver(post_save, sender=Product)
+def record_product_movement(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    entry = _stock_movement(instance, instance.pk, ledger.SUPPLIER, created)
+    if entry is not None:
+        ledger.record_movements([entry])
+
+
+@receiver(post_save, sender=Inventory)
+def record_inventory_movement(sender, instance, created=False, raw=False, **kwargs):
+    if raw:
+        return
+    entry = _stock_movement(instance, instance.product_id, ledger.INVENTORY, created)
+    if entry is not None:
+        ledger.record_movements([entry])
+
+
+@receiver(pre_delete, sender=Inventory)
+def record_inventory_removal(sender, instance, **kwargs):
+    ledger.record_movements([
+        ledger.movement(instance.product_id, ledger.INVENTORY, -instance.stock, StockMovement.DELETED)])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_product_version(sender, raw=False, **kwargs):
+    if not raw:
+        versions.bump(versions.PRODUCT)
+
+
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+def bump_inventory_version(sender, raw=False, **kwargs):
+    if not raw:
+        versions.bump(versions.INVENTORY)
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def bump_supplier_version(sender, raw=False, **kwargs):
+    if not raw:
+        versions.bump(versions.SUPPLIER)
+
+
+@receiver(post_save, sender=User)
+def bump_supplier_user_version(sender, raw=False, update_fields=None, **kwargs):
+    """
+    Supplier data includes fields of its user. Saves that only touch last_login (every login) are skipped.
+    """
+    if raw or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    versions.bump(versions.SUPPLIER)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def invalidate_product_fragments(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fragments.invalidate(fragments.PRODUCT, [instance.pk])
+
+
+@receiver(post_save, sender=Inventory)
+@receiver(post_delete, sender=Inventory)
+def invalidate_inventory_fragments(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fragments.invalidate(fragments.INVENTORY, [instance.product_id])
+
+
+@receiver(post_save, sender=Supplier)
+@receiver(post_delete, sender=Supplier)
+def invalidate_supplier_fragments(sender, instance, raw=False, **kwargs):
+    if not raw:
+        fragments.invalidate(fragments.SUPPLIER, [instance.pk])
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_fragments(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or (update_fields is not None and set(update_fields) <= {'last_login'}):
+        return
+    fragments.invalidate(fragments.USER, [instance.pk])
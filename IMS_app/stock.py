@@ -0,0 +1,281 @@
+import re
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import connections, router, transaction
+from django.db.models import Case, CharField, F, Q, Value, When
+
+from . import fragments, ledger, pricing, valuation, versions
+from .models import Inventory, Product, StockMovement, default_low_stock_threshold
+
+STOCK_OK = 'ok'
+STOCK_LOW = 'low'
+STOCK_VERY_LOW = 'very_low'
+
+
+def low_stock_threshold():
+    return default_low_stock_threshold()
+
+
+def very_low_stock_threshold():
+    return getattr(settings, 'IMS_VERY_LOW_STOCK_THRESHOLD', 5)
+
+
+def low_stock_filter():
+    """
+    Returns the Q matching inventory rows below their low stock threshold. It is the condition of the
+    inventory_low_stock_idx partial index, so matching rows are read from that index alone.
+    """
+    return Q(stock__lt=F('effective_low_stock_threshold'))
+
+
+def very_low_stock_filter():
+    return low_stock_filter() & Q(stock__lt=very_low_stock_threshold())
+
+
+def sync_low_stock_thresholds(**kwargs):
+    """
+    Brings the stored effective thresholds in line with the overrides and the current
+    IMS_LOW_STOCK_THRESHOLD setting, with one UPDATE per case. Runs after migrate and from the
+    sync_low_stock_thresholds command, so a changed setting takes effect without touching every row by hand.
+
+    Returns:
+    - The number of updated rows.
+    """
+    threshold = low_stock_threshold()
+    with transaction.atomic():
+        updated = (
+            Inventory.objects.filter(low_stock_threshold__isnull=True).exclude(
+                effective_low_stock_threshold=threshold).update(effective_low_stock_threshold=threshold)
+            + Inventory.objects.filter(low_stock_threshold__isnull=False).exclude(
+                effective_low_stock_threshold=F('low_stock_threshold')).update(
+                    effective_low_stock_threshold=F('low_stock_threshold'))
+        )
+        if updated:
+            versions.bump(versions.INVENTORY)
+    return updated
+
+
+def annotate_stock_level(queryset):
+    """
+    Annotates inventory rows with their `stock_level` (STOCK_OK, STOCK_LOW or STOCK_VERY_LOW), evaluated by the database.
+    """
+    return queryset.annotate(stock_level=Case(
+        When(very_low_stock_filter(), then=Value(STOCK_VERY_LOW)),
+        When(low_stock_filter(), then=Value(STOCK_LOW)),
+        default=Value(STOCK_OK), output_field=CharField()))
+
+
+def purchase_product(product, quantity):
+    """
+    Moves `quantity` units of `product` from the supplier's stock into the inventory.
+
+    The supplier stock is decremented with a single conditional UPDATE
+    (`stock = stock - n WHERE stock >= n AND active_status`), so concurrent purchases of the same
+    product can neither lose updates nor oversell, and no row lock is held across Python code.
+    The inventory row is then upserted in one statement, and both changes are appended to the stock ledger.
+
+    Parameters:
+    - product: The Product being purchased. Only its pk, supplier_id and unit_price are read.
+    - quantity: Number of units to purchase.
+
+    Raises:
+    - ValidationError: If the quantity is not positive, the product is not available, or its stock is too low.
+    """
+    if quantity <= 0:
+        raise ValidationError("Purchase quantity must be greater than zero")
+
+    # The price of the pricing rules, kept by an inventory row that already exists.
+    selling_unit_price = pricing.selling_prices([product])[product.pk]
+
+    with transaction.atomic():
+        updated = Product.objects.filter(
+            pk=product.pk, active_status=True, stock__gte=quantity).update(
+                stock=F('stock') - quantity,
+                active_status=Case(When(stock=quantity, then=Value(False)), default=Value(True)))
+        if not updated:
+            current = Product.objects.filter(pk=product.pk).values('active_status').first()
+            if not current or not current['active_status']:
+                raise ValidationError("The Product is not available")
+            raise ValidationError("Not enough stock available")
+
+        selling_unit_price = add_inventory_stock(product.pk, quantity, selling_unit_price)
+        ledger.record_movements(purchase_movements(product.pk, quantity))
+        versions.bump(versions.PRODUCT, versions.INVENTORY)
+        fragments.invalidate(fragments.PRODUCT, [product.pk])
+        fragments.invalidate(fragments.INVENTORY, [product.pk])
+        valuation.apply_deltas({
+            product.supplier_id: valuation.contribution(quantity, selling_unit_price, product.unit_price)
+        })
+
+
+def add_inventory_stock(product_id, quantity, selling_unit_price):
+    """
+    Adds `quantity` units to the inventory row of a product, creating the row with
+    `selling_unit_price` if it does not exist yet, as a single INSERT ... ON CONFLICT DO UPDATE.
+
+    Returns:
+    - The selling unit price of the inventory row.
+    """
+    connection = connections[router.db_for_write(Inventory)]
+    if not (connection.features.supports_update_conflicts_with_target
+            and connection.features.can_return_rows_from_bulk_insert):
+        if not Inventory.objects.filter(product_id=product_id).update(stock=F('stock') + quantity):
+            Inventory.objects.bulk_create([Inventory(
+                product_id=product_id, stock=quantity, selling_unit_price=selling_unit_price,
+                supplier_name=Product.objects.filter(pk=product_id).values_list('supplier_name', flat=True).get())])
+            return selling_unit_price
+        return Inventory.objects.filter(product_id=product_id).values_list('selling_unit_price', flat=True).get()
+
+    table = connection.ops.quote_name(Inventory._meta.db_table)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO {table} (product_id, stock, selling_unit_price, effective_low_stock_threshold, supplier_name, "
+            "forecast_method) VALUES (%s, %s, %s, %s, (SELECT supplier_name FROM {products} WHERE id = %s), '') "
+            "ON CONFLICT (product_id) DO UPDATE SET stock = {table}.stock + excluded.stock "
+            "RETURNING selling_unit_price".format(
+                table=table, products=connection.ops.quote_name(Product._meta.db_table)),
+            [product_id, quantity, connection.ops.adapt_decimalfield_value(selling_unit_price, 20, 2),
+             low_stock_threshold(), product_id])
+        return Decimal(str(cursor.fetchone()[0])).quantize(valuation.CENT)
+
+
+def purchase_movements(product_id, quantity):
+    """
+    Returns the ledger movements of a purchase: units leave the supplier's stock and enter the inventory.
+    """
+    return [
+        ledger.movement(product_id, ledger.SUPPLIER, -quantity, StockMovement.PURCHASED),
+        ledger.movement(product_id, ledger.INVENTORY, quantity, StockMovement.PURCHASED),
+    ]
+
+
+def whole_number(value):
+    """
+    Returns an order line value as an int. Only ints (not booleans) and strings of digits are accepted, so a
+    fractional quantity such as 1.5 or 1e3 is rejected instead of being truncated.
+
+    Raises:
+    - ValueError: If the value is not a whole number.
+    """
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if isinstance(value, str) and re.fullmatch(r'\s*[+-]?\d+\s*', value):
+        return int(value)
+    raise ValueError('%r is not a whole number' % (value,))
+
+
+def purchase_products(lines):
+    """
+    Applies a purchase order of several (product_id, quantity) lines in one transaction.
+
+    The supplier stock of every line is taken with a single conditional UPDATE (`stock = stock - n
+    WHERE stock >= n AND active_status`), like purchase_product does for one product, and the existing
+    inventory rows are incremented with another; the missing ones are then created with one bulk_create.
+    No value read by the order is written back, so a concurrent order waits for the write lock instead of
+    failing or losing an update, and the number of queries does not depend on the number of lines.
+    Lines for the same product are validated against their combined quantity. If any line cannot be
+    applied nothing is written, and the per-line results describe what was wrong.
+
+    Parameters:
+    - lines: Iterable of dicts with `product_id` and `quantity` keys.
+
+    Returns:
+    - A (success, results) tuple where results holds one dict per line with its status ('ok' or 'error')
+      and, when the order was applied, the remaining product stock and the new inventory stock.
+    """
+    results = []
+    totals = {}
+    for index, line in enumerate(lines):
+        result = {'line': index}
+        results.append(result)
+        try:
+            product_id = whole_number(line['product_id'])
+            quantity = whole_number(line['quantity'])
+        except (KeyError, TypeError, ValueError):
+            result.update(status='error', error="Each line needs an integer product_id and quantity")
+            continue
+        result.update(product_id=product_id, quantity=quantity)
+        if quantity <= 0:
+            result.update(status='error', error="Purchase quantity must be greater than zero")
+            continue
+        totals[product_id] = totals.get(product_id, 0) + quantity
+
+    with transaction.atomic():
+        # The stock is taken before anything is read, so the order never writes values it read earlier.
+        taken = Case(*[When(pk=product_id, then=Value(quantity)) for product_id, quantity in totals.items()])
+        invalid = any(result.get('status') == 'error' for result in results)
+        savepoint = transaction.savepoint()
+        if invalid or Product.objects.filter(pk__in=list(totals), active_status=True, stock__gte=taken).update(
+                stock=F('stock') - taken,
+                active_status=Case(When(stock=taken, then=Value(False)), default=Value(True))) < len(totals):
+            transaction.savepoint_rollback(savepoint)
+            current = Product.objects.only('stock', 'active_status').in_bulk(list(totals))
+            errors = {}
+            for product_id, quantity in totals.items():
+                product = current.get(product_id)
+                if product is None:
+                    errors[product_id] = "Product not found"
+                elif not product.active_status:
+                    errors[product_id] = "The Product is not available"
+                elif product.stock < quantity:
+                    errors[product_id] = "Not enough stock available"
+            for result in results:
+                if 'status' not in result and result['product_id'] in errors:
+                    result.update(status='error', error=errors[result['product_id']])
+            return _rejected(results)
+        transaction.savepoint_commit(savepoint)
+
+        added = Case(*[When(product_id=product_id, then=Value(quantity)) for product_id, quantity in totals.items()])
+        Inventory.objects.filter(product_id__in=list(totals)).update(stock=F('stock') + added)
+        products = Product.objects.only('stock', 'unit_price', 'supplier_id', 'supplier_name').in_bulk(list(totals))
+        inventories = {
+            inventory.product_id: inventory
+            for inventory in Inventory.objects.filter(product_id__in=list(totals)).only(
+                'stock', 'product_id', 'selling_unit_price')
+        }
+        new_prices = pricing.selling_prices(
+            products[product_id] for product_id in totals if product_id not in inventories)
+        new_inventories = []
+        for product_id, quantity in totals.items():
+            if product_id in inventories:
+                continue
+            product = products[product_id]
+            inventory = Inventory(
+                product=product, stock=quantity, selling_unit_price=new_prices[product_id],
+                supplier_name=product.supplier_name)
+            try:
+                inventory.clean()
+            except ValidationError as error:
+                transaction.set_rollback(True)
+                for result in results:
+                    if result['product_id'] == product_id:
+                        result.update(status='error', error=error.messages[0])
+                return _rejected(results)
+            new_inventories.append(inventory)
+            inventories[product_id] = inventory
+
+        Inventory.objects.bulk_create(new_inventories)
+        ledger.record_movements(
+            entry for product_id, quantity in totals.items() for entry in purchase_movements(product_id, quantity))
+        versions.bump(versions.PRODUCT, versions.INVENTORY)
+        fragments.invalidate(fragments.PRODUCT, list(totals))
+        fragments.invalidate(fragments.INVENTORY, list(totals))
+        valuation.apply_deltas(valuation.combine(
+            (products[product_id].supplier_id, valuation.contribution(
+                quantity, inventories[product_id].selling_unit_price, products[product_id].unit_price))
+            for product_id, quantity in totals.items()))
+
+    for result in results:
+        result.update(
+            status='ok',
+            stock=products[result['product_id']].stock,
+            inventory_stock=inventories[result['product_id']].stock)
+    return True, results
+
+
+def _rejected(results):
+    for result in results:
+        result.setdefault('status', 'ok')
+    return False, results
@@ -0,0 +1,65 @@
+from django.contrib.auth.models import User
+from django.db.models import OuterRef, Subquery
+
+from . import versions
+from .models import Inventory, Product, Supplier
+
+
+def for_product(product):
+    """
+    Returns the supplier name of a product being saved: the username of its supplier's user.
+    Reads it from the cached supplier when there is one, so a product saved with its supplier loaded costs no query.
+    """
+    if Product._meta.get_field('supplier').is_cached(product):
+        supplier = product.supplier
+        if Supplier._meta.get_field('user').is_cached(supplier):
+            return supplier.user.username
+    return User.objects.filter(supplier__pk=product.supplier_id).values_list('username', flat=True).first() or ''
+
+
+def for_inventory(inventory):
+    """
+    Returns the supplier name of an inventory row being saved, copied from its product.
+    """
+    if Inventory._meta.get_field('product').is_cached(inventory):
+        return inventory.product.supplier_name
+    return Product.objects.filter(pk=inventory.product_id).values_list('supplier_name', flat=True).first() or ''
+
+
+def of_suppliers(supplier_ids):
+    """
+    Returns a dict of supplier id to supplier name with one query, for set-based writes building many rows.
+    """
+    return dict(Supplier.objects.filter(pk__in=list(supplier_ids)).values_list('pk', 'user__username'))
+
+
+def sync(supplier_pks=None):
+    """
+    Copies the current username of the suppliers' users onto their products and inventory rows.
+
+    Two UPDATE statements, each only writing the rows whose name differs, so a sync that finds nothing
+    to change writes nothing.
+
+    Parameters:
+    - supplier_pks: The suppliers to sync, by default all of them.
+
+    Returns:
+    - A (products, inventory rows) tuple with the number of rows updated.
+    """
+    products = Product.objects.all()
+    inventory = Inventory.objects.all()
+    if supplier_pks is not None:
+        supplier_pks = list(supplier_pks)
+        products = products.filter(supplier__in=supplier_pks)
+        inventory = inventory.filter(product__supplier__in=supplier_pks)
+
+    username = Subquery(User.objects.filter(supplier=OuterRef('supplier')).values('username')[:1])
+    updated_products = products.exclude(supplier_name=username).update(supplier_name=username)
+    product_name = Subquery(Product.objects.filter(pk=OuterRef('product')).values('supplier_name')[:1])
+    updated_inventory = inventory.exclude(supplier_name=product_name).update(supplier_name=product_name)
+
+    changed = [name for name, count in ((versions.PRODUCT, updated_products), (versions.INVENTORY, updated_inventory))
+               if count]
+    if changed:
+        versions.bump(*changed)
+    return updated_products, updated_inventory
@@ -0,0 +1,81 @@
+import csv
+
+from django.http import HttpRequest, QueryDict
+from django.utils.dateparse import parse_datetime
+
+from . import forecast, jobs, reorder
+from .forms import InventorySearchForm
+from .importers import ImportFormatError, import_products
+from .pagination import KeysetPaginator
+from .views import InventoryReportMixin
+
+
+@jobs.task(jobs.INVENTORY_REPORT_CSV)
+def export_inventory_report(run, query=''):
+    """
+    Writes the inventory report as CSV, with the filters and sort order of the report's query string.
+
+    The rows are read with the report's own queries one keyset page of export_chunk_size rows at a time,
+    so no read statement stays open across chunks: with SQLite's rollback journal an open read would
+    keep every other process from committing a write, the progress updates of the other jobs included.
+    """
+    report = InventoryReportMixin()
+    report.request = HttpRequest()
+    report.request.GET = QueryDict(query)
+    form = InventorySearchForm(report.request.GET)
+    if not form.is_valid():
+        raise jobs.JobFailed('Invalid report filters.')
+
+    ordering = report.get_ordering(form)
+    columns = list(dict.fromkeys(report.export_fields + [field.lstrip('-') for field in ordering]))
+    queryset = report.get_queryset(form).values(*columns)
+    paginator = KeysetPaginator(queryset, ordering, per_page=report.export_chunk_size)
+    total = queryset.count()
+    done, cursor = 0, None
+    with run.open_result('inventory_report.csv', 'text/csv') as file:
+        writer = csv.writer(file)
+        writer.writerow(report.csv_header)
+        while True:
+            page = paginator.get_page(after=cursor)
+            writer.writerows([row[field] for field in report.export_fields] for row in page)
+            done += len(page)
+            run.progress(done, total, force=not page.has_next)
+            if not page.has_next:
+                return {'rows': done}
+            cursor = page.next_cursor
+
+
+@jobs.task(jobs.IMPORT_PRODUCTS)
+def import_supplier_products(run, supplier_id, upload, file_format):
+    """
+    Imports an uploaded catalog file (saved with jobs.save_upload) for a supplier and returns the import report.
+    The upload is removed afterwards; the job is queued with a single attempt, since the chunks imported before
+    a failure stay imported.
+    """
+    try:
+        with open(jobs.job_path(upload), 'rb') as file:
+            return import_products(
+                supplier_id, file, file_format,
+                progress=lambda report: run.progress(report['created'] + report['error_count']))
+    except ImportFormatError as error:
+        raise jobs.JobFailed(str(error))
+    except UnicodeDecodeError:
+        raise jobs.JobFailed('The file must be UTF-8 encoded.')
+    finally:
+        jobs.remove_file(upload)
+
+
+@jobs.task(jobs.REFRESH_REORDER_POINTS)
+def refresh_reorder_points(run):
+    """
+    Recomputes the reorder fields of the inventory (see reorder.refresh), reporting the rows written.
+    """
+    return reorder.refresh(progress=lambda written: run.progress(written, message='Rows written.'))
+
+
+@jobs.task(jobs.FORECAST_DEMAND)
+def forecast_demand(run, first, last, end):
+    """
+    Forecasts the demand of one chunk of the inventory (see forecast.enqueue_chunks).
+    """
+    return forecast.forecast_chunk(first, last, end=parse_datetime(end))
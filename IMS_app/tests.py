@@ -1,12 +1,43 @@
-from django.test import TestCase,Client
+import base64
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from io import StringIO
+from unittest import mock
+from asgiref.sync import async_to_sync
+from django.test import TestCase,TransactionTestCase,Client,RequestFactory,override_settings
+from django.test.utils import CaptureQueriesContext
+from django.core.management import call_command
+from django.core.cache import cache, caches
+from django.core.management.base import CommandError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, connections, transaction
+from django.db.models import Q
 from django.contrib.auth.models import User
 from decimal import Decimal
-from django.core.exceptions import ValidationError
-from django.db.utils import IntegrityError
+from django.core.exceptions import ImproperlyConfigured, ValidationError
+from django.db.utils import IntegrityError, OperationalError
+from django.http import QueryDict
 from django.urls import reverse,reverse_lazy
-from .models import Supplier,Product,Inventory
+from .models import Supplier,Product,Inventory,InventorySummary,Job,PricingRule,StockMovement,StockSnapshot
 from .helpers import create_user,create_supplier
+from .stock import low_stock_filter, purchase_product, purchase_products
+from .importers import import_products
+from .forms import InventorySearchForm
+from .pagination import KeysetPaginator
+from .db_backends.sqlite3.base import DatabaseWrapper as SqliteWrapper
+from .search import PRODUCT_INDEX, search_queryset
+from . import api, checks, forecast, fragments, instrumentation, jobs, ledger, pricing, reorder, views
+from datetime import timedelta
+from django.utils import timezone
+from django.utils.formats import date_format
+from .views import AdminDashboardView, AdminDashboardProductsView, InventoryReportView
 
+logger = logging.getLogger(__name__)
 
 USERNAME = "Test Supplier"
 PASSWORD = 'testpassword'
@@ -26,6 +57,7 @@ class TestSupplierModel(TestCase):
     - `test_unique_user_is_enforced`: Test that creating two suppliers with the same user raises an Exception.
     - `test_unique_phone_number`: Test that creating a supplier with an existing phone number raises an Exception.
     - `test_phone_number_length`: Test that creating a supplier with an invalid phone number length raises an Exception.
+    - `test_phone_number_length_set_based`: Test that the phone number length is enforced for queryset updates too.
     """
     
     def setUp(self):
@@ -58,12 +90,18 @@ class TestSupplierModel(TestCase):
             )
     def test_phone_number_length(self):
         invalid_phone_number = "12345678901234567890123" 
-        with self.assertRaises(ValidationError):
+        with self.assertRaises(IntegrityError):
             Supplier.objects.create(
                 user=self.different_user,
                 phone_number=invalid_phone_number,
                 address="Address"
             )
+
+    def test_phone_number_length_set_based(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Supplier.objects.filter(pk=self.supplier.pk).update(phone_number="1" * 21)
+        with self.assertRaises(ValidationError):
+            Supplier(user=self.different_user, phone_number="1" * 21, address="Address").full_clean()
             
 class TestProductModel(TestCase):
     """
@@ -73,6 +111,8 @@ class TestProductModel(TestCase):
     - `test_name_required`: Test that creating a product without a name raises an Exception.
     - `test_negative_unit_price`: Test that creating a product with a negative unit price raises an Exception.
     - `test_negative_stock_quantity`: Test that creating a product with a negative stock quantity raises an Exception.
+    - `test_set_based_writes_are_checked`: Test that bulk_create, bulk_update and update() cannot store invalid products.
+    - `test_full_clean_reports_field_errors`: Test that form validation still reports friendly field errors.
     """
 
     def setUp(self):
@@ -100,7 +140,7 @@ class TestProductModel(TestCase):
         self.assertTrue(product.active_status)
 
     def test_name_required(self):
-        with self.assertRaises(ValidationError):
+        with self.assertRaises(IntegrityError):
             Product.objects.create(
                 supplier=self.supplier,
                 description=PRODUCT_DESC,
@@ -110,7 +150,7 @@ class TestProductModel(TestCase):
             )
 
     def test_negative_unit_price(self):
-        with self.assertRaises(ValidationError):
+        with self.assertRaises(IntegrityError):
             Product.objects.create(
                 supplier=self.supplier,
                 name=PRODUCT_NAME,
@@ -130,6 +170,27 @@ class TestProductModel(TestCase):
                 stock=-10,
                 active_status=ACTIVE_STATUS
             )
+
+    def test_set_based_writes_are_checked(self):
+        product = Product.objects.create(
+            supplier=self.supplier, name=PRODUCT_NAME, description=PRODUCT_DESC, unit_price=UNIT_PRICE, stock=STOCK)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Product.objects.filter(pk=product.pk).update(unit_price=Decimal('0.00'))
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Product.objects.bulk_create([Product(
+                supplier=self.supplier, name='', description=PRODUCT_DESC, unit_price=UNIT_PRICE, stock=STOCK)])
+        product.unit_price = Decimal('-1.00')
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Product.objects.bulk_update([product], ['unit_price'])
+        product.refresh_from_db()
+        self.assertEqual(product.unit_price, UNIT_PRICE)
+
+    def test_full_clean_reports_field_errors(self):
+        product = Product(supplier=self.supplier, name='', description=PRODUCT_DESC, unit_price=Decimal('0.00'),
+                          stock=STOCK)
+        with self.assertRaises(ValidationError) as error:
+            product.full_clean()
+        self.assertEqual(set(error.exception.message_dict), {'name', 'unit_price'})
             
             
 class TestInventoryModel(TestCase):
@@ -137,9 +198,10 @@ class TestInventoryModel(TestCase):
     Test cases for the Inventory model.
 
     - `test_instance`: Test the creation of an Inventory instance with valid data.
-    - `test_negative_selling_unit_price`: Test that creating an inventory with a negative selling unit price raises a ValidationError.
+    - `test_negative_selling_unit_price`: Test that creating an inventory with a negative selling unit price raises an IntegrityError.
     - `test_negative_stock_quantity`: Test that creating an inventory with a negative stock quantity raises a ValidationError.
     - `test_unique_product`: Test that creating two inventories with the same product raises an IntegrityError.
+    - `test_selling_unit_price_set_based`: Test that the minimum selling unit price is enforced for queryset updates too.
     """
 
     def setUp(self):
@@ -169,7 +231,7 @@ class TestInventoryModel(TestCase):
         self.assertEqual(inventory.stock, 30)
 
     def test_negative_selling_unit_price(self):
-        with self.assertRaises(ValidationError):
+        with self.assertRaises(IntegrityError):
             Inventory.objects.create(
                 product=self.product,
                 selling_unit_price=Decimal('-5.00'),
@@ -197,6 +259,11 @@ class TestInventoryModel(TestCase):
                 stock=15
             )
 
+    def test_selling_unit_price_set_based(self):
+        inventory = Inventory.objects.create(product=self.product, selling_unit_price=Decimal('15.00'), stock=30)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Inventory.objects.filter(pk=inventory.pk).update(selling_unit_price=Decimal('0.00'))
+
 class CustomLoginViewTest(TestCase):
     """
     Test cases for the CustomLoginView.
@@ -408,3 +475,2313 @@ class AddProductViewTest(TestCase):
 
     def tearDown(self):
         self.client.logout()
+
+
+class InventoryReportExportTest(TestCase):
+    """
+    Test cases for the CSV export mode of the InventoryReportView.
+
+    Methods:
+    - setUp: Setup method to create a test admin user and products with inventory.
+    - test_export_streams_csv: Checks if the export is streamed as a CSV attachment with a header row.
+    - test_export_applies_search_and_sort: Checks if the export honours the search query and sort order.
+    - test_export_denied_for_non_admin: Checks if access is denied for non-admin users.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.admin = User.objects.create_superuser(
+            username='admin', password='testpassword', email="admin@example.com")
+        for index, stock in enumerate([30, 10, 20], start=1):
+            product = Product.objects.create(
+                supplier=create_supplier('user%s' % index, '12345%s' % index),
+                name="Product %s" % index,
+                description="Product description %s" % index,
+                unit_price=Decimal('10.00'),
+                stock=50,
+                active_status=True
+            )
+            Inventory.objects.create(product=product, selling_unit_price=Decimal('13.00'), stock=stock)
+
+    def export(self, params):
+        self.client.login(username='admin', password='testpassword')
+        response = self.client.get(reverse_lazy('inventory_report'), dict(params, export='csv'))
+        self.client.logout()
+        return response
+
+    def test_export_streams_csv(self):
+        response = self.export({})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertIn('attachment', response['Content-Disposition'])
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Product Name,Supplier,Purchase Price,Selling Price,Quantity')
+        self.assertEqual(len(lines), 4)
+        self.assertIn('Product 1,user1,10.00,13.00,30', lines)
+
+    def test_export_applies_search_and_sort(self):
+        response = self.export({'sort_by': 'stock'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([line.split(',')[0] for line in lines[1:]], ['Product 2', 'Product 3', 'Product 1'])
+
+        response = self.export({'search': 'description 3'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[1].startswith('Product 3,'))
+
+    def test_export_denied_for_non_admin(self):
+        create_user(username='normaluser', password='password')
+        self.client.login(username='normaluser', password='password')
+        response = self.client.get(reverse_lazy('inventory_report'), {'export': 'csv'})
+        self.assertEqual(response.status_code, 403)
+
+
+class QueryBudgetTest(TestCase):
+    """
+    Query-budget regression tests for the admin and supplier list views.
+
+    Every view must run a fixed number of queries regardless of how many rows it renders,
+    so related rows have to be loaded up front instead of once per template row.
+
+    Methods:
+    - setUp: Setup method to create an admin user and a supplier user.
+    - populate: Creates `count` products (each from its own supplier) with inventory.
+    - assertQueryBudget: Renders a URL for a small and a large data set and checks both stay on budget.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.admin = User.objects.create_superuser(
+            username='admin', password='testpassword', email="admin@example.com")
+        self.supplier = create_supplier('budgetsupplier', '5550000')
+        self.created = 0
+
+    def populate(self, count):
+        for _ in range(count):
+            self.created += 1
+            supplier = Supplier.objects.create(
+                user=User.objects.create(username='supplier%s' % self.created),
+                phone_number='555%s' % self.created,
+                address=ADDRESS
+            )
+            for owner in (supplier, self.supplier):
+                product = Product.objects.create(
+                    supplier=owner,
+                    name="Product %s" % self.created,
+                    description="Product description",
+                    unit_price=Decimal('10.00'),
+                    stock=10,
+                    active_status=True
+                )
+                Inventory.objects.create(product=product, selling_unit_price=Decimal('13.00'), stock=5)
+
+    def assertQueryBudget(self, username, password, url, budget):
+        self.client.login(username=username, password=password)
+        counts = []
+        for count in (2, 20):
+            self.populate(count)
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.client.logout()
+        self.assertEqual(counts, [budget, budget])
+
+    def test_admin_dashboard(self):
+        self.assertQueryBudget('admin', 'testpassword', reverse('admin_dashboard'), 4)
+
+    def test_admin_products(self):
+        self.assertQueryBudget('admin', 'testpassword', reverse('admin_dashboard_products'), 3)
+
+    def test_admin_suppliers(self):
+        self.assertQueryBudget('admin', 'testpassword', reverse('admin_dashboard_suppliers'), 3)
+
+    def test_admin_supplier_detail(self):
+        url = reverse('admin_supplier_detail', args=[self.supplier.pk])
+        self.assertQueryBudget('admin', 'testpassword', url, 4)
+
+    def test_inventory_report(self):
+        self.assertQueryBudget('admin', 'testpassword', reverse('inventory_report'), 3)
+
+    def test_supplier_dashboard(self):
+        self.assertQueryBudget('budgetsupplier', 'supplierpass', reverse('supplier_dashboard'), 3)
+
+
+class KeysetPaginationTest(TestCase):
+    """
+    Test cases for the cursor pagination of the list views.
+
+    Methods:
+    - setUp: Setup method to create an admin user and inventory rows with duplicate stock values.
+    - collect: Follows the next (or previous) links of a view and returns the rows of every page.
+    - test_pages_cover_all_rows_in_order: Checks if walking the pages returns every row once, in sort order.
+    - test_previous_pages: Checks if walking backwards returns the same pages as walking forwards.
+    - test_cursor_respects_search: Checks if search parameters are kept in the page links.
+    - test_page_query_count_is_constant: Checks if a deep page costs the same number of queries as the first one.
+    - test_invalid_cursor: Checks if a malformed cursor, or one with wrong-typed or null values, returns a 404.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.admin = User.objects.create_superuser(
+            username='admin', password='testpassword', email="admin@example.com")
+        supplier = create_supplier('pagesupplier', '5551234')
+        for index in range(12):
+            product = Product.objects.create(
+                supplier=supplier,
+                name="Product %02d" % index,
+                description="Product description %s" % ('even' if index % 2 == 0 else 'odd'),
+                unit_price=Decimal('10.00'),
+                stock=10,
+                active_status=True
+            )
+            Inventory.objects.create(product=product, selling_unit_price=Decimal('13.00'), stock=index % 3)
+        self.client.login(username='admin', password='testpassword')
+
+    def collect(self, url, context_key, link='next_url'):
+        pages = []
+        response = self.client.get(url)
+        while True:
+            self.assertEqual(response.status_code, 200)
+            page = response.context['page_obj']
+            pages.append([item.pk for item in response.context[context_key]])
+            target = getattr(page, link)
+            if not target:
+                return pages
+            response = self.client.get(url.split('?')[0] + target)
+
+    @mock.patch.object(InventoryReportView, 'paginate_by', 5)
+    def test_pages_cover_all_rows_in_order(self):
+        pages = self.collect(reverse('inventory_report') + '?sort_by=-stock', 'inventory')
+        self.assertEqual([len(page) for page in pages], [5, 5, 2])
+        expected = list(Inventory.objects.order_by('-stock', '-pk').values_list('pk', flat=True))
+        self.assertEqual(sum(pages, []), expected)
+
+    @mock.patch.object(AdminDashboardView, 'paginate_by', 5)
+    def test_previous_pages(self):
+        url = reverse('admin_dashboard')
+        forward = self.collect(url, 'inventory_list')
+        response = self.client.get(url)
+        while response.context['page_obj'].next_url:
+            response = self.client.get(url + response.context['page_obj'].next_url)
+        backward = self.collect(url + response.context['page_obj'].previous_url, 'inventory_list', 'previous_url')
+        self.assertEqual(backward, forward[-2::-1])
+
+    @mock.patch.object(AdminDashboardView, 'paginate_by', 2)
+    def test_cursor_respects_search(self):
+        pages = self.collect(reverse('admin_dashboard') + '?search=even', 'inventory_list')
+        self.assertEqual(len(pages), 3)
+        names = Inventory.objects.filter(pk__in=sum(pages, [])).values_list('product__name', flat=True)
+        self.assertEqual(len(names), 6)
+        self.assertTrue(all(int(name.split()[-1]) % 2 == 0 for name in names))
+
+    @mock.patch.object(AdminDashboardProductsView, 'paginate_by', 2)
+    def test_page_query_count_is_constant(self):
+        url = reverse('admin_dashboard_products')
+        with CaptureQueriesContext(connection) as first:
+            response = self.client.get(url)
+        for _ in range(3):
+            response = self.client.get(url + response.context['page_obj'].next_url)
+        with CaptureQueriesContext(connection) as deep:
+            self.client.get(url + response.context['page_obj'].next_url)
+        self.assertEqual(len(first), len(deep))
+        self.assertNotIn('OFFSET', deep.captured_queries[-1]['sql'])
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('admin_dashboard'), {'after': 'not-a-cursor'})
+        self.assertEqual(response.status_code, 404)
+
+        def cursor(values):
+            return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+        # Cursors that decode fine but hold values of the wrong type, or nulls.
+        for url, params in [
+            (reverse('admin_dashboard'), {'after': cursor(['x'])}),
+            (reverse('inventory_report'), {'sort_by': 'stock', 'after': cursor(['x', 1])}),
+            (reverse('inventory_report'), {'sort_by': 'selling_price', 'after': cursor(['abc', 1])}),
+            (reverse('inventory_report'), {'sort_by': 'product', 'after': cursor([None, None])}),
+            (reverse('api_products'), {'after': cursor([{'a': 1}])}),
+            (reverse('low_stock_feed'), {'after': cursor(['a', 'b'])}),
+            (reverse('admin_dashboard'), {'after': '["x"]'}),
+        ]:
+            self.assertEqual(self.client.get(url, params).status_code, 404, (url, params))
+
+
+class FullTextSearchTest(TestCase):
+    """
+    Test cases for the FTS5 backed product and supplier search.
+
+    Methods:
+    - setUp: Setup method to create an admin user and products from two suppliers.
+    - search: Runs a search on an admin view and returns the names in the listed order.
+    - test_search_uses_index: Checks if the search query is answered through the FTS table.
+    - test_index_follows_product_changes: Checks if creating, renaming and deleting products keeps the index in sync.
+    - test_index_follows_supplier_username: Checks if renaming a supplier's user is reflected in product and supplier search.
+    - test_results_are_ranked: Checks if better matches are listed first.
+    - test_short_query_falls_back: Checks if queries too short for the trigram index still match.
+    - test_short_supplier_query_matches_like_long_one: Checks if short and long queries both match supplier names
+      as substrings on the inventory report.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.admin = User.objects.create_superuser(
+            username='admin', password='testpassword', email="admin@example.com")
+        self.acme = create_supplier('acme', '5550001')
+        self.globex = create_supplier('globex', '5550002')
+        self.hammer = Product.objects.create(
+            supplier=self.acme, name="Claw Hammer", description="Steel hammer",
+            unit_price=Decimal('10.00'), stock=10)
+        self.wrench = Product.objects.create(
+            supplier=self.globex, name="Wrench", description="Adjustable wrench, pairs well with a hammer",
+            unit_price=Decimal('12.00'), stock=10)
+        self.client.login(username='admin', password='testpassword')
+
+    def search(self, url_name, query, context_key='product_list'):
+        response = self.client.get(reverse(url_name), {'search': query})
+        self.assertEqual(response.status_code, 200)
+        return [str(item.name if hasattr(item, 'name') else item.user.username)
+                for item in response.context[context_key]]
+
+    def test_search_uses_index(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.search('admin_dashboard_products', 'hammer')
+        self.assertTrue(any('MATCH' in query['sql'] for query in queries))
+        self.assertFalse(any('LIKE' in query['sql'] for query in queries))
+
+    def test_index_follows_product_changes(self):
+        self.assertEqual(self.search('admin_dashboard_products', 'Screwdriver'), [])
+        screwdriver = Product.objects.create(
+            supplier=self.acme, name="Screwdriver", description="Flat head",
+            unit_price=Decimal('5.00'), stock=10)
+        self.assertEqual(self.search('admin_dashboard_products', 'screwdriver'), ['Screwdriver'])
+
+        screwdriver.name = "Chisel"
+        screwdriver.save()
+        self.assertEqual(self.search('admin_dashboard_products', 'screwdriver'), [])
+        self.assertEqual(self.search('admin_dashboard_products', 'chisel'), ['Chisel'])
+
+        screwdriver.delete()
+        self.assertEqual(self.search('admin_dashboard_products', 'chisel'), [])
+
+    def test_index_follows_supplier_username(self):
+        user = self.globex.user
+        user.username = 'initech'
+        user.save()
+        self.assertEqual(self.search('admin_dashboard_products', 'initech'), ['Wrench'])
+        self.assertEqual(self.search('admin_dashboard_products', 'globex'), [])
+        self.assertEqual(self.search('admin_dashboard_suppliers', 'initech', 'suppliers_list'), ['initech'])
+
+    def test_results_are_ranked(self):
+        Product.objects.create(
+            supplier=self.acme, name="Hammer", description="Sledge hammer",
+            unit_price=Decimal('30.00'), stock=10)
+        self.assertEqual(self.search('admin_dashboard_products', 'hammer'), ['Hammer', 'Claw Hammer', 'Wrench'])
+
+    def test_short_query_falls_back(self):
+        self.assertEqual(self.search('admin_dashboard_products', 'cl'), ['Claw Hammer'])
+
+    def test_short_supplier_query_matches_like_long_one(self):
+        for product in (self.hammer, self.wrench):
+            Inventory.objects.create(product=product, selling_unit_price=Decimal('15.00'), stock=5)
+        for query in ('ob', 'globe'):
+            response = self.client.get(reverse('inventory_report'), {'search': query})
+            self.assertEqual([item.product.name for item in response.context['inventory']], ['Wrench'], query)
+
+
+class ProductPurchaseViewTest(TestCase):
+    """
+    Test cases for the ProductPurchaseView.
+
+    Methods:
+    - setUp: Setup method to create a test admin user and a product.
+    - purchase: Posts a purchase of `quantity` units as the admin user.
+    - test_purchase_moves_stock: Checks if purchasing moves the stock from the product into a new inventory row.
+    - test_purchase_adds_to_existing_inventory: Checks if repeated purchases add to the same inventory row.
+    - test_purchase_all_stock_deactivates_product: Checks if the product is deactivated when its stock runs out.
+    - test_purchase_more_than_stock: Checks if oversized purchases are rejected without changing stock.
+    - test_purchase_inactive_product: Checks if inactive products cannot be purchased.
+    - test_purchase_non_integer_stock: Checks if a stock that is not a whole number is rejected with a message.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.admin = User.objects.create_superuser(
+            username='admin', password='testpassword', email="admin@example.com")
+        self.product = Product.objects.create(
+            supplier=create_supplier('purchasesupplier', '5557777'),
+            name=PRODUCT_NAME,
+            description=PRODUCT_DESC,
+            unit_price=UNIT_PRICE,
+            stock=STOCK,
+            active_status=True
+        )
+        self.client.login(username='admin', password='testpassword')
+
+    def purchase(self, quantity):
+        return self.client.post(reverse('purchase_product', args=[self.product.pk]), {'stock': quantity})
+
+    def test_purchase_moves_stock(self):
+        response = self.purchase(20)
+        self.assertRedirects(response, reverse('admin_dashboard'))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, STOCK - 20)
+        inventory = Inventory.objects.get(product=self.product)
+        self.assertEqual(inventory.stock, 20)
+        self.assertEqual(inventory.selling_unit_price, Decimal('16.04'))
+
+    def test_purchase_adds_to_existing_inventory(self):
+        self.purchase(20)
+        Inventory.objects.filter(product=self.product).update(selling_unit_price=Decimal('99.00'))
+        self.purchase(5)
+        inventory = Inventory.objects.get(product=self.product)
+        self.assertEqual(inventory.stock, 25)
+        self.assertEqual(inventory.selling_unit_price, Decimal('99.00'))
+
+    def test_purchase_all_stock_deactivates_product(self):
+        self.purchase(STOCK)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, 0)
+        self.assertFalse(self.product.active_status)
+
+    def test_purchase_more_than_stock(self):
+        response = self.purchase(STOCK + 1)
+        self.assertEqual(response.context['error'], "Not enough stock available")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, STOCK)
+        self.assertFalse(Inventory.objects.filter(product=self.product).exists())
+
+    def test_purchase_inactive_product(self):
+        Product.objects.filter(pk=self.product.pk).update(active_status=False)
+        response = self.purchase(1)
+        self.assertEqual(response.context['error'], "The Product is not available")
+
+    def test_purchase_non_integer_stock(self):
+        for quantity in ('abc', '1.5'):
+            response = self.purchase(quantity)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['error'], "Stock must be a whole number")
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock, STOCK)
+
+
+class ConcurrentPurchaseTest(TransactionTestCase):
+    """
+    Stress test for purchase_product and purchase_products: many threads buy the same products at once.
+
+    Every successful purchase must be reflected exactly once in both the product and the
+    inventory stock (no lost updates), and no more units may be sold than were in stock.
+    The measured purchase rate is logged at INFO level.
+    """
+
+    THREADS = 8
+    PURCHASES_PER_THREAD = 25
+
+    def test_no_lost_updates_or_overselling(self):
+        initial_stock = self.THREADS * self.PURCHASES_PER_THREAD - 10
+        product = Product.objects.create(
+            supplier=create_supplier('stresssupplier', '5558888'),
+            name=PRODUCT_NAME,
+            description=PRODUCT_DESC,
+            unit_price=UNIT_PRICE,
+            stock=initial_stock,
+            active_status=True
+        )
+        succeeded, rejected, errors = [], [], []
+        barrier = threading.Barrier(self.THREADS)
+
+        def buyer():
+            barrier.wait()
+            try:
+                for _ in range(self.PURCHASES_PER_THREAD):
+                    while True:
+                        try:
+                            purchase_product(product, 1)
+                            succeeded.append(1)
+                        except ValidationError:
+                            rejected.append(1)
+                        except OperationalError as error:
+                            # The shared-cache test database reports lock contention instead of waiting;
+                            # the purchase is atomic, so it is safe to retry.
+                            if 'locked' not in str(error):
+                                raise
+                            continue
+                        break
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buyer) for _ in range(self.THREADS)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(errors, [])
+        product.refresh_from_db()
+        inventory = Inventory.objects.get(product=product)
+        self.assertEqual(len(succeeded), initial_stock)
+        self.assertEqual(len(rejected), 10)
+        self.assertEqual(product.stock, 0)
+        self.assertFalse(product.active_status)
+        self.assertEqual(inventory.stock, initial_stock)
+        logger.info("%.0f purchases/second over %s threads", len(succeeded) / elapsed, self.THREADS)
+
+    def test_orders_no_lost_updates_or_overselling(self):
+        supplier = create_supplier('orderstresssupplier', '5558989')
+        products = [
+            Product.objects.create(
+                supplier=supplier, name="%s %s" % (PRODUCT_NAME, index), description=PRODUCT_DESC,
+                unit_price=UNIT_PRICE, stock=self.THREADS * self.PURCHASES_PER_THREAD - 10, active_status=True)
+            for index in range(2)
+        ]
+        lines = [{'product_id': product.pk, 'quantity': 1} for product in products]
+        succeeded, rejected, errors = [], [], []
+        barrier = threading.Barrier(self.THREADS)
+
+        def buyer():
+            barrier.wait()
+            try:
+                for _ in range(self.PURCHASES_PER_THREAD):
+                    while True:
+                        try:
+                            success, _results = purchase_products(lines)
+                        except OperationalError as error:
+                            if 'locked' not in str(error):
+                                raise
+                            continue
+                        (succeeded if success else rejected).append(1)
+                        break
+            except Exception as error:
+                errors.append(error)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=buyer) for _ in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual((len(succeeded), len(rejected)), (self.THREADS * self.PURCHASES_PER_THREAD - 10, 10))
+        for product in products:
+            product.refresh_from_db()
+            self.assertEqual((product.stock, product.active_status), (0, False))
+            self.assertEqual(Inventory.objects.get(product=product).stock, len(succeeded))
+
+
+class PurchaseOrderViewTest(TestCase):
+    """
+    Test cases for the PurchaseOrderView.
+
+    Methods:
+    - setUp: Setup method to create a test admin user and products, one of them already in the inventory.
+    - order: Posts a purchase order with the given lines as the admin user.
+    - test_order_applies_all_lines: Checks if every line moves stock into the inventory.
+    - test_order_is_all_or_nothing: Checks if one invalid line rejects the whole order with per-line errors.
+    - test_duplicate_lines_are_combined: Checks if lines for the same product are validated against their total.
+    - test_query_count_is_constant: Checks if the number of queries does not depend on the number of lines.
+    - test_invalid_body: Checks if malformed bodies are rejected.
+    - test_fractional_quantity_is_rejected: Checks if non-integral quantities are rejected instead of truncated.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.admin = User.objects.create_superuser(
+            username='admin', password='testpassword', email="admin@example.com")
+        self.supplier = create_supplier('ordersupplier', '5556666')
+        self.products = [
+            Product.objects.create(
+                supplier=self.supplier,
+                name="Product %s" % index,
+                description=PRODUCT_DESC,
+                unit_price=UNIT_PRICE,
+                stock=10,
+                active_status=True
+            ) for index in range(3)
+        ]
+        Inventory.objects.create(product=self.products[0], selling_unit_price=Decimal('20.00'), stock=7)
+        self.client.login(username='admin', password='testpassword')
+
+    def order(self, lines):
+        return self.client.post(
+            reverse('purchase_order'), json.dumps({'lines': lines}), content_type='application/json')
+
+    def test_order_applies_all_lines(self):
+        response = self.order([
+            {'product_id': self.products[0].pk, 'quantity': 3},
+            {'product_id': self.products[1].pk, 'quantity': 10},
+        ])
+        self.assertEqual(response.status_code, 200)
+        lines = response.json()['lines']
+        self.assertEqual([line['status'] for line in lines], ['ok', 'ok'])
+        self.assertEqual(lines[0]['inventory_stock'], 10)
+        self.assertEqual(Inventory.objects.get(product=self.products[0]).stock, 10)
+        self.assertEqual(Inventory.objects.get(product=self.products[1]).stock, 10)
+        self.assertEqual(Inventory.objects.get(product=self.products[1]).selling_unit_price, Decimal('16.04'))
+        self.products[1].refresh_from_db()
+        self.assertEqual(self.products[1].stock, 0)
+        self.assertFalse(self.products[1].active_status)
+
+    def test_order_is_all_or_nothing(self):
+        response = self.order([
+            {'product_id': self.products[0].pk, 'quantity': 3},
+            {'product_id': self.products[1].pk, 'quantity': 11},
+            {'product_id': 999999, 'quantity': 1},
+        ])
+        self.assertEqual(response.status_code, 400)
+        lines = response.json()['lines']
+        self.assertEqual([line['status'] for line in lines], ['ok', 'error', 'error'])
+        self.assertEqual(lines[1]['error'], "Not enough stock available")
+        self.assertEqual(lines[2]['error'], "Product not found")
+        self.assertEqual(Inventory.objects.get(product=self.products[0]).stock, 7)
+        self.assertEqual(Product.objects.get(pk=self.products[1].pk).stock, 10)
+
+    def test_duplicate_lines_are_combined(self):
+        response = self.order([
+            {'product_id': self.products[2].pk, 'quantity': 6},
+            {'product_id': self.products[2].pk, 'quantity': 6},
+        ])
+        self.assertEqual(response.status_code, 400)
+        response = self.order([
+            {'product_id': self.products[2].pk, 'quantity': 4},
+            {'product_id': self.products[2].pk, 'quantity': 6},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Inventory.objects.get(product=self.products[2]).stock, 10)
+
+    def test_query_count_is_constant(self):
+        many = [
+            Product.objects.create(
+                supplier=self.supplier, name="Bulk %s" % index, description=PRODUCT_DESC,
+                unit_price=UNIT_PRICE, stock=10) for index in range(30)
+        ]
+        counts = []
+        for products in (self.products[1:], many):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.order([{'product_id': product.pk, 'quantity': 1} for product in products])
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_invalid_body(self):
+        response = self.client.post(reverse('purchase_order'), 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.order([{'product_id': self.products[0].pk, 'quantity': -1}])
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['lines'][0]['status'], 'error')
+
+    def test_fractional_quantity_is_rejected(self):
+        for quantity in (1.5, 1e3, True, '2.0'):
+            response = self.order([{'product_id': self.products[1].pk, 'quantity': quantity}])
+            self.assertEqual(response.status_code, 400)
+            self.assertEqual(response.json()['lines'][0]['error'], "Each line needs an integer product_id and quantity")
+        self.assertFalse(Inventory.objects.filter(product=self.products[1]).exists())
+        response = self.order([{'product_id': str(self.products[1].pk), 'quantity': '2'}])
+        self.assertEqual(response.status_code, 200)
+
+
+class ProductImportViewTest(TestCase):
+    """
+    Test cases for the ProductImportView.
+
+    Methods:
+    - setUp: Setup method to create a test supplier user.
+    - upload: Uploads a file with the given name and content as the supplier.
+    - test_csv_import: Checks if valid CSV rows are created and invalid rows are reported.
+    - test_ndjson_import: Checks if NDJSON rows are created and unparsable lines are reported.
+    - test_import_in_chunks: Checks if rows are inserted with one bulk insert per chunk.
+    - test_imported_products_are_searchable: Checks if imported products are added to the search index.
+    - test_rejected_uploads: Checks if unsupported files and files missing columns are rejected.
+    - test_access_denied_for_non_supplier: Checks if access is denied for non-supplier users.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.supplier = create_supplier('importsupplier', '5554444')
+        self.client.login(username='importsupplier', password='supplierpass')
+
+    def upload(self, name, content):
+        upload = SimpleUploadedFile(name, content.encode())
+        return self.client.post(reverse('import_products'), {'file': upload})
+
+    def test_csv_import(self):
+        response = self.upload('catalog.csv', (
+            "name,description,unit_price,stock,active_status\n"
+            "Hammer,Steel hammer,12.50,10,true\n"
+            ",No name,5.00,1,true\n"
+            "Wrench,Bad price,0.00,3,true\n"
+            "Saw,\"Sharp, long\",20.00,4,false\n"
+            "Drill,Bad stock,15.00,lots,true\n"
+        ))
+        self.assertEqual(response.status_code, 200)
+        report = response.json()
+        self.assertEqual(report['created'], 2)
+        self.assertEqual(report['error_count'], 3)
+        self.assertEqual([error['row'] for error in report['errors']], [2, 3, 5])
+        self.assertIn('name', report['errors'][0]['errors'])
+        self.assertIn('unit_price', report['errors'][1]['errors'])
+        self.assertIn('stock', report['errors'][2]['errors'])
+        saw = Product.objects.get(name='Saw')
+        self.assertEqual(saw.supplier, self.supplier)
+        self.assertEqual(saw.description, 'Sharp, long')
+        self.assertEqual(saw.unit_price, Decimal('20.00'))
+        self.assertFalse(saw.active_status)
+
+    def test_ndjson_import(self):
+        response = self.upload('catalog.ndjson', (
+            '{"name": "Hammer", "description": "Steel hammer", "unit_price": "12.50", "stock": 10}\n'
+            '\n'
+            'not json\n'
+            '{"name": "Wrench", "description": "Adjustable", "unit_price": 7, "stock": -1}\n'
+        ))
+        report = response.json()
+        self.assertEqual(report['created'], 1)
+        self.assertEqual([error['row'] for error in report['errors']], [3, 4])
+        self.assertTrue(Product.objects.filter(name='Hammer', supplier=self.supplier).exists())
+
+    @mock.patch('IMS_app.importers.IMPORT_CHUNK_SIZE', 2)
+    def test_import_in_chunks(self):
+        rows = ''.join("Product %s,Description,1.00,1\n" % index for index in range(5))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.upload('catalog.csv', "name,description,unit_price,stock\n" + rows)
+        self.assertEqual(response.json()['created'], 5)
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "IMS_app_product"')]
+        self.assertEqual(len(inserts), 3)
+
+    def test_imported_products_are_searchable(self):
+        self.upload('catalog.csv', "name,description,unit_price,stock\nScrewdriver,Flat head,3.00,5\n")
+        response = self.client.get(reverse('supplier_dashboard'), {'search': 'screwdriver'})
+        self.assertEqual([product.name for product in response.context['products_list']], ['Screwdriver'])
+
+    def test_rejected_uploads(self):
+        response = self.upload('catalog.xlsx', "whatever")
+        self.assertEqual(response.status_code, 400)
+        response = self.upload('catalog.csv', "title,price\nHammer,1.00\n")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('Missing CSV columns', response.json()['message'])
+        self.assertFalse(Product.objects.exists())
+
+    def test_access_denied_for_non_supplier(self):
+        create_user(username='normaluser', password='password')
+        self.client.login(username='normaluser', password='password')
+        response = self.upload('catalog.csv', "name,description,unit_price,stock\n")
+        self.assertEqual(response.status_code, 403)
+
+
+class SupplierIdentityTest(TestCase):
+    """
+    Test cases for the session cached supplier identity used by the SupplierLoginMixin.
+
+    Methods:
+    - setUp: Setup method to create a test supplier user with a product.
+    - test_identity_resolved_at_login: Checks if the role and supplier id are stored in the session at login.
+    - test_supplier_pages_skip_supplier_lookup: Checks if supplier pages do not query the supplier table.
+    - test_deleting_supplier_revokes_access: Checks if deleting the supplier invalidates the cached identity.
+    - test_creating_supplier_grants_access: Checks if a logged-in user becomes a supplier without logging in again.
+    - edit: Posts an edit of the product as the logged-in user.
+    - test_reassigning_supplier_revokes_access: Checks if giving the supplier to another user moves the access to them.
+    - test_writes_check_supplier_in_database: Checks if writes are refused with a stale cached identity.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        self.supplier = create_supplier('identitysupplier', '5553333')
+        self.product = Product.objects.create(
+            supplier=self.supplier, name=PRODUCT_NAME, description=PRODUCT_DESC,
+            unit_price=UNIT_PRICE, stock=STOCK)
+
+    def test_identity_resolved_at_login(self):
+        self.client.login(username='identitysupplier', password='supplierpass')
+        identity = self.client.session['ims_identity']
+        self.assertEqual(identity['role'], 'supplier')
+        self.assertEqual(identity['supplier_id'], self.supplier.pk)
+
+    def test_supplier_pages_skip_supplier_lookup(self):
+        self.client.login(username='identitysupplier', password='supplierpass')
+        for url in (reverse('supplier_dashboard'), reverse('add_product'),
+                    reverse('edit_product', args=[self.product.pk])):
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any('"IMS_app_supplier"' in query['sql'] for query in queries), url)
+
+    def test_deleting_supplier_revokes_access(self):
+        self.client.login(username='identitysupplier', password='supplierpass')
+        self.assertEqual(self.client.get(reverse('supplier_dashboard')).status_code, 200)
+        self.supplier.delete()
+        self.assertEqual(self.client.get(reverse('supplier_dashboard')).status_code, 403)
+
+    def test_creating_supplier_grants_access(self):
+        create_user(username='newsupplier', password='password')
+        self.client.login(username='newsupplier', password='password')
+        self.assertEqual(self.client.get(reverse('supplier_dashboard')).status_code, 403)
+        Supplier.objects.create(user=User.objects.get(username='newsupplier'), phone_number='5552222', address=ADDRESS)
+        self.assertEqual(self.client.get(reverse('supplier_dashboard')).status_code, 200)
+
+    def edit(self):
+        return self.client.post(reverse('edit_product', args=[self.product.pk]), {
+            'name': 'Renamed', 'description': PRODUCT_DESC, 'unit_price': UNIT_PRICE, 'stock': STOCK,
+            'active_status': True})
+
+    def test_reassigning_supplier_revokes_access(self):
+        self.client.login(username='identitysupplier', password='supplierpass')
+        self.assertEqual(self.client.get(reverse('supplier_dashboard')).status_code, 200)
+        self.supplier.user = create_user(username='newowner', password='password')
+        self.supplier.save()
+        self.assertEqual(self.client.get(reverse('supplier_dashboard')).status_code, 403)
+        self.assertEqual(self.edit().status_code, 403)
+
+        new_owner = Client()
+        new_owner.login(username='newowner', password='password')
+        self.assertEqual(new_owner.get(reverse('supplier_dashboard')).status_code, 200)
+
+    def test_writes_check_supplier_in_database(self):
+        self.client.login(username='identitysupplier', password='supplierpass')
+        self.client.get(reverse('supplier_dashboard'))
+        # As if the invalidation happened in a process whose cache this one does not see.
+        with mock.patch('IMS_app.signals.identity.invalidate_identity'):
+            self.supplier.user = create_user(username='newowner', password='password')
+            self.supplier.save()
+        self.assertEqual(self.client.get(reverse('supplier_dashboard')).status_code, 200)
+        self.assertEqual(self.edit().status_code, 403)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.name, PRODUCT_NAME)
+
+
+class InventorySummaryTest(TestCase):
+    """
+    Test cases for the incrementally maintained inventory valuation summary.
+
+    Methods:
+    - setUp: Setup method to create two suppliers with a product each and a test admin user.
+    - totals: Returns the stored (units, stock value, purchase cost) of a supplier, or the global row.
+    - assertSummaryConsistent: Checks if the stored summary matches a fresh aggregate using the --check command.
+    - test_inventory_save_and_delete: Checks if creating, editing and deleting inventory rows update the summary.
+    - test_purchase_updates_summary: Checks if single purchases and purchase orders update the summary.
+    - test_product_price_change_revalues: Checks if changing a product's unit price re-values its inventory.
+    - test_check_detects_drift_and_rebuild_fixes_it: Checks if --check fails on a stale summary and a rebuild repairs it.
+    - test_dashboard_and_summary_endpoint: Checks if the totals are shown on the dashboard and served as JSON.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser(username='admin', password='testpassword', email="admin@example.com")
+        self.suppliers = [create_supplier('summary%s' % index, '555900%s' % index) for index in range(2)]
+        self.products = [
+            Product.objects.create(
+                supplier=supplier, name=PRODUCT_NAME, description=PRODUCT_DESC,
+                unit_price=Decimal('10.00'), stock=STOCK, active_status=True)
+            for supplier in self.suppliers
+        ]
+
+    def totals(self, supplier=None):
+        summary = InventorySummary.objects.filter(supplier=supplier).first() if supplier else \
+            InventorySummary.objects.filter(supplier__isnull=True).first()
+        if summary is None:
+            return (0, Decimal('0'), Decimal('0'))
+        return (summary.total_units, summary.stock_value, summary.purchase_cost)
+
+    def assertSummaryConsistent(self):
+        call_command('rebuild_inventory_summary', check=True, stdout=mock.MagicMock())
+
+    def test_inventory_save_and_delete(self):
+        inventory = Inventory.objects.create(product=self.products[0], selling_unit_price=Decimal('13.00'), stock=4)
+        self.assertEqual(self.totals(), (4, Decimal('52.00'), Decimal('40.00')))
+        self.assertEqual(self.totals(self.suppliers[0]), (4, Decimal('52.00'), Decimal('40.00')))
+
+        inventory.stock = 6
+        inventory.selling_unit_price = Decimal('15.00')
+        inventory.save()
+        self.assertEqual(self.totals(), (6, Decimal('90.00'), Decimal('60.00')))
+        self.assertSummaryConsistent()
+
+        inventory.delete()
+        self.assertEqual(self.totals(), (0, Decimal('0.00'), Decimal('0.00')))
+        self.assertSummaryConsistent()
+
+    def test_purchase_updates_summary(self):
+        purchase_product(self.products[0], 5)
+        self.assertEqual(self.totals(self.suppliers[0]), (5, Decimal('65.00'), Decimal('50.00')))
+
+        self.client.login(username='admin', password='testpassword')
+        response = self.client.post(reverse('purchase_order'), json.dumps({'lines': [
+            {'product_id': self.products[0].pk, 'quantity': 1},
+            {'product_id': self.products[1].pk, 'quantity': 2},
+        ]}), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.totals(self.suppliers[0]), (6, Decimal('78.00'), Decimal('60.00')))
+        self.assertEqual(self.totals(self.suppliers[1]), (2, Decimal('26.00'), Decimal('20.00')))
+        self.assertEqual(self.totals(), (8, Decimal('104.00'), Decimal('80.00')))
+        self.assertSummaryConsistent()
+
+    def test_product_price_change_revalues(self):
+        Inventory.objects.create(product=self.products[0], selling_unit_price=Decimal('13.00'), stock=4)
+        self.products[0].unit_price = Decimal('11.50')
+        self.products[0].save()
+        self.assertEqual(self.totals(), (4, Decimal('52.00'), Decimal('46.00')))
+        self.assertSummaryConsistent()
+
+    def test_check_detects_drift_and_rebuild_fixes_it(self):
+        Inventory.objects.create(product=self.products[0], selling_unit_price=Decimal('13.00'), stock=4)
+        Inventory.objects.filter(product=self.products[0]).update(stock=9)
+        with self.assertRaises(CommandError):
+            call_command('rebuild_inventory_summary', check=True, stdout=mock.MagicMock(), stderr=mock.MagicMock())
+        call_command('rebuild_inventory_summary', stdout=mock.MagicMock())
+        self.assertEqual(self.totals(), (9, Decimal('117.00'), Decimal('90.00')))
+        self.assertSummaryConsistent()
+
+    def test_dashboard_and_summary_endpoint(self):
+        Inventory.objects.create(product=self.products[0], selling_unit_price=Decimal('13.00'), stock=4)
+        Inventory.objects.create(product=self.products[1], selling_unit_price=Decimal('12.00'), stock=1)
+        self.client.login(username='admin', password='testpassword')
+
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(response.context['inventory_summary'].total_units, 5)
+        self.assertContains(response, '64.00')
+
+        data = self.client.get(reverse('inventory_summary')).json()
+        self.assertEqual(data['total'], {'total_units': 5, 'stock_value': '64.00', 'purchase_cost': '50.00'})
+        self.assertEqual(
+            {row['supplier']: row['total_units'] for row in data['suppliers']}, {'summary0': 4, 'summary1': 1})
+
+
+class StockLedgerTest(TestCase):
+    """
+    Test cases for the append-only stock movement ledger and its snapshot compaction.
+
+    Methods:
+    - setUp: Setup method to create a test supplier with a product and a test admin user.
+    - movements: Returns the (location, quantity, reason) of the product's movements in order.
+    - test_stock_changes_are_recorded: Checks if creating, editing, purchasing and deleting stock append movements.
+    - test_import_records_opening_stock: Checks if imported products record their stock in one batched insert.
+    - test_stock_at_reads_snapshot_and_tail: Checks if point-in-time stock is the snapshot balance plus later movements.
+    - test_compaction_only_reads_new_movements: Checks if checkpoints build on the previous one and must move forward.
+    - test_reconcile_records_untracked_stock: Checks if stock missing from the ledger is recorded as an adjustment.
+    - test_stock_at_endpoint: Checks if the endpoint returns the stock at the requested time.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser(username='admin', password='testpassword', email="admin@example.com")
+        self.supplier = create_supplier('ledgersupplier', '5558888')
+        self.product = Product.objects.create(
+            supplier=self.supplier, name=PRODUCT_NAME, description=PRODUCT_DESC,
+            unit_price=UNIT_PRICE, stock=STOCK, active_status=True)
+
+    def movements(self):
+        return list(StockMovement.objects.filter(product=self.product).order_by('pk').values_list(
+            'location', 'quantity', 'reason'))
+
+    def test_stock_changes_are_recorded(self):
+        purchase_product(self.product, 5)
+        self.product.refresh_from_db()
+        self.product.stock = 40
+        self.product.save()
+        Inventory.objects.get(product=self.product).delete()
+        self.assertEqual(self.movements(), [
+            ('supplier', STOCK, 'created'),
+            ('supplier', -5, 'purchased'),
+            ('inventory', 5, 'purchased'),
+            ('supplier', -5, 'edited'),
+            ('inventory', -5, 'deleted'),
+        ])
+
+    def test_import_records_opening_stock(self):
+        lines = [b'name,description,unit_price,stock\n', b'Bolt,M6,1.00,7\n', b'Nut,M6,1.00,0\n']
+        with CaptureQueriesContext(connection) as queries:
+            import_products(self.supplier.pk, lines, 'csv')
+        inserts = [query for query in queries if query['sql'].startswith('INSERT INTO "IMS_app_stockmovement"')]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(list(StockMovement.objects.filter(reason='imported').values_list('quantity', flat=True)), [7])
+
+    def test_stock_at_reads_snapshot_and_tail(self):
+        start = timezone.now()
+        StockMovement.objects.filter(product=self.product).update(created_at=start - timedelta(days=3))
+        StockMovement.objects.bulk_create([
+            StockMovement(product=self.product, location='supplier', quantity=-10, reason='purchased',
+                          created_at=start - timedelta(days=2)),
+            StockMovement(product=self.product, location='supplier', quantity=4, reason='edited',
+                          created_at=start - timedelta(days=1)),
+        ])
+        self.assertEqual(ledger.compact(start - timedelta(days=2)), 1)
+        self.assertEqual(StockSnapshot.objects.get().balance, STOCK - 10)
+
+        self.assertEqual(ledger.stock_at(self.product.pk, start - timedelta(days=4), 'supplier'), 0)
+        self.assertEqual(ledger.stock_at(self.product.pk, start - timedelta(days=3), 'supplier'), STOCK)
+        self.assertEqual(ledger.stock_at(self.product.pk, start - timedelta(days=2), 'supplier'), STOCK - 10)
+        with self.assertNumQueries(2):
+            self.assertEqual(ledger.stock_at(self.product.pk, start, 'supplier'), STOCK - 6)
+
+        StockMovement.objects.filter(created_at__lte=start - timedelta(days=2)).update(quantity=0)
+        self.assertEqual(ledger.stock_at(self.product.pk, start, 'supplier'), STOCK - 6)
+
+    def test_compaction_only_reads_new_movements(self):
+        first = timezone.now() + timedelta(seconds=1)
+        self.assertEqual(ledger.compact(first), 1)
+        with self.assertRaises(ValueError):
+            ledger.compact(first)
+
+        StockMovement.objects.create(
+            product=self.product, location='supplier', quantity=-3, reason='edited',
+            created_at=first + timedelta(seconds=1))
+        self.assertEqual(ledger.compact(first + timedelta(seconds=2)), 1)
+        self.assertEqual(
+            list(StockSnapshot.objects.order_by('taken_at').values_list('balance', flat=True)), [STOCK, STOCK - 3])
+        self.assertEqual(ledger.compact(first + timedelta(seconds=3)), 0)
+
+    def test_reconcile_records_untracked_stock(self):
+        Product.objects.filter(pk=self.product.pk).update(stock=STOCK + 5)
+        Inventory.objects.bulk_create([Inventory(product=self.product, selling_unit_price=Decimal('20.00'), stock=3)])
+        call_command('compact_stock_ledger', reconcile=True, stdout=mock.MagicMock())
+        now = timezone.now()
+        self.assertEqual(ledger.stock_at(self.product.pk, now, 'supplier'), STOCK + 5)
+        self.assertEqual(ledger.stock_at(self.product.pk, now, 'inventory'), 3)
+        self.assertEqual(ledger.reconcile(), [])
+
+    def test_stock_at_endpoint(self):
+        before = timezone.now()
+        purchase_product(self.product, 5)
+        self.client.login(username='admin', password='testpassword')
+        url = reverse('stock_at', args=[self.product.pk])
+
+        data = self.client.get(url).json()
+        self.assertEqual((data['supplier_stock'], data['inventory_stock']), (STOCK - 5, 5))
+        data = self.client.get(url, {'at': before.isoformat()}).json()
+        self.assertEqual((data['supplier_stock'], data['inventory_stock']), (STOCK, 0))
+        self.assertEqual(self.client.get(url, {'at': 'yesterday'}).status_code, 400)
+
+
+class LowStockTest(TestCase):
+    """
+    Test cases for the database side low stock classification and the low stock feed.
+
+    Methods:
+    - setUp: Setup method to create a test admin user and inventory rows with various stock levels.
+    - test_dashboard_classifies_in_database: Checks if dashboard rows carry their stock level and can be filtered.
+    - test_feed_returns_only_low_stock_rows: Checks if the feed lists low stock rows, lowest stock first.
+    - test_per_product_threshold: Checks if a product's own threshold overrides the global one.
+    - test_thresholds_are_configurable: Checks if the global thresholds come from the settings once synced.
+    - test_feed_uses_indexes: Checks if the feed query reads the low stock partial index without sorting.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser(username='admin', password='testpassword', email="admin@example.com")
+        supplier = create_supplier('lowstocksupplier', '5557777')
+        self.inventories = {}
+        for stock in (0, 3, 5, 19, 20, 100):
+            product = Product.objects.create(
+                supplier=supplier, name="Stock %s" % stock, description=PRODUCT_DESC,
+                unit_price=UNIT_PRICE, stock=STOCK, active_status=True)
+            self.inventories[stock] = Inventory.objects.create(
+                product=product, selling_unit_price=Decimal('20.00'), stock=stock)
+        self.client.login(username='admin', password='testpassword')
+
+    def feed(self, **params):
+        return self.client.get(reverse('low_stock_feed'), params).json()
+
+    def test_dashboard_classifies_in_database(self):
+        response = self.client.get(reverse('admin_dashboard'))
+        levels = {inventory.stock: inventory.stock_level for inventory in response.context['inventory_list']}
+        self.assertEqual(levels, {0: 'very_low', 3: 'very_low', 5: 'low', 19: 'low', 20: 'ok', 100: 'ok'})
+
+        response = self.client.get(reverse('admin_dashboard'), {'low_stock': 1})
+        self.assertEqual([inventory.stock for inventory in response.context['inventory_list']], [0, 3, 5, 19])
+
+    def test_feed_returns_only_low_stock_rows(self):
+        data = self.feed()
+        self.assertEqual(data['thresholds'], {'low': 20, 'very_low': 5})
+        self.assertEqual([item['stock'] for item in data['items']], [0, 3, 5, 19])
+        self.assertEqual(data['items'][0]['stock_level'], 'very_low')
+        self.assertIsNone(data['next'])
+        self.assertEqual([item['stock'] for item in self.feed(level='very_low')['items']], [0, 3])
+
+        with mock.patch.object(views.LowStockFeedView, 'paginate_by', 3):
+            first = self.feed()
+            self.assertEqual([item['stock'] for item in first['items']], [0, 3, 5])
+            second = self.client.get(reverse('low_stock_feed') + first['next']).json()
+            self.assertEqual([item['stock'] for item in second['items']], [19])
+
+    def test_per_product_threshold(self):
+        self.inventories[100].low_stock_threshold = 150
+        self.inventories[100].save()
+        self.inventories[19].low_stock_threshold = 10
+        self.inventories[19].save()
+        self.assertEqual([item['stock'] for item in self.feed()['items']], [0, 3, 5, 100])
+        self.assertEqual(self.feed()['items'][-1]['low_stock_threshold'], 150)
+
+        self.inventories[19].low_stock_threshold = None
+        self.inventories[19].save()
+        self.assertEqual([item['stock'] for item in self.feed()['items']], [0, 3, 5, 19, 100])
+
+    @override_settings(IMS_LOW_STOCK_THRESHOLD=4, IMS_VERY_LOW_STOCK_THRESHOLD=1)
+    def test_thresholds_are_configurable(self):
+        self.inventories[100].low_stock_threshold = 150
+        self.inventories[100].save()
+        call_command('sync_low_stock_thresholds', stdout=mock.MagicMock())
+        data = self.feed()
+        self.assertEqual(data['thresholds'], {'low': 4, 'very_low': 1})
+        self.assertEqual(
+            [(item['stock'], item['stock_level']) for item in data['items']],
+            [(0, 'very_low'), (3, 'low'), (100, 'low')])
+
+    def test_feed_uses_indexes(self):
+        queryset = Inventory.objects.filter(low_stock_filter()).order_by('stock', 'pk')
+        sql, params = queryset.values('pk').query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            plan = ' '.join(row[-1] for row in cursor.fetchall())
+        # The partial index holds only low stock rows, already in feed order.
+        self.assertIn('USING INDEX inventory_low_stock_idx', plan)
+        self.assertNotIn('TEMP B-TREE', plan)
+
+
+class JsonApiTest(TestCase):
+    """
+    Test cases for the read-only JSON API and its conditional GET support.
+
+    Methods:
+    - setUp: Setup method to create a test admin user, a supplier and products with inventory rows.
+    - test_collections: Checks if every collection returns its default fields.
+    - test_sparse_fields_select_only_requested_columns: Checks if only the requested columns are selected.
+    - test_unknown_field_is_rejected: Checks if an unknown field is answered with 400.
+    - test_filters_and_cursor_pagination: Checks if the view filters apply and pages are linked by cursors.
+    - test_conditional_get: Checks if an unchanged collection is answered with 304 without reading any rows.
+    - test_writes_change_the_etag: Checks if writes, including set-based ones, change the ETag of dependent collections.
+    - test_requires_admin: Checks if the API is restricted to admin users.
+    """
+
+    def setUp(self):
+        self.client = Client()
+        User.objects.create_superuser(username='admin', password='testpassword', email="admin@example.com")
+        self.supplier = create_supplier('apisupplier', '5554444')
+        self.products = [
+            Product.objects.create(
+                supplier=self.supplier, name="Widget %s" % index, description=PRODUCT_DESC,
+                unit_price=UNIT_PRICE, stock=STOCK, active_status=True)
+            for index in range(3)
+        ]
+        for index, product in enumerate(self.products):
+            Inventory.objects.create(product=product, selling_unit_price=Decimal('20.00'), stock=index * 10)
+        self.client.login(username='admin', password='testpassword')
+
+    def test_collections(self):
+        data = self.client.get(reverse('api_inventory')).json()
+        self.assertEqual(len(data['results']), 3)
+        self.assertEqual(data['results'][0], {
+            'id': data['results'][0]['id'], 'product_id': self.products[0].pk, 'product': 'Widget 0',
+            'selling_unit_price': '20.00', 'stock': 0, 'stock_level': 'very_low'})
+        products = self.client.get(reverse('api_products')).json()['results']
+        self.assertEqual([product['name'] for product in products], ['Widget 0', 'Widget 1', 'Widget 2'])
+        suppliers = self.client.get(reverse('api_suppliers')).json()['results']
+        self.assertEqual([supplier['username'] for supplier in suppliers], ['apisupplier'])
+
+    def test_sparse_fields_select_only_requested_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            data = self.client.get(reverse('api_products'), {'fields': 'name,supplier'}).json()
+        self.assertEqual(data['results'][0], {'name': 'Widget 0', 'supplier': 'apisupplier'})
+        select = [query['sql'] for query in queries if 'FROM "IMS_app_product"' in query['sql']][-1]
+        self.assertNotIn('"description"', select)
+        self.assertNotIn('"unit_price"', select)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get(reverse('api_products'), {'fields': 'name,password'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_filters_and_cursor_pagination(self):
+        data = self.client.get(reverse('api_inventory'), {'low_stock': 1, 'fields': 'stock'}).json()
+        self.assertEqual(data['results'], [{'stock': 0}, {'stock': 10}])
+        data = self.client.get(reverse('api_products'), {'search': 'Widget 2', 'fields': 'name'}).json()
+        self.assertEqual(data['results'], [{'name': 'Widget 2'}])
+
+        with mock.patch.object(api.ProductApiView, 'paginate_by', 2):
+            first = self.client.get(reverse('api_products'), {'fields': 'name'}).json()
+            second = self.client.get(reverse('api_products') + first['next']).json()
+        self.assertEqual([row['name'] for row in first['results'] + second['results']],
+                         ['Widget 0', 'Widget 1', 'Widget 2'])
+        self.assertIsNone(second['next'])
+
+    def test_conditional_get(self):
+        response = self.client.get(reverse('api_inventory'))
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('api_inventory'), HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        self.assertFalse(any('"IMS_app_inventory"' in query['sql'] for query in queries))
+
+        response = self.client.get(
+            reverse('api_inventory'), HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(response.status_code, 304)
+        response = self.client.get(reverse('api_inventory'), {'fields': 'stock'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_writes_change_the_etag(self):
+        def etags():
+            return [self.client.get(reverse(name))['ETag'] for name in ('api_inventory', 'api_products', 'api_suppliers')]
+
+        before = etags()
+        purchase_product(self.products[0], 1)
+        after = etags()
+        self.assertNotEqual(before[0], after[0])
+        self.assertNotEqual(before[1], after[1])
+        self.assertEqual(before[2], after[2])
+
+        before = after
+        self.supplier.user.first_name = 'Renamed'
+        self.supplier.user.save()
+        after = etags()
+        self.assertTrue(all(old != new for old, new in zip(before, after)))
+
+        before = after
+        import_products(self.supplier.pk, [b'name,description,unit_price,stock\n', b'Bolt,M6,1.00,7\n'], 'csv')
+        after = etags()
+        self.assertNotEqual(before[0], after[0])
+        self.assertNotEqual(before[1], after[1])
+        self.assertEqual(before[2], after[2])
+
+    def test_requires_admin(self):
+        self.client.logout()
+        self.client.login(username='apisupplier', password='supplierpass')
+        self.assertEqual(self.client.get(reverse('api_inventory')).status_code, 403)
+
+
+class FragmentCacheTest(TestCase):
+    """
+    Test cases for the cached page fragments and their signal driven invalidation.
+
+    Methods:
+    - setUp: Setup method to clear the cache and statistics and create a test admin user, a supplier and inventory rows.
+    - counters: Returns the (hits, misses) counters of a fragment and resets them.
+    - test_cards_are_served_from_cache: Checks if a repeated page view renders no card again.
+    - test_save_invalidates_only_changed_cards: Checks if saving an object re-renders only the cards showing it.
+    - test_purchase_invalidates_cards: Checks if set-based stock updates invalidate the affected cards.
+    - test_user_change_invalidates_supplier_cards: Checks if renaming a supplier's user refreshes every card showing it.
+    - test_invalidation_from_another_process: Checks if an invalidation through another cache instance is seen.
+    - test_deploy_check_requires_shared_cache: Checks if `check --deploy` fails unless the cache is Redis or memcached.
+    - test_stats_endpoint: Checks if the counters are exposed to admins and can be reset.
+    - test_stats_are_counted_per_process: Checks if renders count their hits and misses without a cache write.
+    """
+
+    def setUp(self):
+        cache.clear()
+        fragments.reset_stats()
+        self.client = Client()
+        User.objects.create_superuser(username='admin', password='testpassword', email="admin@example.com")
+        self.supplier = create_supplier('fragmentsupplier', '5551212')
+        self.products = [
+            Product.objects.create(
+                supplier=self.supplier, name="Gadget %s" % index, description=PRODUCT_DESC,
+                unit_price=UNIT_PRICE, stock=STOCK, active_status=True)
+            for index in range(3)
+        ]
+        for product in self.products:
+            Inventory.objects.create(product=product, selling_unit_price=Decimal('20.00'), stock=30)
+        self.client.login(username='admin', password='testpassword')
+
+    def counters(self, name):
+        data = self.client.get(reverse('fragment_cache_stats')).json()['fragments'][name]
+        self.client.post(reverse('fragment_cache_stats'))
+        return data['hits'], data['misses']
+
+    def test_cards_are_served_from_cache(self):
+        first = self.client.get(reverse('admin_dashboard'))
+        self.assertEqual(self.counters('inventory_card'), (0, 3))
+        with mock.patch('IMS_app.fragments.render_to_string') as render:
+            second = self.client.get(reverse('admin_dashboard'))
+        render.assert_not_called()
+        self.assertEqual(self.counters('inventory_card'), (3, 0))
+        self.assertEqual(first.content, second.content)
+
+    def test_save_invalidates_only_changed_cards(self):
+        self.client.get(reverse('admin_dashboard_products'))
+        self.counters('product_card')
+        self.products[1].name = 'Renamed gadget'
+        self.products[1].save()
+        response = self.client.get(reverse('admin_dashboard_products'))
+        self.assertContains(response, 'Renamed gadget')
+        self.assertEqual(self.counters('product_card'), (2, 1))
+
+        self.client.get(reverse('admin_dashboard'))
+        self.counters('inventory_card')
+        inventory = Inventory.objects.get(product=self.products[0])
+        inventory.stock = 3
+        inventory.save()
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertContains(response, 'very-low-stock')
+        self.assertEqual(self.counters('inventory_card'), (2, 1))
+
+    def test_purchase_invalidates_cards(self):
+        self.client.get(reverse('admin_dashboard'))
+        self.client.get(reverse('admin_dashboard_products'))
+        purchase_product(self.products[2], 7)
+        response = self.client.get(reverse('admin_dashboard'))
+        self.assertContains(response, '<span class="bold">Stock:</span>37', html=False)
+        response = self.client.get(reverse('admin_dashboard_products'))
+        self.assertContains(response, str(STOCK - 7))
+
+    def test_user_change_invalidates_supplier_cards(self):
+        for url in (reverse('admin_dashboard_products'), reverse('admin_dashboard_suppliers'),
+                    reverse('admin_supplier_detail', args=[self.supplier.pk])):
+            self.client.get(url)
+        user = self.supplier.user
+        user.username = 'renamedsupplier'
+        user.save()
+        self.assertContains(self.client.get(reverse('admin_dashboard_products')), 'renamedsupplier', count=3)
+        self.assertContains(self.client.get(reverse('admin_dashboard_suppliers')), 'renamedsupplier')
+        response = self.client.get(reverse('admin_supplier_detail', args=[self.supplier.pk]))
+        self.assertNotContains(response, 'fragmentsupplier')
+
+    def test_invalidation_from_another_process(self):
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location}}):
+            self.client.get(reverse('admin_dashboard'))
+            self.counters('inventory_card')
+            # The row and its version change in another process, whose cache is a separate instance.
+            Inventory.objects.filter(product=self.products[0]).update(stock=3)
+            with mock.patch('IMS_app.fragments.cache', caches.create_connection('default')):
+                fragments.invalidate(fragments.INVENTORY, [self.products[0].pk])
+            response = self.client.get(reverse('admin_dashboard'))
+            self.assertContains(response, 'very-low-stock')
+            self.assertEqual(self.counters('inventory_card'), (2, 1))
+
+    def test_deploy_check_requires_shared_cache(self):
+        self.assertEqual([error.id for error in checks.check_shared_cache(None)], ['IMS_app.E001'])
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.redis.RedisCache', 'LOCATION': 'redis://127.0.0.1:6379'}}):
+            self.assertEqual(checks.check_shared_cache(None), [])
+
+    def test_stats_endpoint(self):
+        self.client.get(reverse('admin_dashboard'))
+        self.client.get(reverse('admin_dashboard'))
+        data = self.client.get(reverse('fragment_cache_stats')).json()['fragments']
+        self.assertEqual(data['inventory_card'], {'hits': 3, 'misses': 3, 'hit_rate': 0.5})
+        self.client.post(reverse('fragment_cache_stats'))
+        data = self.client.get(reverse('fragment_cache_stats')).json()['fragments']
+        self.assertEqual(data['inventory_card']['hits'], 0)
+
+        self.client.logout()
+        self.assertEqual(self.client.get(reverse('fragment_cache_stats')).status_code, 403)
+
+    def test_stats_are_counted_per_process(self):
+        key = fragments.STATS_KEY % ('inventory_card', 'misses')
+        with override_settings(IMS_FRAGMENT_STATS_INTERVAL=3600):
+            self.client.get(reverse('admin_dashboard'))
+            self.assertIsNone(cache.get(key))
+            self.assertEqual(self.counters('inventory_card'), (0, 3))
+        with override_settings(IMS_FRAGMENT_STATS_INTERVAL=0):
+            self.client.get(reverse('admin_dashboard'))
+            self.assertEqual(cache.get(fragments.STATS_KEY % ('inventory_card', 'hits')), 3)
+
+
+class SyntheticDataBenchmarkTest(TestCase):
+    """
+    Test cases for the generate_synthetic_data and benchmark_endpoints management commands.
+
+    Methods:
+    - generate: Runs generate_synthetic_data with a small dataset.
+    - test_generates_requested_rows: Checks if the requested numbers of rows are created.
+    - test_derived_data_is_consistent: Checks if the summary, ledger and search index cover the generated rows.
+    - test_benchmark_reports_every_endpoint: Checks if every GET endpoint is reported with latency percentiles.
+    - test_benchmark_compare: Checks if a previous report is compared per endpoint.
+    """
+
+    def generate(self, **options):
+        options = dict({'suppliers': 3, 'products': 40, 'inventory': 25, 'seed': 1, 'batch_size': 7}, **options)
+        call_command('generate_synthetic_data', stdout=StringIO(), **options)
+
+    def test_generates_requested_rows(self):
+        self.generate()
+        self.assertEqual(Supplier.objects.count(), 3)
+        self.assertEqual(Product.objects.count(), 40)
+        self.assertEqual(Inventory.objects.count(), 25)
+        self.generate()
+        self.assertEqual(Product.objects.count(), 80)
+        with self.assertRaises(CommandError):
+            self.generate(inventory=50)
+
+    def test_derived_data_is_consistent(self):
+        self.generate()
+        call_command('rebuild_inventory_summary', check=True, stdout=StringIO())
+        self.assertEqual(ledger.reconcile(), [])
+        product = Product.objects.first()
+        word = product.name.split()[-1]
+        matches = search_queryset(Product.objects.all(), word, PRODUCT_INDEX, ['name'], Q(name__icontains=word))
+        self.assertEqual(matches.count(), Product.objects.filter(name__icontains=word).count())
+
+    def run_benchmark(self, *args):
+        User.objects.create_superuser(username='admin', password='testpassword', email="admin@example.com")
+        self.generate()
+        stdout = StringIO()
+        call_command('benchmark_endpoints', '--requests', '2', '--warmup', '0', *args,
+                     stdout=stdout, stderr=StringIO())
+        return json.loads(stdout.getvalue())
+
+    def test_benchmark_reports_every_endpoint(self):
+        report = self.run_benchmark()
+        names = {entry['name'] for entry in report['endpoints']}
+        self.assertTrue({'admin_dashboard', 'inventory_report', 'api_inventory', 'supplier_dashboard'} <= names)
+        self.assertNotIn('logout', names)
+        self.assertNotIn('purchase_order', names)
+        for entry in report['endpoints']:
+            self.assertEqual(entry['status'], 200, entry['url'])
+            self.assertLessEqual(entry['p50_ms'], entry['p95_ms'])
+            self.assertLessEqual(entry['p95_ms'], entry['p99_ms'])
+            self.assertGreater(entry['peak_memory_kb'], 0)
+        dashboard = next(entry for entry in report['endpoints'] if entry['url'] == reverse('admin_dashboard'))
+        self.assertGreater(dashboard['queries'], 0)
+
+    def test_benchmark_compare(self):
+        import os
+        import tempfile
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'baseline.json')
+            with open(path, 'w') as file:
+                json.dump({'endpoints': [{'url': '/', 'p50_ms': 1.0, 'p95_ms': 2.0, 'queries': 0}]}, file)
+            report = self.run_benchmark('--only', 'landing_page', '--compare', path)
+        self.assertEqual(len(report['endpoints']), 1)
+        self.assertIn('p50_ratio', report['endpoints'][0])
+        self.assertEqual(report['endpoints'][0]['queries_delta'], 0)
+
+
+@override_settings(IMS_INSTRUMENTATION=True)
+class InstrumentationMiddlewareTest(TestCase):
+    """
+    Test cases for the request instrumentation middleware and the request statistics endpoint.
+
+    Methods:
+    - setUp: Setup method to reset the statistics and create a test admin user and an inventory row.
+    - test_server_timing_header: Checks if responses carry the db, template and total durations.
+    - test_structured_log_line: Checks if every request is logged with its metrics as JSON.
+    - test_duplicate_fingerprints: Checks if queries differing only in their literals or IN lists are grouped.
+    - test_request_stats: Checks if admins can read and reset the rolling statistics per URL name.
+    - test_disabled_by_default: Checks if the middleware is left out of the chain when disabled.
+    """
+
+    def setUp(self):
+        instrumentation.reset_request_stats()
+        self.client = Client()
+        User.objects.create_superuser(username='admin', password='testpassword', email="admin@example.com")
+        supplier = create_supplier('instrumentedsupplier', '5551313')
+        product = Product.objects.create(
+            supplier=supplier, name="Widget", description=PRODUCT_DESC, unit_price=UNIT_PRICE, stock=STOCK,
+            active_status=True)
+        Inventory.objects.create(product=product, selling_unit_price=Decimal('20.00'), stock=30)
+        self.client.login(username='admin', password='testpassword')
+
+    def test_server_timing_header(self):
+        response = self.client.get(reverse('admin_dashboard'))
+        timing = response['Server-Timing']
+        self.assertRegex(timing, r'db;dur=[\d.]+;desc="\d+ queries"')
+        self.assertRegex(timing, r'tpl;dur=[\d.]+')
+        self.assertRegex(timing, r'total;dur=[\d.]+')
+
+    def test_structured_log_line(self):
+        with self.assertLogs('IMS_app.instrumentation', 'INFO') as logs:
+            self.client.get(reverse('admin_dashboard'))
+        fields = json.loads(logs.records[-1].getMessage())
+        self.assertEqual(fields['url_name'], 'admin_dashboard')
+        self.assertEqual(fields['status'], 200)
+        self.assertGreater(fields['queries'], 0)
+        self.assertGreater(fields['template_ms'], 0)
+        self.assertLessEqual(len(fields['slow_queries']), 5)
+        self.assertEqual(logs.records[-1].request_metrics, fields)
+
+    def test_duplicate_fingerprints(self):
+        metrics = instrumentation.RequestMetrics()
+        metrics.queries = [
+            ('SELECT * FROM product WHERE id = 1', 0.001),
+            ('SELECT * FROM product WHERE id = 2', 0.003),
+            ('SELECT * FROM supplier WHERE id IN (%s, %s)', 0.002),
+            ('SELECT * FROM supplier WHERE id IN (%s, %s, %s)', 0.001),
+            ("SELECT * FROM user WHERE name = 'x'", 0.001),
+        ]
+        duplicates = metrics.duplicates()
+        self.assertEqual([duplicate['count'] for duplicate in duplicates], [2, 2])
+        self.assertEqual(metrics.slowest(1), [('SELECT * FROM product WHERE id = 2', 0.003)])
+
+    def test_request_stats(self):
+        for _ in range(3):
+            self.client.get(reverse('admin_dashboard'))
+        stats = self.client.get(reverse('request_stats')).json()
+        self.assertTrue(stats['enabled'])
+        dashboard = stats['urls']['admin_dashboard']
+        self.assertEqual(dashboard['requests'], 3)
+        self.assertEqual(sum(dashboard['histogram'].values()), 3)
+        self.assertLessEqual(dashboard['p50_ms'], dashboard['p99_ms'])
+        self.client.post(reverse('request_stats'))
+        self.assertNotIn('admin_dashboard', self.client.get(reverse('request_stats')).json()['urls'])
+
+    def test_disabled_by_default(self):
+        with override_settings(IMS_INSTRUMENTATION=False):
+            client = Client()
+            client.login(username='admin', password='testpassword')
+            response = client.get(reverse('admin_dashboard'))
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(instrumentation.request_stats(), {})
+
+
+class SqliteProfileTest(TestCase):
+    """
+    Test cases for the production SQLite backend and the database load test command.
+
+    Methods:
+    - test_load_test_compares_profiles: Checks if the production profile runs in WAL mode without lock errors and reuses connections.
+    - test_invalid_transaction_mode: Checks if an unknown transaction mode is rejected.
+    """
+
+    def test_load_test_compares_profiles(self):
+        stdout = StringIO()
+        call_command('load_test_database', threads=4, seconds=0.5, products=20, stdout=stdout)
+        development, production = json.loads(stdout.getvalue())['profiles']
+        self.assertEqual(development['journal_mode'], 'delete')
+        self.assertEqual(production['journal_mode'], 'wal')
+        self.assertEqual(production['lock_errors'], 0)
+        self.assertGreater(production['writes'], 0)
+        self.assertLessEqual(production['connections_opened'], 5)
+        self.assertGreater(development['connections_opened'], 5)
+        self.assertNotIn('load_test_production', connections)
+
+    def test_invalid_transaction_mode(self):
+        wrapper = SqliteWrapper(connections.configure_settings({
+            'default': {'NAME': ':memory:', 'OPTIONS': {'transaction_mode': 'eventually'}}})['default'])
+        with self.assertRaises(ImproperlyConfigured):
+            wrapper.transaction_mode
+
+
+class AsyncViewsTest(TestCase):
+    """
+    Test cases for the async versions of the dashboard, list and report views.
+
+    Methods:
+    - setUp: Setup method to create a test admin user, a supplier with products and inventory rows.
+    - aget: Requests a URL with the async test client.
+    - page_pks: Returns the primary keys on the page of a response.
+    - test_pages_match_sync_views: Checks if every async view lists the same rows as its sync view.
+    - test_permissions: Checks if the async auth mixins reject anonymous users and users of the other role.
+    - test_supplier_dashboard: Checks if the async supplier dashboard lists the supplier's products.
+    - test_csv_export_streams_asynchronously: Checks if the async report streams the same CSV as the sync report.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='testpassword', email="admin@example.com")
+        self.supplier = create_supplier('asyncsupplier', '5551414')
+        for index in range(5):
+            product = Product.objects.create(
+                supplier=self.supplier, name="Async Widget %s" % index, description=PRODUCT_DESC,
+                unit_price=UNIT_PRICE, stock=STOCK, active_status=True)
+            Inventory.objects.create(product=product, selling_unit_price=Decimal('20.00'), stock=10 * index)
+        self.client.force_login(self.admin)
+        self.async_client.force_login(self.admin)
+
+    def aget(self, url, client=None):
+        async def get():
+            return await (client or self.async_client).get(url)
+        return async_to_sync(get)()
+
+    @staticmethod
+    def page_pks(response):
+        return [row.pk for row in response.context['page_obj']]
+
+    def test_pages_match_sync_views(self):
+        for name, query in [
+                ('admin_dashboard', ''), ('admin_dashboard', '?low_stock=1'), ('admin_dashboard', '?search=widget'),
+                ('admin_dashboard_products', '?search=widget'), ('admin_dashboard_suppliers', ''),
+                ('inventory_report', '?sort_by=-stock')]:
+            expected = self.client.get(reverse(name) + query)
+            response = self.aget(reverse('async_' + name) + query)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(response.context['view'].template_name, expected.context['view'].template_name)
+            self.assertEqual(self.page_pks(response), self.page_pks(expected), name + query)
+        response = self.aget(reverse('async_admin_dashboard'))
+        self.assertEqual(response.context['inventory_summary'], InventorySummary.objects.get(supplier__isnull=True))
+
+    def test_permissions(self):
+        anonymous = self.aget(reverse('async_admin_dashboard'), client=self.async_client_class())
+        self.assertEqual(anonymous.status_code, 403)
+        self.assertEqual(self.aget(reverse('async_supplier_dashboard')).status_code, 403)
+        supplier_client = self.async_client_class()
+        supplier_client.force_login(self.supplier.user)
+        self.assertEqual(self.aget(reverse('async_inventory_report'), client=supplier_client).status_code, 403)
+
+    def test_supplier_dashboard(self):
+        supplier_client = self.async_client_class()
+        supplier_client.force_login(self.supplier.user)
+        response = self.aget(reverse('async_supplier_dashboard') + '?search=widget', client=supplier_client)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['products_list']), 5)
+
+    def test_csv_export_streams_asynchronously(self):
+        async def export():
+            response = await self.async_client.get(reverse('async_inventory_report') + '?export=csv')
+            return response, b''.join([chunk async for chunk in response.streaming_content])
+
+        response, content = async_to_sync(export)()
+        self.assertTrue(response.is_async)
+        expected = self.client.get(reverse('inventory_report') + '?export=csv')
+        self.assertEqual(content, b''.join(expected.streaming_content))
+
+
+class AsyncBenchmarkTest(TransactionTestCase):
+    """
+    Test cases for the benchmark_async_views management command.
+
+    Methods:
+    - test_compares_wsgi_and_asgi: Checks if every view pair is benchmarked on both paths without failures.
+    """
+
+    def test_compares_wsgi_and_asgi(self):
+        User.objects.create_superuser(username='admin', password='testpassword', email="admin@example.com")
+        create_supplier('benchsupplier', '5551515')
+        stdout = StringIO()
+        call_command('benchmark_async_views', concurrency=2, requests=4, stdout=stdout)
+        report = json.loads(stdout.getvalue())
+        self.assertEqual(len(report['views']), 5)
+        for view in report['views']:
+            self.assertEqual(view['wsgi']['failures'], 0, view['view'])
+            self.assertEqual(view['asgi']['failures'], 0, view['view'])
+            self.assertGreater(view['asgi_speedup'], 0)
+
+
+class QueryPlanTest(TestCase):
+    """
+    Test cases for the index coverage of the main queries of the views, checked with EXPLAIN QUERY PLAN.
+
+    Methods:
+    - setUp: Setup method to create a supplier with products and inventory rows.
+    - view_queryset: Returns the (queryset, ordering) a list view pages through for a query string.
+    - report_queryset: Returns the (queryset, ordering) of the inventory report for a query string.
+    - full_scans: Returns the tables a query reads in full, with a table scan or an index scan followed by a sort.
+    - assertPagesUseIndexes: Checks the first page (optionally) and a following page of a paginated queryset.
+    - test_list_views: Checks if the dashboard, product, supplier and supplier dashboard pages avoid full scans.
+    - test_report_sorts_and_filters: Checks if every report sort and filter avoids full scans.
+    - test_every_sort_key_reads_its_index_in_order: Checks if a page sorted by any sort key needs no sort step.
+    - test_supplier_detail: Checks if the supplier detail products are looked up by supplier.
+    - test_seek_condition_matches_row_order: Checks if a cursor page starts right after the cursor row.
+    """
+
+    def setUp(self):
+        self.supplier = create_supplier('plansupplier', '5551616')
+        for index in range(6):
+            product = Product.objects.create(
+                supplier=self.supplier, name="Plan Widget %s" % (index % 3), description=PRODUCT_DESC,
+                unit_price=Decimal('10.00') + index % 2, stock=STOCK, active_status=True)
+            Inventory.objects.create(product=product, selling_unit_price=Decimal('20.00'), stock=index % 2)
+        self.factory = RequestFactory()
+
+    def view_queryset(self, view_class, query=''):
+        view = view_class()
+        view.request = self.factory.get('/', QueryDict(query))
+        view.request.supplier_id = self.supplier.pk
+        view.kwargs = {}
+        return view.get_queryset()
+
+    def report_queryset(self, query=''):
+        view = InventoryReportView()
+        view.request = self.factory.get('/', QueryDict(query))
+        view.kwargs = {}
+        form = InventorySearchForm(view.request.GET)
+        self.assertTrue(form.is_valid())
+        return view.get_queryset(form), view.get_ordering(form)
+
+    @staticmethod
+    def full_scans(queryset):
+        sql, params = queryset.query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            details = [row[-1] for row in cursor.fetchall()]
+        # A scan is full when it is bare, or when the index it walks does not give the order either, so
+        # every row is read and sorted before the first one is returned. FTS tables show as "VIRTUAL TABLE".
+        sorted_afterwards = 'USE TEMP B-TREE FOR ORDER BY' in details
+        return [
+            detail.split()[1] for detail in details
+            if detail.startswith('SCAN ') and 'VIRTUAL TABLE' not in detail
+            and (sorted_afterwards or re.fullmatch(r'SCAN \S+', detail))]
+
+    def assertPagesUseIndexes(self, queryset, ordering, label, first_page=True):
+        paginator = KeysetPaginator(queryset, ordering, per_page=2)
+        rows = list(paginator.get_queryset())
+        self.assertTrue(rows, label)
+        if first_page:
+            self.assertEqual(self.full_scans(paginator.get_queryset()), [], label)
+        cursor = paginator.encode_cursor(rows[0])
+        self.assertEqual(self.full_scans(paginator.get_queryset(after=cursor)), [], label + ' (next page)')
+        self.assertEqual(self.full_scans(paginator.get_queryset(before=cursor)), [], label + ' (previous page)')
+
+    def test_list_views(self):
+        for view_class, query in [
+                (views.AdminDashboardView, ''), (views.AdminDashboardView, 'low_stock=1'),
+                (views.AdminDashboardView, 'search=widget'), (views.AdminDashboardProductsView, ''),
+                (views.AdminDashboardProductsView, 'search=widget'), (views.AdminDashboardSuppliersView, ''),
+                (views.AdminDashboardSuppliersView, 'search=plansupplier'), (views.SupplierDashboardView, ''),
+                (views.SupplierDashboardView, 'search=widget')]:
+            queryset, ordering = self.view_queryset(view_class, query)
+            # An unfiltered first page in primary key order reads the table in rowid order and stops at the limit.
+            self.assertPagesUseIndexes(
+                queryset, ordering, '%s?%s' % (view_class.__name__, query), first_page=bool(query))
+
+    def test_report_sorts_and_filters(self):
+        sorts = ['sort_by=%s%s' % (direction, key) for key in InventorySearchForm.sort_keys for direction in ('', '-')]
+        for query in [''] + sorts + [
+                'sort_by=supplier,-stock', 'sort_by=-unit_price,product', 'product_name=widget',
+                'supplier_name=plansupp', 'quantity_min=1&sort_by=stock', 'search=widget']:
+            queryset, ordering = self.report_queryset(query)
+            self.assertPagesUseIndexes(queryset, ordering, 'report?' + query, first_page=bool(query))
+
+    def test_every_sort_key_reads_its_index_in_order(self):
+        for key in InventorySearchForm.sort_keys:
+            for direction in ('', '-'):
+                queryset, ordering = self.report_queryset('sort_by=%s%s' % (direction, key))
+                sql, params = queryset.query.sql_with_params()
+                with connection.cursor() as cursor:
+                    cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+                    plan = ' '.join(row[-1] for row in cursor.fetchall())
+                self.assertIn('USING INDEX', plan, direction + key)
+                self.assertNotIn('TEMP B-TREE', plan, direction + key)
+
+    def test_supplier_detail(self):
+        self.assertEqual(self.full_scans(Product.objects.filter(supplier=self.supplier)), [])
+
+    def test_seek_condition_matches_row_order(self):
+        queryset, ordering = self.report_queryset('sort_by=-unit_price')
+        expected = list(queryset.order_by(*ordering))
+        paginator = KeysetPaginator(queryset, ordering, per_page=10)
+        for index, row in enumerate(expected):
+            after = list(paginator.get_queryset(after=paginator.encode_cursor(row)))
+            self.assertEqual(after, expected[index + 1:])
+
+
+class SupplierNameTest(TestCase):
+    """
+    Test cases for the supplier name denormalized onto products and inventory rows.
+
+    Methods:
+    - setUp: Setup method to create two suppliers, products and an admin user.
+    - names: Returns the stored supplier names of a product and of its inventory row.
+    - test_names_follow_saves: Checks if created rows get their name and follow a renamed user or a moved product.
+    - test_set_based_writes: Checks if purchases and imports fill in the name of the rows they bulk insert.
+    - test_backfill_command: Checks if the backfill command restores missing names and is idempotent.
+    - test_report_sorts_and_filters_by_supplier: Checks if the report sorts and filters on the denormalized name.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username='admin', password='testpassword', email="admin@example.com")
+        self.alpha = create_supplier('alpha', '5551717')
+        self.beta = create_supplier('beta', '5551818')
+        self.products = []
+        for index, supplier in enumerate([self.alpha, self.beta, self.alpha]):
+            self.products.append(Product.objects.create(
+                supplier=supplier, name="Named Widget %s" % index, description=PRODUCT_DESC,
+                unit_price=UNIT_PRICE, stock=STOCK, active_status=True))
+
+    def names(self, product):
+        return (Product.objects.get(pk=product.pk).supplier_name,
+                Inventory.objects.filter(product=product).values_list('supplier_name', flat=True).first())
+
+    def test_names_follow_saves(self):
+        product = self.products[0]
+        Inventory.objects.create(
+            product=Product.objects.get(pk=product.pk), selling_unit_price=Decimal('20.00'), stock=1)
+        self.assertEqual(self.names(product), ('alpha', 'alpha'))
+
+        self.alpha.user.username = 'alpha-renamed'
+        self.alpha.user.save()
+        self.assertEqual(self.names(product), ('alpha-renamed', 'alpha-renamed'))
+        self.assertEqual(Product.objects.get(pk=self.products[2].pk).supplier_name, 'alpha-renamed')
+
+        moved = Product.objects.get(pk=product.pk)
+        moved.supplier_id = self.beta.pk
+        moved.save()
+        self.assertEqual(self.names(product), ('beta', 'beta'))
+
+    def test_set_based_writes(self):
+        purchase_product(Product.objects.get(pk=self.products[0].pk), 2)
+        purchase_products([{'product_id': product.pk, 'quantity': 1} for product in self.products[1:]])
+        self.assertEqual(
+            dict(Inventory.objects.values_list('product_id', 'supplier_name')),
+            {self.products[0].pk: 'alpha', self.products[1].pk: 'beta', self.products[2].pk: 'alpha'})
+
+        lines = [b'name,description,unit_price,stock,active_status\n', b'Imported,Imported product,5.00,3,true\n']
+        import_products(self.beta.pk, lines, 'csv')
+        self.assertEqual(Product.objects.get(name='Imported').supplier_name, 'beta')
+
+    def test_backfill_command(self):
+        purchase_products([{'product_id': product.pk, 'quantity': 1} for product in self.products])
+        Product.objects.update(supplier_name='')
+        Inventory.objects.update(supplier_name='')
+        stdout = StringIO()
+        call_command('backfill_supplier_names', batch_size=1, stdout=stdout)
+        self.assertIn('3 products and 3 inventory rows', stdout.getvalue())
+        self.assertEqual(self.names(self.products[1]), ('beta', 'beta'))
+
+        stdout = StringIO()
+        call_command('backfill_supplier_names', stdout=stdout)
+        self.assertIn('0 products and 0 inventory rows', stdout.getvalue())
+
+    def test_report_sorts_and_filters_by_supplier(self):
+        purchase_products([{'product_id': product.pk, 'quantity': 1} for product in self.products])
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('inventory_report') + '?sort_by=-supplier')
+        self.assertEqual([item.supplier_name for item in response.context['inventory']], ['beta', 'alpha', 'alpha'])
+        for query in ['supplier_name=bet', 'supplier_name=be']:
+            response = self.client.get(reverse('inventory_report') + '?' + query)
+            self.assertEqual([item.product_id for item in response.context['inventory']], [self.products[1].pk], query)
+        response = self.client.get(reverse('inventory_report') + '?search=beta')
+        self.assertEqual([item.product_id for item in response.context['inventory']], [self.products[1].pk])
+
+
+class InventoryReportSortTest(TestCase):
+    """
+    Test cases for the sort keys and stock range filters of the inventory report.
+
+    Methods:
+    - setUp: Setup method to create a test admin user, two suppliers and products with inventory.
+    - rows: Returns the (supplier, product name, stock) rows of a report page.
+    - test_multi_key_sort: Checks if several sort keys and directions combine in order.
+    - test_sorted_pages_cover_all_rows: Checks if walking the pages of a multi-key sort returns every row once.
+    - test_stock_range_filters: Checks if the quantity filters keep the rows in the stock range.
+    - test_invalid_parameters: Checks if unknown or repeated sort keys and an inverted range are rejected.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='admin', password='testpassword', email="admin@example.com")
+        suppliers = [create_supplier('sortalpha', '5551919'), create_supplier('sortbeta', '5552020')]
+        for index, stock in enumerate([5, 0, 12, 5, 30, 7]):
+            product = Product.objects.create(
+                supplier=suppliers[index % 2], name="Sorted %s" % 'cab'[index % 3], description=PRODUCT_DESC,
+                unit_price=Decimal('10.00') + index, stock=STOCK, active_status=True)
+            Inventory.objects.create(product=product, selling_unit_price=Decimal('20.00'), stock=stock)
+        self.client.force_login(self.admin)
+
+    def rows(self, query, status=200):
+        response = self.client.get(reverse('inventory_report') + '?' + query)
+        self.assertEqual(response.status_code, status)
+        return [(item.supplier_name, item.product.name, item.stock) for item in response.context.get('inventory', [])]
+
+    def test_multi_key_sort(self):
+        rows = self.rows('sort_by=supplier,-stock')
+        self.assertEqual(rows, sorted(rows, key=lambda row: (row[0], -row[2])))
+        self.assertEqual([row[2] for row in rows], [30, 12, 5, 7, 5, 0])
+
+        rows = self.rows('sort_by=-product,stock')
+        self.assertEqual(rows, sorted(sorted(rows, key=lambda row: row[2]), key=lambda row: row[1], reverse=True))
+
+    @mock.patch('IMS_app.views.InventoryReportView.paginate_by', 2)
+    def test_sorted_pages_cover_all_rows(self):
+        for sort in ['supplier,-stock', '-unit_price', 'product,supplier', '-selling_price,stock']:
+            query, seen = '?sort_by=' + sort, []
+            while query:
+                response = self.client.get(reverse('inventory_report') + query)
+                seen.extend(item.pk for item in response.context['inventory'])
+                query = response.context['page_obj'].next_url
+            self.assertEqual(sorted(seen), sorted(Inventory.objects.values_list('pk', flat=True)), sort)
+
+    def test_stock_range_filters(self):
+        self.assertEqual(sorted(row[2] for row in self.rows('quantity_min=5&quantity_max=12')), [5, 5, 7, 12])
+        self.assertEqual([row[2] for row in self.rows('quantity_max=0')], [0])
+        self.assertEqual(len(self.rows('quantity_min=0')), 6)
+
+    def test_invalid_parameters(self):
+        for query in ['sort_by=product__supplier__user__username', 'sort_by=stock,-stock',
+                      'sort_by=stock,supplier,product,unit_price', 'quantity_min=9&quantity_max=3',
+                      'quantity_min=-1']:
+            response = self.client.get(reverse('inventory_report') + '?' + query)
+            self.assertNotIn('inventory', response.context, query)
+            self.assertTrue(response.context['form'].errors, query)
+            export = self.client.get(reverse('inventory_report') + '?export=csv&' + query)
+            self.assertEqual(export.status_code, 400, query)
+
+
+class JobQueueTest(TestCase):
+    """
+    Test cases for the background job queue, its worker command and job views. The worker runs with
+    --concurrency 0 (in the test process), since worker processes cannot see the in-memory test database.
+
+    Methods:
+    - setUp: Setup method to create a test admin user, a supplier with inventory and a scratch IMS_JOB_DIR.
+    - run_jobs: Runs the due jobs with the run_jobs command.
+    - test_report_export_job: Checks if a queued export writes the same CSV as the streamed export.
+    - test_claim_is_exclusive: Checks if every due job is claimed by exactly one worker, oldest first.
+    - test_failed_job_is_retried: Checks if a failing job is requeued with backoff until its attempts run out.
+    - test_stale_jobs_are_requeued: Checks if running jobs without heartbeat are requeued or failed.
+    - test_background_import: Checks if a queued catalog import creates the products and removes the upload.
+    - test_job_access: Checks if only the user who queued a job and admins can see it and download its result.
+    """
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        job_settings = override_settings(IMS_JOB_DIR=directory.name)
+        job_settings.enable()
+        self.addCleanup(job_settings.disable)
+
+        self.admin = User.objects.create_superuser(
+            username='admin', password='testpassword', email="admin@example.com")
+        self.supplier = create_supplier('jobsupplier', '5553131')
+        for index, stock in enumerate([4, 9, 1, 6, 3]):
+            product = Product.objects.create(
+                supplier=self.supplier, name="Job product %s" % index, description=PRODUCT_DESC,
+                unit_price=UNIT_PRICE, stock=STOCK, active_status=True)
+            Inventory.objects.create(product=product, selling_unit_price=Decimal('20.00'), stock=stock)
+        self.client.force_login(self.admin)
+
+    def run_jobs(self):
+        output = StringIO()
+        call_command('run_jobs', concurrency=0, burst=True, stdout=output)
+        return output.getvalue()
+
+    @mock.patch('IMS_app.views.InventoryReportMixin.export_chunk_size', 2)
+    def test_report_export_job(self):
+        response = self.client.post(reverse('inventory_report_export_job'), {'sort_by': '-stock', 'quantity_min': 2})
+        self.assertEqual(response.status_code, 202)
+        job = response.json()
+        self.assertEqual((job['kind'], job['status'], job['result_url']), ('inventory_report_csv', 'queued', None))
+
+        self.assertEqual(self.run_jobs(), 'Ran 1 jobs.\n')
+        job = self.client.get(job['status_url']).json()
+        self.assertEqual(job['status'], 'succeeded')
+        self.assertEqual(job['progress'], {'done': 4, 'total': 4})
+        self.assertEqual(job['result'], {'rows': 4})
+
+        download = self.client.get(job['result_url'])
+        self.assertEqual(download['Content-Type'], 'text/csv')
+        self.assertIn('inventory_report.csv', download['Content-Disposition'])
+        streamed = self.client.get(reverse('inventory_report') + '?sort_by=-stock&quantity_min=2&export=csv')
+        self.assertEqual(b''.join(download.streaming_content).replace(b'\r\n', b'\n'),
+                         b''.join(streamed.streaming_content).replace(b'\r\n', b'\n'))
+
+        response = self.client.post(reverse('inventory_report_export_job'), {'sort_by': 'price'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_claim_is_exclusive(self):
+        first = jobs.enqueue(jobs.INVENTORY_REPORT_CSV)
+        second = jobs.enqueue(jobs.INVENTORY_REPORT_CSV)
+        later = jobs.enqueue(jobs.INVENTORY_REPORT_CSV)
+        Job.objects.filter(pk=later.pk).update(run_after=timezone.now() + timedelta(minutes=5))
+
+        claimed = [jobs.claim('worker-a'), jobs.claim('worker-b'), jobs.claim('worker-c')]
+        self.assertEqual([job.pk for job in claimed[:2]], [first.pk, second.pk])
+        self.assertIsNone(claimed[2])
+        self.assertEqual(len({job.worker for job in claimed[:2]}), 2)
+        self.assertEqual(list(Job.objects.filter(status=Job.RUNNING).values_list('attempts', flat=True)), [1, 1])
+        with self.assertRaises(ValueError):
+            jobs.enqueue('unknown')
+
+    @override_settings(IMS_JOB_RETRY_DELAY=10)
+    def test_failed_job_is_retried(self):
+        calls = []
+
+        def flaky(run, fail_times):
+            calls.append(run.job.attempts)
+            if len(calls) <= fail_times:
+                raise RuntimeError('Attempt %s broke' % len(calls))
+            return {'calls': len(calls)}
+
+        def invalid(run):
+            raise jobs.JobFailed('Nothing to retry.')
+
+        with mock.patch.dict(jobs.TASKS, {'flaky': flaky, 'invalid': invalid}):
+            job = jobs.enqueue('flaky', {'fail_times': 1})
+            self.run_jobs()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts), (Job.QUEUED, 1))
+            self.assertIn('RuntimeError: Attempt 1 broke', job.error)
+            self.assertAlmostEqual((job.run_after - timezone.now()).total_seconds(), 10, delta=2)
+            self.assertEqual(self.run_jobs(), 'Ran 0 jobs.\n')
+
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.run_jobs()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.result, calls), (Job.SUCCEEDED, {'calls': 2}, [1, 2]))
+
+            calls.clear()
+            job = jobs.enqueue('flaky', {'fail_times': 5}, attempts=2)
+            self.run_jobs()
+            Job.objects.filter(pk=job.pk).update(run_after=timezone.now())
+            self.run_jobs()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts, calls), (Job.FAILED, 2, [1, 2]))
+            self.assertIsNotNone(job.finished_at)
+
+            job = jobs.enqueue('invalid')
+            self.run_jobs()
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts, job.error), (Job.FAILED, 1, 'Nothing to retry.'))
+
+    @override_settings(IMS_JOB_STALE_AFTER=60)
+    def test_stale_jobs_are_requeued(self):
+        retried = jobs.enqueue(jobs.INVENTORY_REPORT_CSV)
+        exhausted = jobs.enqueue(jobs.INVENTORY_REPORT_CSV, attempts=1)
+        alive = jobs.enqueue(jobs.INVENTORY_REPORT_CSV)
+        for _ in range(3):
+            jobs.claim('worker-a')
+        Job.objects.exclude(pk=alive.pk).update(heartbeat_at=timezone.now() - timedelta(minutes=2))
+        jobs.heartbeat([alive.pk])
+
+        self.assertEqual(jobs.requeue_stale(), 2)
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {retried.pk: Job.QUEUED, exhausted.pk: Job.FAILED, alive.pk: Job.RUNNING})
+
+    def test_background_import(self):
+        client = Client()
+        client.login(username='jobsupplier', password='supplierpass')
+        upload = SimpleUploadedFile('catalog.csv', (
+            "name,description,unit_price,stock\n"
+            "Queued hammer,Steel hammer,12.50,10\n"
+            "Queued saw,Bad price,0.00,3\n").encode())
+        response = client.post(reverse('import_products'), {'file': upload, 'background': '1'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json()['result'], 'queued')
+        job = Job.objects.get()
+        self.assertEqual((job.kind, job.max_attempts, job.created_by), ('import_products', 1, self.supplier.user))
+        self.assertTrue(os.path.exists(jobs.job_path(job.params['upload'])))
+
+        self.run_jobs()
+        status = client.get(response.json()['status_url']).json()
+        self.assertEqual(status['status'], 'succeeded')
+        self.assertEqual((status['result']['created'], status['result']['error_count']), (1, 1))
+        self.assertTrue(Product.objects.filter(name='Queued hammer', supplier=self.supplier).exists())
+        self.assertFalse(os.path.exists(jobs.job_path(job.params['upload'])))
+
+    def test_job_access(self):
+        job = jobs.enqueue(jobs.INVENTORY_REPORT_CSV, user=self.supplier.user)
+        status_url = reverse('job_status', kwargs={'pk': job.pk})
+        result_url = reverse('job_result', kwargs={'pk': job.pk})
+
+        self.assertEqual(self.client.get(status_url).status_code, 200)
+        self.assertEqual(self.client.get(result_url).status_code, 404)
+        self.assertEqual(Client().get(status_url).status_code, 403)
+        other = create_supplier('otherjobsupplier', '5553232')
+        client = Client()
+        client.force_login(other.user)
+        self.assertEqual(client.get(status_url).status_code, 404)
+        self.assertEqual(client.post(reverse('inventory_report_export_job')).status_code, 403)
+
+        self.run_jobs()
+        client.force_login(self.supplier.user)
+        self.assertEqual(client.get(status_url).json()['status'], 'succeeded')
+        self.assertEqual(client.get(result_url).status_code, 200)
+
+
+class OutflowHistoryMixin:
+    """
+    Shared fixture of the reorder point and demand forecast tests: products with inventory and outflow history.
+
+    Methods:
+    - setUp: Setup method to create a test admin user and products with inventory and outflow history.
+    - outflow: Records an inventory movement of a product `days_ago` days before now.
+    """
+
+    def setUp(self):
+        self.admin = User.objects.create_superuser(
+            username='admin', password='testpassword', email="admin@example.com")
+        supplier = create_supplier('historysupplier', '5554141')
+        self.now = timezone.now()
+        self.products = {}
+        for name, stock in [('steady', 30), ('lumpy', 12), ('idle', 8)]:
+            product = Product.objects.create(
+                supplier=supplier, name=name, description=PRODUCT_DESC, unit_price=UNIT_PRICE, stock=STOCK,
+                active_status=True)
+            Inventory.objects.create(product=product, selling_unit_price=Decimal('20.00'), stock=stock)
+            self.products[name] = product
+        for day in range(10):
+            self.outflow('steady', day, -2)
+        self.outflow('lumpy', 3, -4)
+        self.outflow('lumpy', 3, -6)
+        # Not outflows of the 10 day window: deletions, the supplier's stock, inflows and older movements.
+        self.outflow('idle', 1, -5, reason=StockMovement.DELETED)
+        self.outflow('idle', 1, -5, location=StockMovement.SUPPLIER)
+        self.outflow('idle', 2, 5)
+        self.outflow('idle', 11, -5)
+
+    def outflow(self, name, days_ago, quantity, reason=StockMovement.EDITED, location=StockMovement.INVENTORY):
+        StockMovement.objects.create(
+            product=self.products[name], location=location, quantity=quantity, reason=reason,
+            created_at=self.now - timedelta(days=days_ago, hours=1))
+
+
+class ReorderPointTest(OutflowHistoryMixin, TestCase):
+    """
+    Test cases for the reorder point engine (reorder.refresh), its command and job.
+
+    Methods:
+    - setUp, outflow: See OutflowHistoryMixin.
+    - levels: Returns the reorder fields of a product's inventory row.
+    - test_levels_match_formulas: Checks the demand, safety stock, reorder point and days of cover of every row.
+    - test_refresh_only_writes_changes: Checks if a refresh runs a bounded number of queries and writes only changed rows.
+    - test_command_and_job: Checks if the command and the queued job refresh the rows and the feeds expose them.
+    """
+
+    def levels(self, name):
+        return Inventory.objects.values_list(*reorder.REORDER_FIELDS).get(product=self.products[name])
+
+    def test_levels_match_formulas(self):
+        result = reorder.refresh(now=self.now, lead_time=7, level=0.95, days=10)
+        self.assertEqual(result, {'rows': 3, 'updated': 3})
+        # 2 units every day: no variability, so no safety stock.
+        self.assertEqual(self.levels('steady'), (2.0, 0, 14, 15.0))
+        # 10 units on one day of 10: mean 1, standard deviation 3, safety stock 1.645 × 3 × √7 = 13.06.
+        self.assertEqual(self.levels('lumpy'), (1.0, 14, 21, 12.0))
+        self.assertEqual(self.levels('idle'), (0.0, 0, 0, None))
+
+        reorder.refresh(now=self.now, lead_time=14, level=0.5, days=10)
+        self.assertEqual(self.levels('lumpy'), (1.0, 0, 14, 12.0))
+
+    def test_refresh_only_writes_changes(self):
+        reorder.refresh(now=self.now, days=10)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(reorder.refresh(now=self.now, days=10), {'rows': 3, 'updated': 0})
+        # The inventory rows and one grouped query per day of the window.
+        self.assertEqual(len(queries), 11)
+
+        self.outflow('idle', 4, -3)
+        self.assertEqual(reorder.refresh(now=self.now, days=10), {'rows': 3, 'updated': 1})
+        self.assertEqual(self.levels('idle')[0], 0.3)
+
+    def test_command_and_job(self):
+        output = StringIO()
+        call_command('refresh_reorder_points', history_days=10, lead_time=7, stdout=output)
+        self.assertIn('Updated the reorder points of 3 of 3 inventory rows', output.getvalue())
+        with self.assertRaises(CommandError):
+            call_command('refresh_reorder_points', service_level=1.5)
+
+        self.client.force_login(self.admin)
+        Inventory.objects.update(reorder_point=None)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(IMS_JOB_DIR=directory.name, IMS_REORDER_HISTORY_DAYS=10):
+            response = self.client.post(reverse('refresh_reorder_points'))
+            self.assertEqual(response.status_code, 202)
+            call_command('run_jobs', concurrency=0, burst=True, stdout=StringIO())
+        job = self.client.get(response.json()['status_url']).json()
+        self.assertEqual((job['status'], job['result']), ('succeeded', {'rows': 3, 'updated': 3}))
+
+        feed = self.client.get(reverse('low_stock_feed')).json()['items']
+        self.assertEqual({item['product']: item['reorder_point'] for item in feed}, {'lumpy': 21, 'idle': 0})
+        rows = self.client.get(reverse('api_inventory'), {'fields': 'product,reorder_point,days_of_cover'}).json()
+        self.assertIn({'product': 'steady', 'reorder_point': 14, 'days_of_cover': 15.0}, rows['results'])
+
+
+class DemandForecastTest(OutflowHistoryMixin, TestCase):
+    """
+    Test cases for the batch demand forecast (forecast.py), its command, job and the projected stock-out dates.
+
+    Methods:
+    - setUp, outflow: See OutflowHistoryMixin.
+    - forecasts: Returns the forecast method and daily demand of every product's inventory row by name.
+    - test_history_matrix: Checks if the outflows are summed per product and day, oldest day first.
+    - test_forecast_methods: Checks if steady demand is smoothed and intermittent demand fit with Croston's method.
+    - test_chunks: Checks if the chunks cover the inventory and forecasting them gives the same results as one chunk.
+    - test_command_and_jobs: Checks if the command and the queued chunk jobs store the forecasts.
+    - test_projected_stockout: Checks if the inventory report and purchase page show the projected stock-out date.
+    """
+
+    def forecasts(self):
+        return {row[0]: row[1:] for row in Inventory.objects.values_list(
+            'product__name', 'forecast_method', 'forecast_daily_demand')}
+
+    def test_history_matrix(self):
+        product_ids = forecast.np.array(sorted(product.pk for product in self.products.values()))
+        matrix = forecast.history_matrix(product_ids, self.now, 10)
+        self.assertEqual(matrix.shape, (3, 10))
+        self.assertEqual(matrix[0].tolist(), [2.0] * 10)
+        self.assertEqual(matrix[1].tolist(), [0.0] * 6 + [10.0] + [0.0] * 3)
+        self.assertEqual(matrix[2].tolist(), [0.0] * 10)
+
+    def test_forecast_methods(self):
+        first, last = forecast.product_chunks()[0]
+        result = forecast.forecast_chunk(first, last, end=self.now, days=10, alpha=0.2)
+        self.assertEqual(result, {'rows': 3, 'forecast': 2})
+        # Croston: a demand of 10 after an interval of 7 days (counted from the start of the window).
+        self.assertEqual(self.forecasts(), {
+            'steady': (Inventory.SES, 2.0), 'lumpy': (Inventory.CROSTON, 1.4286), 'idle': ('', 0.0)})
+        self.assertEqual(set(Inventory.objects.values_list('forecasted_at', flat=True)), {self.now})
+
+        matrix = forecast.np.array([[0, 0, 3, 0, 0, 3, 0, 0, 3], [2, 2, 2, 2, 2, 2, 2, 2, 11]], dtype=float)
+        methods, rates = forecast.forecast_rates(matrix, 0.5)
+        self.assertEqual(methods.tolist(), [Inventory.CROSTON, Inventory.SES])
+        # Sizes of 3 every 3 days; a level starting at the mean of 3, smoothed towards 2, then halfway to 11.
+        self.assertEqual(rates.tolist(), [1.0, 6.502])
+
+    def test_chunks(self):
+        chunks = forecast.product_chunks(size=2)
+        pks = sorted(product.pk for product in self.products.values())
+        self.assertEqual(chunks, [(pks[0], pks[1]), (pks[2], pks[2])])
+        results = [forecast.forecast_chunk(first, last, end=self.now, days=10) for first, last in chunks]
+        self.assertEqual(results, [{'rows': 2, 'forecast': 2}, {'rows': 1, 'forecast': 0}])
+        chunked = self.forecasts()
+        forecast.forecast_chunk(pks[0], pks[2], end=self.now, days=10)
+        self.assertEqual(self.forecasts(), chunked)
+
+    def test_command_and_jobs(self):
+        output = StringIO()
+        with override_settings(IMS_FORECAST_HISTORY_DAYS=10):
+            call_command('forecast_demand', concurrency=0, chunk_size=2, stdout=output)
+        self.assertIn('Forecast the demand of 3 inventory rows (2 with demand) in 2 chunks', output.getvalue())
+        self.assertEqual(self.forecasts()['steady'], (Inventory.SES, 2.0))
+        with self.assertRaises(CommandError):
+            call_command('forecast_demand', chunk_size=0)
+
+        self.client.force_login(self.admin)
+        Inventory.objects.update(forecast_method='', forecast_daily_demand=None, forecasted_at=None)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        with override_settings(IMS_JOB_DIR=directory.name, IMS_FORECAST_HISTORY_DAYS=10, IMS_FORECAST_CHUNK_SIZE=2):
+            response = self.client.post(reverse('refresh_forecasts'))
+            self.assertEqual(response.status_code, 202)
+            self.assertEqual([job['kind'] for job in response.json()['jobs']], ['forecast_demand'] * 2)
+            call_command('run_jobs', concurrency=0, burst=True, stdout=StringIO())
+        results = [self.client.get(job['status_url']).json()['result'] for job in response.json()['jobs']]
+        self.assertEqual(results, [{'rows': 2, 'forecast': 2}, {'rows': 1, 'forecast': 0}])
+        self.assertEqual(self.forecasts()['lumpy'], (Inventory.CROSTON, 1.4286))
+
+    def test_projected_stockout(self):
+        first, last = forecast.product_chunks()[0]
+        forecast.forecast_chunk(first, last, end=self.now, days=10)
+        today = timezone.localdate()
+        # 30 units at 2 a day, 12 units at 1.4286 a day.
+        steady, lumpy = today + timedelta(days=15), today + timedelta(days=8)
+        self.assertEqual(Inventory.objects.get(product=self.products['steady']).projected_stockout, steady)
+        self.assertIsNone(Inventory.objects.get(product=self.products['idle']).projected_stockout)
+
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('inventory_report'))
+        self.assertContains(response, '<td>%s</td>' % date_format(steady), html=True)
+        self.assertContains(response, '<td>%s</td>' % date_format(lumpy), html=True)
+        self.assertContains(response, '<td>-</td>', html=True)
+
+        response = self.client.get(reverse('purchase_product', args=[self.products['lumpy'].pk]))
+        self.assertContains(response, '1.43 per day')
+        self.assertContains(response, date_format(lumpy))
+
+
+class PricingRuleTest(TestCase):
+    """
+    Test cases for the pricing rules and the set-based repricing of the inventory (pricing.py).
+
+    Methods:
+    - setUp: Setup method to create two suppliers with products in the inventory.
+    - prices: Returns the selling unit prices of the inventory rows by product name.
+    - assertSummaryConsistent: Checks if the stored summary matches a fresh aggregate using the --check command.
+    - test_selling_price: Checks the markup and rounding rules, and the minimum price.
+    - test_database_matches_python: Checks if the database prices every row like selling_price.
+    - test_rule_changes_reprice: Checks if saving, moving and deleting rules reprice the rows they cover with one UPDATE.
+    - test_purchase_uses_rules: Checks if products entering the inventory get the price of their most specific rule.
+    - test_constraints: Checks if a rule covers one scope and each scope has at most one rule.
+    - test_command: Checks if the reprice_inventory command applies a changed default markup.
+    """
+
+    def setUp(self):
+        self.suppliers = [create_supplier('pricing%s' % index, '555161%s' % index) for index in range(2)]
+        self.products = {}
+        for name, supplier, unit_price in [('a', 0, '10.00'), ('b', 0, '12.34'), ('c', 1, '7.50')]:
+            product = Product.objects.create(
+                supplier=self.suppliers[supplier], name=name, description=PRODUCT_DESC,
+                unit_price=Decimal(unit_price), stock=STOCK, active_status=True)
+            Inventory.objects.create(product=product, selling_unit_price=Decimal('20.00'), stock=4)
+            self.products[name] = product
+
+    def prices(self):
+        return {name: str(price) for name, price in Inventory.objects.values_list(
+            'product__name', 'selling_unit_price')}
+
+    def assertSummaryConsistent(self):
+        call_command('rebuild_inventory_summary', check=True, stdout=mock.MagicMock())
+
+    def test_selling_price(self):
+        self.assertEqual(pricing.selling_price(Decimal('12.34'), 30, PricingRule.CENT), Decimal('16.04'))
+        # 12.35 × 1.3 = 16.055, rounded half up.
+        self.assertEqual(pricing.selling_price(Decimal('12.35'), 30, PricingRule.CENT), Decimal('16.06'))
+        self.assertEqual(pricing.selling_price(Decimal('12.34'), 30, PricingRule.UNIT), Decimal('16.00'))
+        self.assertEqual(pricing.selling_price(Decimal('12.34'), 30, PricingRule.NINETY_NINE), Decimal('15.99'))
+        self.assertEqual(pricing.selling_price(Decimal('12.34'), Decimal('33.5'), PricingRule.NINETY_NINE),
+                         Decimal('15.99'))
+        self.assertEqual(pricing.selling_price(Decimal('0.01'), -50, PricingRule.CENT), Decimal('0.01'))
+        self.assertEqual(pricing.selling_price(Decimal('0.20'), 0, PricingRule.UNIT), Decimal('1.00'))
+        self.assertEqual(pricing.selling_price(Decimal('0.20'), 0, PricingRule.NINETY_NINE), Decimal('0.99'))
+
+    def test_database_matches_python(self):
+        supplier = self.suppliers[0]
+        products = Product.objects.bulk_create([
+            Product(supplier=supplier, name='price %s' % cents, description=PRODUCT_DESC,
+                    unit_price=Decimal(cents) / 100, stock=1)
+            for cents in list(range(1, 120)) + list(range(1001, 100000, 997))])
+        Inventory.objects.bulk_create([
+            Inventory(product=product, selling_unit_price=Decimal('1.00'), stock=1) for product in products])
+        # bulk_create skips the signals maintaining the summary.
+        call_command('rebuild_inventory_summary', stdout=mock.MagicMock())
+        for markup, rounding in [(Decimal('30'), PricingRule.CENT), (Decimal('12.5'), PricingRule.CENT),
+                                 (Decimal('33.33'), PricingRule.UNIT), (Decimal('-40'), PricingRule.NINETY_NINE)]:
+            PricingRule.objects.update_or_create(supplier=supplier, defaults={
+                'markup_percentage': markup, 'rounding': rounding})
+            stored = dict(Inventory.objects.filter(product__in=products).values_list(
+                'product_id', 'selling_unit_price'))
+            self.assertEqual(stored, {product.pk: pricing.selling_price(product.unit_price, markup, rounding)
+                                      for product in products})
+        self.assertSummaryConsistent()
+
+    def test_rule_changes_reprice(self):
+        with CaptureQueriesContext(connection) as queries:
+            rule = PricingRule.objects.create(supplier=self.suppliers[0], markup_percentage=50)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "IMS_app_inventory"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(self.prices(), {'a': '15.00', 'b': '18.51', 'c': '20.00'})
+        self.assertSummaryConsistent()
+
+        # The product rule wins over its supplier's; the rule for all products covers the rest.
+        PricingRule.objects.create(product=self.products['b'], markup_percentage=0, rounding=PricingRule.UNIT)
+        PricingRule.objects.create(markup_percentage=100, rounding=PricingRule.NINETY_NINE)
+        self.assertEqual(self.prices(), {'a': '15.00', 'b': '12.00', 'c': '14.99'})
+
+        rule.supplier = self.suppliers[1]
+        rule.save()
+        self.assertEqual(self.prices(), {'a': '19.99', 'b': '12.00', 'c': '11.25'})
+        self.assertEqual(pricing.reprice(), 0)
+
+        rule.delete()
+        self.assertEqual(self.prices(), {'a': '19.99', 'b': '12.00', 'c': '14.99'})
+        self.assertSummaryConsistent()
+        # A rule deleted with its supplier reprices nothing.
+        self.suppliers[1].delete()
+        self.assertSummaryConsistent()
+
+    def test_purchase_uses_rules(self):
+        PricingRule.objects.create(supplier=self.suppliers[1], markup_percentage=10)
+        fresh = [Product.objects.create(
+            supplier=self.suppliers[index], name='fresh %s' % index, description=PRODUCT_DESC,
+            unit_price=Decimal('10.00'), stock=STOCK, active_status=True) for index in range(2)]
+        purchase_product(fresh[0], 2)
+        self.assertTrue(purchase_products([{'product_id': fresh[1].pk, 'quantity': 3}])[0])
+        self.assertEqual(self.prices()['fresh 0'], '13.00')
+        self.assertEqual(self.prices()['fresh 1'], '11.00')
+        self.assertSummaryConsistent()
+
+    def test_constraints(self):
+        with self.assertRaises(ValidationError):
+            PricingRule(supplier=self.suppliers[0], product=self.products['a'], markup_percentage=5).full_clean()
+        with self.assertRaises(ValidationError):
+            PricingRule(markup_percentage=-100).full_clean()
+        PricingRule.objects.create(markup_percentage=5)
+        PricingRule.objects.create(supplier=self.suppliers[0], markup_percentage=5)
+        for scope in [{}, {'supplier': self.suppliers[0]}, {'supplier': self.suppliers[0], 'product': self.products['a']}]:
+            with self.assertRaises(IntegrityError), transaction.atomic():
+                PricingRule.objects.create(markup_percentage=5, **scope)
+
+    def test_command(self):
+        output = StringIO()
+        with override_settings(IMS_DEFAULT_MARKUP_PERCENTAGE=50):
+            call_command('reprice_inventory', supplier=[self.suppliers[1].pk], stdout=output)
+        self.assertIn('Repriced 1 inventory rows', output.getvalue())
+        self.assertEqual(self.prices(), {'a': '20.00', 'b': '20.00', 'c': '11.25'})
+        call_command('reprice_inventory', stdout=output)
+        self.assertEqual(self.prices(), {'a': '13.00', 'b': '16.04', 'c': '9.75'})
+        self.assertSummaryConsistent()
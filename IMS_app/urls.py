@@ -1,6 +1,6 @@
 from django.urls import path
 
-from . import views
+from . import api, async_views, views
 
 urlpatterns = [
     path('', views.LandingView.as_view(), name='landing_page'),
@@ -11,9 +11,32 @@ urlpatterns = [
     path('ims/suppliers', views.AdminDashboardSuppliersView.as_view(), name='admin_dashboard_suppliers'),
     path('ims/supplier/<int:supplier_id>', views.AdminDashboardSupplierDetailView.as_view(), name='admin_supplier_detail'),
     path('ims/purchase/<int:product_id>', views.ProductPurchaseView.as_view(), name='purchase_product'),
+    path('ims/purchase-order', views.PurchaseOrderView.as_view(), name='purchase_order'),
     path('ims/reports', views.InventoryReportView.as_view(), name='inventory_report'),
+    path('ims/reports/export-job', views.InventoryReportExportJobView.as_view(), name='inventory_report_export_job'),
+    path('ims/products/<int:pk>/stock', views.StockAtView.as_view(), name='stock_at'),
+    path('ims/low-stock', views.LowStockFeedView.as_view(), name='low_stock_feed'),
+    path('ims/forecasts/refresh', views.ForecastRefreshView.as_view(), name='refresh_forecasts'),
+    path('ims/reorder-points/refresh', views.ReorderPointsRefreshView.as_view(), name='refresh_reorder_points'),
+    path('ims/cache-stats', views.FragmentCacheStatsView.as_view(), name='fragment_cache_stats'),
+    path('ims/request-stats', views.RequestStatsView.as_view(), name='request_stats'),
+    path('ims/summary', views.InventorySummaryView.as_view(), name='inventory_summary'),
+    path('jobs/<int:pk>', views.JobStatusView.as_view(), name='job_status'),
+    path('jobs/<int:pk>/result', views.JobResultView.as_view(), name='job_result'),
+    path('ims/async/dashboard', async_views.AsyncAdminDashboardView.as_view(), name='async_admin_dashboard'),
+    path('ims/async/products', async_views.AsyncAdminDashboardProductsView.as_view(),
+         name='async_admin_dashboard_products'),
+    path('ims/async/suppliers', async_views.AsyncAdminDashboardSuppliersView.as_view(),
+         name='async_admin_dashboard_suppliers'),
+    path('ims/async/reports', async_views.AsyncInventoryReportView.as_view(), name='async_inventory_report'),
+    path('api/v1/inventory', api.InventoryApiView.as_view(), name='api_inventory'),
+    path('api/v1/products', api.ProductApiView.as_view(), name='api_products'),
+    path('api/v1/suppliers', api.SupplierApiView.as_view(), name='api_suppliers'),
     path('supplier/dashboard', views.SupplierDashboardView.as_view(), name='supplier_dashboard'),
+    path('supplier/async/dashboard', async_views.AsyncSupplierDashboardView.as_view(),
+         name='async_supplier_dashboard'),
     path('supplier/add-product', views.AddProductView.as_view(), name='add_product'),
+    path('supplier/import-products', views.ProductImportView.as_view(), name='import_products'),
     path('supplier/product/<int:pk>/edit', views.EditProductView.as_view(), name='edit_product'),
     path('supplier/product/<int:pk>/delete', views.ProductDeleteView.as_view(), name='delete_product'),
 ]
\ No newline at end of file
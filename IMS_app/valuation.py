@@ -0,0 +1,120 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, IntegerField, Sum, Value, When
+
+from .models import Inventory, InventorySummary
+
+MONEY = DecimalField(max_digits=30, decimal_places=2)
+CENT = Decimal('0.01')
+
+
+def contribution(stock, selling_unit_price, unit_price):
+    """
+    Returns the (units, stock value, purchase cost) an inventory row adds to the summary.
+    """
+    return (
+        stock,
+        (stock * Decimal(selling_unit_price)).quantize(CENT),
+        (stock * Decimal(unit_price)).quantize(CENT),
+    )
+
+
+def combine(deltas):
+    """
+    Sums an iterable of (supplier_id, (units, value, cost)) pairs into a dict keyed by supplier.
+    """
+    totals = defaultdict(lambda: (0, Decimal('0'), Decimal('0')))
+    for supplier_id, delta in deltas:
+        totals[supplier_id] = tuple(a + b for a, b in zip(totals[supplier_id], delta))
+    return dict(totals)
+
+
+def negate(delta):
+    return tuple(-value for value in delta)
+
+
+def apply_deltas(deltas, create=True):
+    """
+    Adds per-supplier (units, value, cost) deltas to the summary rows of those suppliers and to the
+    global row, using a fixed number of statements however many suppliers are involved.
+
+    Parameters:
+    - deltas: Mapping of supplier id to a (units, value, cost) delta.
+    - create: Whether missing summary rows should be created. Deletions pass False, since a supplier
+      being deleted must not get a new row.
+    """
+    deltas = {supplier_id: delta for supplier_id, delta in deltas.items() if any(delta)}
+    if not deltas:
+        return
+    total = tuple(sum(values) for values in zip(*deltas.values()))
+
+    with transaction.atomic():
+        if create:
+            InventorySummary.objects.bulk_create(
+                [InventorySummary(supplier_id=None)]
+                + [InventorySummary(supplier_id=supplier_id) for supplier_id in deltas],
+                ignore_conflicts=True)
+
+        def increment(field, index, output_field):
+            return F(field) + Case(
+                *[When(supplier_id=supplier_id, then=Value(delta[index])) for supplier_id, delta in deltas.items()],
+                default=Value(0), output_field=output_field)
+
+        InventorySummary.objects.filter(supplier_id__in=list(deltas)).update(
+            total_units=increment('total_units', 0, IntegerField()),
+            stock_value=increment('stock_value', 1, MONEY),
+            purchase_cost=increment('purchase_cost', 2, MONEY))
+        InventorySummary.objects.filter(supplier__isnull=True).update(
+            total_units=F('total_units') + total[0],
+            stock_value=F('stock_value') + Value(total[1], output_field=MONEY),
+            purchase_cost=F('purchase_cost') + Value(total[2], output_field=MONEY))
+
+
+def aggregate_summary():
+    """
+    Computes the per-supplier totals from scratch with a single aggregate query over the inventory.
+
+    Returns:
+    - A dict of supplier id to (units, value, cost).
+    """
+    rows = Inventory.objects.values('product__supplier_id').annotate(
+        units=Sum('stock'),
+        value=Sum(F('stock') * F('selling_unit_price'), output_field=MONEY),
+        cost=Sum(F('stock') * F('product__unit_price'), output_field=MONEY),
+    ).order_by()
+    return {
+        row['product__supplier_id']: (row['units'], row['value'].quantize(CENT), row['cost'].quantize(CENT))
+        for row in rows
+    }
+
+
+def stored_summary():
+    """
+    Returns the maintained summary as (global totals, dict of supplier id to totals).
+    """
+    stored = {}
+    total = (0, Decimal('0'), Decimal('0'))
+    for row in InventorySummary.objects.all():
+        values = (row.total_units, row.stock_value, row.purchase_cost)
+        if row.supplier_id is None:
+            total = values
+        else:
+            stored[row.supplier_id] = values
+    return total, stored
+
+
+def rebuild_summary():
+    """
+    Replaces the maintained summary with freshly aggregated totals.
+    """
+    totals = aggregate_summary()
+    total = tuple(sum(values) for values in zip(*totals.values())) if totals else (0, Decimal('0'), Decimal('0'))
+    with transaction.atomic():
+        InventorySummary.objects.all().delete()
+        InventorySummary.objects.bulk_create(
+            [InventorySummary(supplier_id=None, total_units=total[0], stock_value=total[1], purchase_cost=total[2])]
+            + [InventorySummary(supplier_id=supplier_id, total_units=units, stock_value=value, purchase_cost=cost)
+               for supplier_id, (units, value, cost) in totals.items()])
+    return total, totals
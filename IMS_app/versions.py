@@ -0,0 +1,36 @@
+from uuid import uuid4
+
+from django.utils import timezone
+
+from .models import ResourceVersion
+
+INVENTORY = 'inventory'
+PRODUCT = 'product'
+SUPPLIER = 'supplier'
+
+
+def bump(*names):
+    """
+    Marks the given collections as changed. Runs one UPDATE, plus one INSERT the first time a collection changes.
+    Called from the model signals and from every set-based write (F() updates, bulk_create, bulk_update),
+    inside the writing transaction so a rolled back write does not change the versions.
+    """
+    names = sorted(set(names))
+    version, now = uuid4().hex, timezone.now()
+    updated = ResourceVersion.objects.filter(name__in=names).update(version=version, modified_at=now)
+    if updated < len(names):
+        ResourceVersion.objects.bulk_create(
+            [ResourceVersion(name=name, version=version, modified_at=now) for name in names],
+            ignore_conflicts=True)
+
+
+def get_versions(names):
+    """
+    Returns a (tokens, last modified) tuple for the given collections with a single query. Collections that
+    never changed get an empty token and do not contribute to the last modified time.
+    """
+    rows = dict((name, (version, modified_at)) for name, version, modified_at in
+                ResourceVersion.objects.filter(name__in=names).values_list('name', 'version', 'modified_at'))
+    tokens = [rows.get(name, ('', None))[0] for name in names]
+    modified = [row[1] for row in rows.values()]
+    return tokens, max(modified) if modified else None
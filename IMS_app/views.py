@@ -1,17 +1,43 @@
 import csv
-from django.db import transaction
-from django.db.models import Q
+import itertools
+import json
+import os
+from django.core.exceptions import PermissionDenied, ValidationError
+from django.db.models import F, FilteredRelation, Q
 from django.contrib.auth.views import LoginView, LogoutView
 from django.views.generic.edit import UpdateView, DeleteView
 from django.views.generic import TemplateView, CreateView
 from django.shortcuts import render, get_object_or_404, redirect
 from django.views import View
-from django.urls import reverse_lazy
+from django.urls import reverse, reverse_lazy
 from django.contrib import messages
-from django.http import HttpResponse, JsonResponse,HttpResponseForbidden
-from .models import Inventory, Product, Supplier
-from .mixins import AdminLoginMixin, SupplierLoginMixin
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.http import (
+    FileResponse, Http404, HttpResponse, JsonResponse, HttpResponseForbidden, HttpResponseBadRequest,
+    StreamingHttpResponse)
+from . import forecast, jobs
+from .models import Inventory, InventorySummary, Job, Product, Supplier
+from .mixins import AdminLoginMixin, SupplierLoginMixin, KeysetPaginationMixin
 from .forms import InventorySearchForm, ProductForm, EditProductForm
+from .fragments import INVENTORY_CARD, PRODUCT_CARD, SUPPLIER_CARD, SUPPLIER_PROFILE, fragment_stats, reset_stats
+from .filters import filter_inventory, filter_products, filter_suppliers
+from .importers import ImportFormatError, detect_format, import_products
+from .instrumentation import instrumentation_enabled, request_stats, reset_request_stats
+from .ledger import INVENTORY, SUPPLIER, stock_at
+from .search import PRODUCT_INDEX, filter_matches, search_queryset
+from .stock import (
+    annotate_stock_level, low_stock_filter, low_stock_threshold, purchase_product, purchase_products,
+    very_low_stock_filter, very_low_stock_threshold)
+
+
+class Echo:
+    """
+    Pseudo-buffer for csv.writer that returns each written line instead of storing it,
+    so rows can be streamed straight into a StreamingHttpResponse.
+    """
+    def write(self, value):
+        return value
 
 
 class LandingView(TemplateView):
@@ -58,100 +84,138 @@ class CustomLogoutView(LogoutView):
     next_page = reverse_lazy('login')
 
 
-class AdminDashboardView(AdminLoginMixin, TemplateView):
+class AdminDashboardMixin(KeysetPaginationMixin):
     """
-    Admin dashboard view displaying the inventory list with search functionality.
+    Queries and context of the admin dashboard, shared by AdminDashboardView and its async version.
 
     Attributes:
     - template_name: The HTML template for rendering the admin dashboard.
 
     Methods:
-    - get_context_data: Overrides the method to include the inventory list and search query in the context.
-
-    Usage:
-    - Extends Django's TemplateView and uses the AdminLoginMixin for permission checks.
+    - get_queryset: Returns the filtered inventory queryset and its keyset ordering.
+    - get_context_data: Includes the inventory page, its cards, the search query and valuation summary in the context.
+      The page and the summary are fetched unless they are passed in (as the async view does).
     """
-    
+
     template_name = 'admin/admin_dashboard.html'
 
-    def get_context_data(self, **kwargs):
+    def get_queryset(self):
+        inventory_list = annotate_stock_level(Inventory.objects.select_related('product').only(
+            'stock', 'selling_unit_price', 'effective_low_stock_threshold', 'product__name',
+            'product__description', 'product__unit_price'))
+        return filter_inventory(
+            inventory_list, self.request.GET.get('search', ''), bool(self.request.GET.get('low_stock')))
+
+    def get_context_data(self, page=None, inventory_summary=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        inventory_list = Inventory.objects.all()
+        if page is None:
+            page = self.paginate_queryset(*self.get_queryset())
+            inventory_summary = InventorySummary.objects.filter(supplier__isnull=True).first()
+
+        context['inventory_list'] = page.object_list
+        context['inventory_cards'] = INVENTORY_CARD.render_many(
+            page.object_list, extra_key=(low_stock_threshold(), very_low_stock_threshold()))
+        context['page_obj'] = page
+        context['search_query'] = self.request.GET.get('search', '')
+        context['low_stock'] = bool(self.request.GET.get('low_stock'))
+        context['inventory_summary'] = inventory_summary
+        return context
 
-        search_query = self.request.GET.get('search', '')
-        if search_query:
-            inventory_list = inventory_list.filter(
-                Q(product__name__icontains=search_query)
-                | Q(product__description__icontains=search_query))
 
-        context['inventory_list'] = inventory_list
-        context['search_query'] = search_query
-        return context
+class AdminDashboardView(AdminLoginMixin, AdminDashboardMixin, TemplateView):
+    """
+    Admin dashboard view displaying the inventory list with search functionality and a low stock filter.
+
+    Usage:
+    - Extends Django's TemplateView, uses the AdminLoginMixin for permission checks and the AdminDashboardMixin
+      for the queries and context.
+    """
 
 
-class AdminDashboardProductsView(AdminLoginMixin, TemplateView):
+class AdminDashboardProductsMixin(KeysetPaginationMixin):
     """
-    Admin dashboard view displaying a list of products with search functionality.
+    Queries and context of the admin product list, shared by AdminDashboardProductsView and its async version.
 
     Attributes:
     - template_name: The HTML template for rendering the admin product list.
 
     Methods:
-    - get_context_data: Overrides the method to include the product list and search query in the context.
-
-    Usage:
-    - Extends Django's TemplateView and uses the AdminLoginMixin for permission checks.
+    - get_queryset: Returns the filtered product queryset and its keyset ordering.
+    - get_context_data: Includes the product page, its cards and the search query in the context.
+      The page is fetched unless it is passed in.
     """
-    
+
     template_name = 'admin/admin_product_list.html'
 
-    def get_context_data(self, **kwargs):
+    def get_queryset(self):
+        product_list = Product.objects.select_related('supplier__user').only(
+            'name', 'description', 'unit_price', 'stock', 'active_status',
+            'supplier__user__username')
+        return filter_products(product_list, self.request.GET.get('search', ''))
+
+    def get_context_data(self, page=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        product_list = Product.objects.all()
+        if page is None:
+            page = self.paginate_queryset(*self.get_queryset())
+        context['product_list'] = page.object_list
+        context['product_cards'] = PRODUCT_CARD.render_many(page.object_list, show_supplier=True)
+        context['page_obj'] = page
+        context['search_query'] = self.request.GET.get('search', '')
+        return context
 
-        search_query = self.request.GET.get('search', '')
-        if search_query:
-            product_list = product_list.filter(
-                Q(name__icontains=search_query)
-                | Q(description__icontains=search_query)
-                | Q(supplier__user__username__icontains=search_query))
 
-        context['product_list'] = product_list
-        context['search_query'] = search_query
-        return context
+class AdminDashboardProductsView(AdminLoginMixin, AdminDashboardProductsMixin, TemplateView):
+    """
+    Admin dashboard view displaying a list of products with search functionality.
+
+    Usage:
+    - Extends Django's TemplateView, uses the AdminLoginMixin for permission checks and the
+      AdminDashboardProductsMixin for the queries and context.
+    """
 
 
-class AdminDashboardSuppliersView(AdminLoginMixin, TemplateView):
+class AdminDashboardSuppliersMixin(KeysetPaginationMixin):
     """
-    Admin dashboard view displaying a list of suppliers with search functionality.
+    Queries and context of the admin supplier list, shared by AdminDashboardSuppliersView and its async version.
 
     Attributes:
     - template_name: The HTML template for rendering the admin suppliers list.
 
     Methods:
-    - get_context_data: Overrides the method to include the suppliers list and search query in the context.
-
-    Usage:
-    - Extends Django's TemplateView and uses the AdminLoginMixin for permission checks.
+    - get_queryset: Returns the filtered supplier queryset and its keyset ordering.
+    - get_context_data: Includes the supplier page, its cards and the search query in the context.
+      The page is fetched unless it is passed in.
     """
-    
+
     template_name = 'admin/admin_suppliers.html'
 
-    def get_context_data(self, **kwargs):
+    def get_queryset(self):
+        suppliers_list = Supplier.objects.select_related('user').only(
+            'user__username', 'user__first_name', 'user__last_name',
+            'user__is_active')
+        return filter_suppliers(suppliers_list, self.request.GET.get('search', ''))
+
+    def get_context_data(self, page=None, **kwargs):
         context = super().get_context_data(**kwargs)
-        suppliers_list = Supplier.objects.all()
-        
-        search_query = self.request.GET.get('search', '')
-        if search_query:
-            suppliers_list = suppliers_list.filter(
-                Q(user__username__icontains=search_query)
-                | Q(user__first_name__icontains=search_query))
-            
-        context['suppliers_list'] = suppliers_list
-        context['search_query'] = search_query
+        if page is None:
+            page = self.paginate_queryset(*self.get_queryset())
+        context['suppliers_list'] = page.object_list
+        context['supplier_cards'] = SUPPLIER_CARD.render_many(page.object_list)
+        context['page_obj'] = page
+        context['search_query'] = self.request.GET.get('search', '')
         return context
 
 
+class AdminDashboardSuppliersView(AdminLoginMixin, AdminDashboardSuppliersMixin, TemplateView):
+    """
+    Admin dashboard view displaying a list of suppliers with search functionality.
+
+    Usage:
+    - Extends Django's TemplateView, uses the AdminLoginMixin for permission checks and the
+      AdminDashboardSuppliersMixin for the queries and context.
+    """
+
+
 class ProductPurchaseView(AdminLoginMixin, View):
     """
     Admin view for purchasing a product and updating inventory.
@@ -169,44 +233,32 @@ class ProductPurchaseView(AdminLoginMixin, View):
     template_name = 'admin/purchase_product.html'
 
     def get(self, request, product_id):
-        product = get_object_or_404(Product, pk=product_id)
+        # The inventory row carries the demand forecast shown next to the purchase form.
+        product = get_object_or_404(
+            Product.objects.select_related('supplier__user', 'inventory'), pk=product_id)
         return render(request, self.template_name, {'product': product})
 
     def post(self, request, product_id):
-        product = get_object_or_404(Product, pk=product_id)
+        product = get_object_or_404(
+            Product.objects.select_related('supplier__user'), pk=product_id)
         intake_stock = request.POST.get('stock')
         if intake_stock:
-            intake_stock = int(intake_stock)
-            if not product.active_status:
+            try:
+                quantity = int(intake_stock)
+            except (TypeError, ValueError):
                 return render(request, self.template_name, {
                     'product': product,
-                    'error': "The Product is not available"
+                    'error': "Stock must be a whole number"
                 })
-            if product.stock < intake_stock:
+            try:
+                purchase_product(product, quantity)
+            except ValidationError as error:
+                product.refresh_from_db(fields=['stock', 'active_status'])
                 return render(request, self.template_name, {
                     'product': product,
-                    'error': "Not enough stock available"
+                    'error': error.messages[0]
                 })
 
-            with transaction.atomic():
-                product.stock -= intake_stock
-                if product.stock == 0:
-                    product.active_status = False
-                product.save()
-                inventory_entry = Inventory.objects.filter(
-                    product=product).first()
-                if inventory_entry:
-                    inventory_entry.stock += intake_stock
-                    inventory_entry.save()
-                else:
-                    markup_percentage = 30
-                    selling_unit_price_default = (int(
-                        product.unit_price)) * (1 + markup_percentage / 100)
-                    Inventory.objects.create(
-                        product=product,
-                        stock=intake_stock,
-                        selling_unit_price=selling_unit_price_default)
-
             return redirect('admin_dashboard')
 
         return render(request, self.template_name, {
@@ -215,6 +267,43 @@ class ProductPurchaseView(AdminLoginMixin, View):
         })
 
 
+class PurchaseOrderView(AdminLoginMixin, View):
+    """
+    Admin endpoint for restocking several products in one request.
+
+    Methods:
+    - post: Accepts a JSON body `{"lines": [{"product_id": 1, "quantity": 5}, ...]}` and applies the whole
+      order in a single transaction. Responds with the per-line results; nothing is applied if any line fails.
+
+    Usage:
+    - Extends Django's View and uses the AdminLoginMixin for permission checks.
+    """
+
+    def post(self, request):
+        try:
+            lines = json.loads(request.body)['lines']
+        except (ValueError, KeyError, TypeError):
+            lines = None
+        if not isinstance(lines, list) or not lines:
+            return JsonResponse({
+                'result': 'error',
+                'message': 'Expected a JSON body with a non-empty "lines" list.'
+            }, status=400)
+
+        success, results = purchase_products(lines)
+        if not success:
+            return JsonResponse({
+                'result': 'error',
+                'message': 'Purchase order rejected, no stock was changed.',
+                'lines': results
+            }, status=400)
+        return JsonResponse({
+            'result': 'success',
+            'message': 'Purchase order applied.',
+            'lines': results
+        })
+
+
 class AdminDashboardSupplierDetailView(AdminLoginMixin, TemplateView):
     """
     Admin dashboard view displaying details of a specific supplier and their associated products.
@@ -239,103 +328,499 @@ class AdminDashboardSupplierDetailView(AdminLoginMixin, TemplateView):
     template_name = 'admin/admin_supplier_detail.html'
 
     def get(self, request, supplier_id):
-        supplier = get_object_or_404(Supplier, pk=supplier_id)
-        products = Product.objects.filter(supplier=supplier)
+        supplier = get_object_or_404(
+            Supplier.objects.select_related('user'), pk=supplier_id)
+        products = list(Product.objects.filter(supplier=supplier).only(
+            'name', 'description', 'unit_price', 'stock', 'active_status', 'supplier_id'))
+        for product in products:
+            product.supplier = supplier
         return render(request, self.template_name, {
             'supplier': supplier,
-            'products': products
+            'supplier_profile': SUPPLIER_PROFILE.render_many([supplier])[0],
+            'products': products,
+            'product_cards': PRODUCT_CARD.render_many(products, show_supplier=False),
         })
 
 
-class InventoryReportView(AdminLoginMixin, TemplateView):
+class InventoryReportMixin(KeysetPaginationMixin):
     """
-    Admin dashboard view generating an inventory report with search and sorting functionality.
+    Queries and context of the inventory report, shared by InventoryReportView and its async version.
 
     Attributes:
     - template_name: The HTML template for rendering the admin inventory report.
+    - export_chunk_size: Number of rows fetched from the database per chunk when exporting.
+    - sort_fields: The field each sort key orders by and its lowest possible value.
+    - product_sort_fields: The annotations used to sort by product columns.
 
     Methods:
-    - get_context_data: Overrides the method to include the inventory report and search form in the context.
-
-    Usage:
-    - Extends Django's TemplateView and uses the AdminLoginMixin for permission checks.
+    - get_ordering: Returns the ordering of the sort_by keys (or search relevance) with a unique tie-breaker, the
+      primary key or, when the leading key is a product column, the product id.
+    - get_queryset: Builds the inventory queryset from the search form filters and sort order.
+    - get_export_rows: Returns the rows of the CSV export (export_fields) as a values_list queryset.
+    - get_context_data: Includes the inventory report and search form in the context. The page is fetched
+      unless it is passed in.
+    - csv_response: Wraps an iterator of CSV lines in a streaming attachment response.
     """
-    
+
     template_name = 'admin/admin_inventory_report.html'
+    export_chunk_size = 2000
+    csv_header = ['Product Name', 'Supplier', 'Purchase Price', 'Selling Price', 'Quantity']
+    export_fields = [
+        'product__name', 'supplier_name', 'product__unit_price', 'selling_unit_price', 'stock']
+
+    # The field each sort key of InventorySearchForm orders by, with a value no row is below. Every field has
+    # a (column, id) index, see Inventory.Meta and Product.Meta, and get_ordering adds the id of that index as
+    # the tie-breaker, so a page sorted by one key is read in order straight off the index. Product columns
+    # are sorted through the annotations of a second product join (see get_queryset): Django trims
+    # `product__id` to the inventory's product_id column, and only this join gives a tie-breaker on the
+    # product table itself.
+    sort_fields = {
+        'product': ('product_sort_name', ''),
+        'supplier': ('supplier_name', ''),
+        'unit_price': ('product_sort_price', 0),
+        'selling_price': ('selling_unit_price', 0),
+        'stock': ('stock', 0),
+    }
+    product_sort_fields = ['product_sort_name', 'product_sort_price', 'product_sort_id']
+
+    def get_ordering(self, form):
+        sort = form.cleaned_data.get('sort_by')
+        if not sort:
+            return ['search_rank', 'pk'] if self.request.GET.get('search') else ['pk']
+        ordering = [('-' if descending else '') + self.sort_fields[key][0] for key, descending in sort]
+        # Further keys only order the rows sharing the leading key, so the tie-breaker follows the leading key.
+        lead, descending = self.sort_fields[sort[0][0]][0], sort[0][1]
+        tie_breaker = 'product_sort_id' if lead in self.product_sort_fields else 'pk'
+        return ordering + [('-' if descending else '') + tie_breaker]
+
+    def get_queryset(self, form):
+        product_name = form.cleaned_data.get('product_name')
+        supplier_name = form.cleaned_data.get('supplier_name')
+        quantity_min = form.cleaned_data.get('quantity_min')
+        quantity_max = form.cleaned_data.get('quantity_max')
+
+        # The supplier name is denormalized onto the inventory row, so no supplier or user join is needed.
+        queryset = Inventory.objects.select_related('product').only(
+            'stock', 'selling_unit_price', 'supplier_name', 'forecast_daily_demand', 'product__name',
+            'product__unit_price')
+
+        if product_name:
+            queryset = filter_matches(
+                queryset, product_name, PRODUCT_INDEX, ['name'], Q(product__name__icontains=product_name),
+                pk_field='product_id')
+        if supplier_name:
+            queryset = filter_matches(
+                queryset, supplier_name, PRODUCT_INDEX, ['supplier'], Q(supplier_name__icontains=supplier_name),
+                pk_field='product_id')
+        if quantity_min is not None:
+            queryset = queryset.filter(stock__gte=quantity_min)
+        if quantity_max is not None:
+            queryset = queryset.filter(stock__lte=quantity_max)
 
-    def get_context_data(self, **kwargs):
+        search_query = self.request.GET.get('search', '')
+        if search_query:
+            queryset = search_queryset(
+                queryset, search_query, PRODUCT_INDEX, ['name', 'description', 'supplier'],
+                Q(product__name__icontains=search_query)
+                | Q(product__description__icontains=search_query)
+                | Q(supplier_name__icontains=search_query),
+                pk_field='product_id')
+
+        ordering = self.get_ordering(form)
+        if any(field.lstrip('-') in self.product_sort_fields for field in ordering):
+            queryset = queryset.annotate(sorted_product=FilteredRelation('product')).annotate(
+                product_sort_name=F('sorted_product__name'), product_sort_price=F('sorted_product__unit_price'),
+                product_sort_id=F('sorted_product__id'))
+        sort = form.cleaned_data.get('sort_by')
+        if sort:
+            # Always true, but with a range condition on the leading column SQLite reads the rows from its index
+            # even when further keys leave the rows sharing a value to sort, instead of sorting the whole table.
+            field, lowest = self.sort_fields[sort[0][0]]
+            queryset = queryset.filter(**{field + '__gte': lowest})
+        return queryset.order_by(*ordering)
+
+    def get_export_rows(self, form):
+        return self.get_queryset(form).values_list(*self.export_fields)
+
+    def get_context_data(self, form=None, page=None, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        form = InventorySearchForm(self.request.GET)
+        if form is None:
+            form = InventorySearchForm(self.request.GET)
         if form.is_valid():
-            product_name = form.cleaned_data.get('product_name')
-            supplier_name = form.cleaned_data.get('supplier_name')
-            quantity_min = form.cleaned_data.get('quantity_min')
-            quantity_max = form.cleaned_data.get('quantity_max')
-
-            queryset = Inventory.objects.all()
-
-            if product_name:
-                queryset = queryset.filter(
-                    product__name__icontains=product_name)
-            if supplier_name:
-                queryset = queryset.filter(
-                    product__supplier__name__icontains=supplier_name)
-            if quantity_min:
-                queryset = queryset.filter(stock_quantity__gte=quantity_min)
-            if quantity_max:
-                queryset = queryset.filter(stock_quantity__lte=quantity_max)
-
-            sort_by = self.request.GET.get('sort_by')
-            if sort_by:
-                queryset = queryset.order_by(sort_by)
-                
-            search_query = self.request.GET.get('search', '')
-            if search_query:
-                queryset = queryset.filter(
-                    Q(product__name__icontains=search_query)
-                    | Q(product__description__icontains=search_query)
-                    | Q(product__supplier__user__username=search_query)
-                    )
-                
-            context['search_query'] = search_query
-
-            context['inventory'] = queryset
-
+            context['search_query'] = self.request.GET.get('search', '')
+            if page is None:
+                page = self.paginate_queryset(self.get_queryset(form), self.get_ordering(form))
+            context['inventory'] = page.object_list
+            context['page_obj'] = page
+
+        export_params = self.request.GET.copy()
+        export_params['export'] = 'csv'
+        context['export_url'] = '?' + export_params.urlencode()
         context['form'] = form
         return context
 
+    def csv_response(self, lines):
+        response = StreamingHttpResponse(lines, content_type='text/csv')
+        response['Content-Disposition'] = 'attachment; filename="inventory_report.csv"'
+        return response
 
-class SupplierDashboardView(SupplierLoginMixin, TemplateView):
+
+class InventoryReportView(AdminLoginMixin, InventoryReportMixin, TemplateView):
     """
-    Supplier dashboard view displaying a list of products with search functionality.
+    Admin dashboard view generating an inventory report with search and sorting functionality.
+
+    Methods:
+    - get: Streams the report as CSV when `export=csv` is requested, otherwise renders the page.
+    - export_csv: Streams the filtered and sorted report rows as a CSV attachment.
+
+    Usage:
+    - Extends Django's TemplateView, uses the AdminLoginMixin for permission checks and the InventoryReportMixin
+      for the queries and context.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if request.GET.get('export') == 'csv':
+            return self.export_csv()
+        return super().get(request, *args, **kwargs)
+
+    def export_csv(self):
+        """
+        Streams the report as CSV, fetching rows in chunks so memory stays flat regardless of the report size.
+        """
+        form = InventorySearchForm(self.request.GET)
+        if not form.is_valid():
+            return HttpResponseBadRequest("Invalid report filters.")
+
+        rows = self.get_export_rows(form).iterator(chunk_size=self.export_chunk_size)
+        writer = csv.writer(Echo())
+        lines = itertools.chain([self.csv_header], rows)
+        return self.csv_response(writer.writerow(line) for line in lines)
+
+
+class LowStockFeedView(AdminLoginMixin, KeysetPaginationMixin, View):
+    """
+    Admin JSON feed of the inventory rows below their low stock threshold, i.e. the reorder list.
+
+    Only the matching rows are read: the predicate is the condition of a partial index holding just the
+    rows below their threshold.
 
     Attributes:
-    - template_name: The HTML template for rendering the supplier dashboard.
+    - paginate_by: Number of rows per page of the feed.
 
     Methods:
-    - get_context_data: Overrides the method to include the products list and search query in the context.
+    - get: Returns the low stock rows ordered by stock (lowest first). `?level=very_low` restricts the feed
+      to very low stock rows, and the `after` cursor of the previous page fetches the next one.
 
     Usage:
-    - Extends Django's TemplateView and uses the SupplierLoginMixin for permission checks.
+    - Extends Django's View, uses the AdminLoginMixin for permission checks and the KeysetPaginationMixin for cursor pagination.
     """
-    
+
+    paginate_by = 200
+
+    def get(self, request):
+        very_low = request.GET.get('level') == 'very_low'
+        rows = annotate_stock_level(Inventory.objects.filter(
+            very_low_stock_filter() if very_low else low_stock_filter())).values(
+                'pk', 'product_id', 'product__name', 'product__supplier_id', 'stock',
+                'effective_low_stock_threshold', 'stock_level', 'reorder_point', 'days_of_cover')
+        page = self.paginate_queryset(rows, ['stock', 'pk'])
+        return JsonResponse({
+            'thresholds': {'low': low_stock_threshold(), 'very_low': very_low_stock_threshold()},
+            'items': [{
+                'inventory_id': row['pk'],
+                'product_id': row['product_id'],
+                'product': row['product__name'],
+                'supplier_id': row['product__supplier_id'],
+                'stock': row['stock'],
+                'low_stock_threshold': row['effective_low_stock_threshold'],
+                'stock_level': row['stock_level'],
+                'reorder_point': row['reorder_point'],
+                'days_of_cover': row['days_of_cover'],
+            } for row in page],
+            'next': page.next_url,
+        })
+
+
+class InventorySummaryView(AdminLoginMixin, View):
+    """
+    Admin JSON endpoint returning the inventory valuation summary.
+
+    Methods:
+    - get: Returns the global totals and the totals of every supplier, read from the maintained summary table.
+
+    Usage:
+    - Extends Django's View and uses the AdminLoginMixin for permission checks.
+    """
+
+    def get(self, request):
+        summaries = InventorySummary.objects.select_related('supplier__user').only(
+            'total_units', 'stock_value', 'purchase_cost', 'supplier__user__username')
+        data = {'total': None, 'suppliers': []}
+        for summary in summaries:
+            values = {
+                'total_units': summary.total_units,
+                'stock_value': str(summary.stock_value),
+                'purchase_cost': str(summary.purchase_cost),
+            }
+            if summary.supplier is None:
+                data['total'] = values
+            else:
+                data['suppliers'].append(dict(
+                    values, supplier_id=summary.supplier_id, supplier=summary.supplier.user.username))
+        if data['total'] is None:
+            data['total'] = {'total_units': 0, 'stock_value': '0.00', 'purchase_cost': '0.00'}
+        return JsonResponse(data)
+
+
+class StockAtView(AdminLoginMixin, View):
+    """
+    Admin JSON endpoint returning the stock of a product at a point in time, read from the stock ledger.
+
+    Methods:
+    - get: Returns the supplier stock and the inventory stock of the product at `?at=<ISO 8601 datetime>`
+      (defaults to now).
+
+    Usage:
+    - Extends Django's View and uses the AdminLoginMixin for permission checks.
+    """
+
+    def get(self, request, pk):
+        product = get_object_or_404(Product.objects.only('pk'), pk=pk)
+        when = timezone.now()
+        if request.GET.get('at'):
+            try:
+                when = parse_datetime(request.GET['at'])
+            except ValueError:
+                when = None
+            if when is None:
+                return HttpResponseBadRequest("Invalid datetime.")
+            if timezone.is_naive(when):
+                when = timezone.make_aware(when)
+        return JsonResponse({
+            'product_id': product.pk,
+            'at': when.isoformat(),
+            'supplier_stock': stock_at(product.pk, when, SUPPLIER),
+            'inventory_stock': stock_at(product.pk, when, INVENTORY),
+        })
+
+
+class FragmentCacheStatsView(AdminLoginMixin, View):
+    """
+    Admin JSON endpoint exposing the hit/miss counters of the cached page fragments.
+
+    Methods:
+    - get: Returns the counters and hit rate of every fragment.
+    - post: Resets the counters.
+
+    Usage:
+    - Extends Django's View and uses the AdminLoginMixin for permission checks.
+    """
+
+    def get(self, request):
+        return JsonResponse({'fragments': fragment_stats()})
+
+    def post(self, request):
+        reset_stats()
+        return JsonResponse({'fragments': fragment_stats()})
+
+
+class RequestStatsView(AdminLoginMixin, View):
+    """
+    Admin JSON endpoint exposing the rolling request statistics collected by the InstrumentationMiddleware.
+
+    Methods:
+    - get: Returns the latency percentiles, query counts and latency histogram of every URL name.
+    - post: Resets the statistics.
+
+    Usage:
+    - Extends Django's View and uses the AdminLoginMixin for permission checks.
+    """
+
+    def get(self, request):
+        return JsonResponse({'enabled': instrumentation_enabled(), 'urls': request_stats()})
+
+    def post(self, request):
+        reset_request_stats()
+        return JsonResponse({'enabled': instrumentation_enabled(), 'urls': request_stats()})
+
+
+class InventoryReportExportJobView(AdminLoginMixin, View):
+    """
+    Admin endpoint queueing a CSV export of the inventory report as a background job, for reports too large
+    to stream within a request.
+
+    Methods:
+    - post: Validates the report filters of the posted form data and queues an inventory_report_csv job.
+      Returns 202 with the job's status URL, or 400 for invalid filters.
+
+    Usage:
+    - Extends Django's View and uses the AdminLoginMixin for permission checks. The job is run by the
+      run_jobs worker, its result is downloaded from JobResultView.
+    """
+
+    def post(self, request):
+        params = request.POST.copy()
+        params.pop('csrfmiddlewaretoken', None)
+        params.pop('export', None)
+        if not InventorySearchForm(params).is_valid():
+            return JsonResponse({'result': 'error', 'message': 'Invalid report filters.'}, status=400)
+        job = jobs.enqueue(jobs.INVENTORY_REPORT_CSV, {'query': params.urlencode()}, user=request.user)
+        return JsonResponse(job_status(job), status=202)
+
+
+class ReorderPointsRefreshView(AdminLoginMixin, View):
+    """
+    Admin endpoint queueing an on-demand refresh of the reorder points of the inventory (see reorder.refresh).
+
+    Methods:
+    - post: Queues a refresh_reorder_points job and returns 202 with the job's status URL.
+
+    Usage:
+    - Extends Django's View and uses the AdminLoginMixin for permission checks.
+    """
+
+    def post(self, request):
+        job = jobs.enqueue(jobs.REFRESH_REORDER_POINTS, user=request.user)
+        return JsonResponse(job_status(job), status=202)
+
+
+class ForecastRefreshView(AdminLoginMixin, View):
+    """
+    Admin endpoint queueing an on-demand demand forecast of the inventory, one job per chunk of products
+    (see forecast.enqueue_chunks), so the run_jobs worker pool forecasts the chunks in parallel.
+
+    Methods:
+    - post: Queues the forecast_demand jobs and returns 202 with their statuses.
+
+    Usage:
+    - Extends Django's View and uses the AdminLoginMixin for permission checks.
+    """
+
+    def post(self, request):
+        queued = forecast.enqueue_chunks(user=request.user)
+        return JsonResponse({'jobs': [job_status(job) for job in queued]}, status=202)
+
+
+def job_status(job):
+    """
+    Returns the JSON representation of a job served by JobStatusView. Only the last line of a failure is shown.
+    """
+    error = job.error.strip().splitlines()
+    return {
+        'id': job.pk,
+        'kind': job.kind,
+        'status': job.status,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'progress': {'done': job.progress_done, 'total': job.progress_total},
+        'message': job.message,
+        'error': error[-1] if error else None,
+        'result': job.result,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+        'status_url': reverse('job_status', kwargs={'pk': job.pk}),
+        'result_url': reverse('job_result', kwargs={'pk': job.pk}) if job.result_file else None,
+    }
+
+
+class JobMixin:
+    """
+    Mixin for the views of a background job. Admins see every job, other users only the jobs they queued;
+    anyone else gets a 404, so job ids cannot be probed.
+    """
+
+    def get_job(self):
+        user = self.request.user
+        if not user.is_authenticated:
+            raise PermissionDenied
+        jobs_visible = Job.objects.all() if user.is_superuser else Job.objects.filter(created_by=user)
+        return get_object_or_404(jobs_visible, pk=self.kwargs['pk'])
+
+
+class JobStatusView(JobMixin, View):
+    """
+    JSON endpoint reporting the status and progress of a background job, polled by the pages that queue jobs.
+
+    Methods:
+    - get: Returns the job's status, progress, result summary and, once it succeeded, the download URL.
+
+    Usage:
+    - Extends Django's View and uses the JobMixin for permission checks.
+    """
+
+    def get(self, request, pk):
+        return JsonResponse(job_status(self.get_job()))
+
+
+class JobResultView(JobMixin, View):
+    """
+    Endpoint downloading the result file of a succeeded background job.
+
+    Methods:
+    - get: Streams the result file as an attachment, or returns 404 while the job has no result.
+
+    Usage:
+    - Extends Django's View and uses the JobMixin for permission checks.
+    """
+
+    def get(self, request, pk):
+        job = self.get_job()
+        path = jobs.job_path(job.result_file)
+        if job.status != Job.SUCCEEDED or not job.result_file or not os.path.exists(path):
+            raise Http404('The job has no result.')
+        return FileResponse(
+            open(path, 'rb'), as_attachment=True, filename=job.result_name, content_type=job.result_content_type)
+
+
+class SupplierDashboardMixin(KeysetPaginationMixin):
+    """
+    Queries and context of the supplier dashboard, shared by SupplierDashboardView and its async version.
+
+    Attributes:
+    - template_name: The HTML template for rendering the supplier dashboard.
+
+    Methods:
+    - get_queryset: Returns the supplier's filtered product queryset and its keyset ordering.
+    - get_context_data: Includes the products page and search query in the context. The page is fetched
+      unless it is passed in.
+    """
+
     template_name = 'supplier/supplier_dashboard.html'
 
-    def get_context_data(self, **kwargs):
-        context = super().get_context_data(**kwargs)
-        supplier = self.request.user.supplier
-        products = Product.objects.filter(supplier=supplier)
+    def get_queryset(self):
+        products = Product.objects.filter(supplier_id=self.request.supplier_id).only(
+            'name', 'description', 'unit_price', 'stock', 'active_status')
         search_query = self.request.GET.get('search', '')
-        if search_query:
-            products = products.filter(
-                Q(name__icontains=search_query)
-                | Q(description__icontains=search_query))
-        context['products_list'] = products
-        context['search_query'] = search_query
+        if not search_query:
+            return products, ['pk']
+        products = search_queryset(
+            products, search_query, PRODUCT_INDEX, ['name', 'description'],
+            Q(name__icontains=search_query)
+            | Q(description__icontains=search_query))
+        return products, ['search_rank', 'pk']
+
+    def get_context_data(self, page=None, **kwargs):
+        context = super().get_context_data(**kwargs)
+        if page is None:
+            page = self.paginate_queryset(*self.get_queryset())
+        context['products_list'] = page.object_list
+        context['page_obj'] = page
+        context['search_query'] = self.request.GET.get('search', '')
         return context
 
 
+class SupplierDashboardView(SupplierLoginMixin, SupplierDashboardMixin, TemplateView):
+    """
+    Supplier dashboard view displaying a list of products with search functionality.
+
+    Usage:
+    - Extends Django's TemplateView, uses the SupplierLoginMixin for permission checks and the
+      SupplierDashboardMixin for the queries and context.
+    """
+
+
 class AddProductView(SupplierLoginMixin, CreateView):
     """
     View for adding a new product to the supplier's inventory(Product Table).
@@ -358,18 +843,56 @@ class AddProductView(SupplierLoginMixin, CreateView):
     template_name = 'supplier/add_product.html'
 
     def form_valid(self, form):
-        if hasattr(self.request.user, 'supplier'):
-            supplier = self.request.user.supplier
-            form.instance.supplier = supplier
-            return super().form_valid(form)
-        else:
-            return HttpResponseForbidden(
-                "You are not authorized to add products.")
+        form.instance.supplier_id = self.request.supplier_id
+        return super().form_valid(form)
 
     def get_success_url(self):
         return reverse_lazy('supplier_dashboard')
 
 
+class ProductImportView(SupplierLoginMixin, View):
+    """
+    View for importing a supplier's product catalog from a CSV or NDJSON file.
+
+    Attributes:
+    - template_name: The HTML template for rendering the import page.
+
+    Methods:
+    - get: Handles GET requests to display the upload form.
+    - post: Handles POST requests with a `file` upload, imports the valid rows in chunks
+      and returns a JSON report with the errors of the rejected rows. With `background` set, the file is
+      queued as an import_products job instead and the job's status is returned with 202.
+
+    Usage:
+    - Extends Django's View and uses the SupplierLoginMixin for permission checks.
+    """
+
+    template_name = 'supplier/import_products.html'
+
+    def get(self, request):
+        return render(request, self.template_name)
+
+    def post(self, request):
+        upload = request.FILES.get('file')
+        if not upload:
+            return JsonResponse({'result': 'error', 'message': 'No file uploaded.'}, status=400)
+        try:
+            if request.POST.get('background'):
+                return self.enqueue(upload, detect_format(upload.name))
+            report = import_products(request.supplier_id, upload, detect_format(upload.name))
+        except ImportFormatError as error:
+            return JsonResponse({'result': 'error', 'message': str(error)}, status=400)
+        except UnicodeDecodeError:
+            return JsonResponse({'result': 'error', 'message': 'The file must be UTF-8 encoded.'}, status=400)
+        return JsonResponse(dict(report, result='success'))
+
+    def enqueue(self, upload, file_format):
+        params = {'supplier_id': self.request.supplier_id, 'upload': jobs.save_upload(upload), 'file_format': file_format}
+        # A failed import is not retried: the chunks imported before the failure stay imported.
+        job = jobs.enqueue(jobs.IMPORT_PRODUCTS, params, user=self.request.user, attempts=1)
+        return JsonResponse(dict(job_status(job), result='queued'), status=202)
+
+
 class EditProductView(SupplierLoginMixin, UpdateView):
     """
     View for editing an existing product in the supplier's inventory.
@@ -393,7 +916,7 @@ class EditProductView(SupplierLoginMixin, UpdateView):
     success_url = reverse_lazy('supplier_dashboard')
 
     def form_valid(self, form):
-        if form.instance.supplier.user != self.request.user:
+        if form.instance.supplier_id != self.request.supplier_id:
             return HttpResponseForbidden(
                 "You are not authorized to edit this product.")
         return super().form_valid(form)
@@ -0,0 +1,25 @@
+"""
+Entry points of the run_jobs worker processes.
+
+The processes are spawned, not forked, so they do not share the parent's database connections. A spawned
+process imports this module before Django is set up, so it must not import models at module level.
+"""
+import django
+
+
+def setup():
+    """
+    Initializer of a worker process: sets up Django with the parent's settings (DJANGO_SETTINGS_MODULE is
+    inherited through the environment) and registers the tasks.
+    """
+    django.setup()
+
+
+def run(job_id):
+    from . import jobs
+    return jobs.execute(job_id)
+
+
+def forecast_chunk(first, last, end):
+    from . import forecast
+    return forecast.forecast_chunk(first, last, end=end)
@@ -44,6 +44,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'IMS_app.instrumentation.InstrumentationMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -83,6 +84,56 @@ DATABASES = {
     }
 }
 
+# Production profile, selected with IMS_DATABASE_PROFILE=production. WAL lets readers run alongside the
+# writer, IMMEDIATE transactions wait for the write lock (busy_timeout, in ms) instead of failing with
+# "database is locked", and connections are kept open across requests. Compare both profiles with
+# `python manage.py load_test_database`.
+
+IMS_SQLITE_PRODUCTION_OPTIONS = {
+    'transaction_mode': 'IMMEDIATE',
+    'pragmas': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'busy_timeout': 5000,
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+    },
+}
+
+if os.environ.get('IMS_DATABASE_PROFILE') == 'production':
+    DATABASES['default'].update({
+        'ENGINE': 'IMS_app.db_backends.sqlite3',
+        'OPTIONS': IMS_SQLITE_PRODUCTION_OPTIONS,
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    })
+
+
+# Cache
+# https://docs.djangoproject.com/en/3.1/topics/cache/
+# Web workers, `run_jobs` workers and management commands drop the fragment versions and supplier identities
+# of the rows they change from the cache, so every process using the database must share it. The default
+# LocMemCache is local to one process and only suits the development server and the tests; any deployment
+# running more than one process must set IMS_CACHE_BACKEND and IMS_CACHE_LOCATION to a Redis or memcached
+# server, e.g. django.core.cache.backends.redis.RedisCache and redis://127.0.0.1:6379.
+# `python manage.py check --deploy` fails while the cache is process-local. The tests always run with their
+# own LocMemCache (see TEST_RUNNER).
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+if os.environ.get('IMS_CACHE_BACKEND'):
+    CACHES['default'] = {
+        'BACKEND': os.environ['IMS_CACHE_BACKEND'],
+        'LOCATION': os.environ.get('IMS_CACHE_LOCATION', ''),
+    }
+
+TEST_RUNNER = 'IMS_app.test_runner.DiscoverRunner'
+
 
 # Password validation
 # https://docs.djangoproject.com/en/3.1/ref/settings/#auth-password-validators
@@ -125,3 +176,80 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'IMS_app', 'static'),
 ]
 
+
+
+# Inventory stock levels
+# Inventory rows below these stock levels are flagged as low / very low stock. A product's inventory row
+# can override the low stock threshold with its own low_stock_threshold. After changing
+# IMS_LOW_STOCK_THRESHOLD run `python manage.py sync_low_stock_thresholds` (migrate also does it).
+
+IMS_LOW_STOCK_THRESHOLD = 20
+IMS_VERY_LOW_STOCK_THRESHOLD = 5
+
+
+# Page fragment cache
+# Seconds a rendered card is kept in the cache. Cards are keyed by the versions of the objects they show,
+# so changed objects are re-rendered right away regardless of this timeout. Each process counts the hits and
+# misses of the cards itself and adds them to the counters of /ims/cache-stats every
+# IMS_FRAGMENT_STATS_INTERVAL seconds, and whenever that page is read.
+
+IMS_FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
+IMS_FRAGMENT_STATS_INTERVAL = 10
+
+
+# Request instrumentation
+# When enabled, every response gets a Server-Timing header, every request is logged to the
+# IMS_app.instrumentation logger with its query count, SQL and template time, slowest statements and
+# repeated queries, and the last IMS_INSTRUMENTATION_WINDOW requests of every URL are summarized on
+# /ims/request-stats. Disabled, the middleware removes itself from the chain.
+
+IMS_INSTRUMENTATION = os.environ.get('IMS_INSTRUMENTATION', '') == '1'
+IMS_INSTRUMENTATION_SLOW_QUERIES = 5
+IMS_INSTRUMENTATION_WINDOW = 1000
+
+
+# Background jobs
+# Long-running tasks (report exports, catalog imports) are queued as Job rows and run by
+# `python manage.py run_jobs`, which runs up to IMS_JOB_CONCURRENCY jobs at once in worker processes.
+# A failed job is retried up to IMS_JOB_MAX_ATTEMPTS times in all, IMS_JOB_RETRY_DELAY seconds later, doubled
+# per attempt. A running job whose worker sent no heartbeat for IMS_JOB_STALE_AFTER seconds is requeued.
+# Uploads and result files are kept in IMS_JOB_DIR.
+
+IMS_JOB_DIR = BASE_DIR / 'job_files'
+IMS_JOB_CONCURRENCY = 2
+IMS_JOB_MAX_ATTEMPTS = 3
+IMS_JOB_RETRY_DELAY = 10
+IMS_JOB_STALE_AFTER = 300
+
+
+# Reorder points
+# `python manage.py refresh_reorder_points` (or the refresh_reorder_points job) estimates every product's
+# daily demand from the inventory outflows of the last IMS_REORDER_HISTORY_DAYS days and sets its safety
+# stock and reorder point for a replenishment lead time of IMS_REORDER_LEAD_TIME_DAYS days, so that the
+# stock runs out during the lead time with a probability of at most 1 - IMS_REORDER_SERVICE_LEVEL.
+
+IMS_REORDER_LEAD_TIME_DAYS = 7
+IMS_REORDER_SERVICE_LEVEL = 0.95
+IMS_REORDER_HISTORY_DAYS = 90
+
+
+# Demand forecasts
+# `python manage.py forecast_demand` (or the forecast_demand jobs) forecasts every product's daily demand
+# from the inventory outflows of the last IMS_FORECAST_HISTORY_DAYS days, with simple exponential smoothing,
+# or Croston's method for intermittent demand, using the smoothing factor IMS_FORECAST_SMOOTHING. Products
+# are forecast in chunks of IMS_FORECAST_CHUNK_SIZE, which bounds the memory of a worker process.
+
+IMS_FORECAST_HISTORY_DAYS = 180
+IMS_FORECAST_SMOOTHING = 0.2
+IMS_FORECAST_CHUNK_SIZE = 5000
+
+
+# Pricing
+# An inventory row's selling unit price is its product's unit price plus the markup of the most specific
+# pricing rule (product, supplier, all products), rounded as the rule says. Without any rule the products get
+# IMS_DEFAULT_MARKUP_PERCENTAGE, rounded with IMS_DEFAULT_PRICE_ROUNDING ('cent', 'unit' or 'ninety_nine').
+# Changed rules reprice their rows right away; after changing these settings run
+# `python manage.py reprice_inventory`.
+
+IMS_DEFAULT_MARKUP_PERCENTAGE = 30
+IMS_DEFAULT_PRICE_ROUNDING = 'cent'